@@ -0,0 +1,262 @@
+# This file is part of beets.
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+"""A persistent cache of the metadata looked up from metadata sources."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from beets import config, logging
+from beets.util import syspath
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from confuse import ConfigView
+
+log = logging.getLogger("beets")
+
+T = TypeVar("T")
+
+
+class MetadataCache:
+    """Values looked up from metadata sources, such as the `AlbumInfo` for
+    an ID or the results of a search, stored in an SQLite database.
+
+    Each value is identified by the name of its source, the kind of lookup
+    and a key, which can be any JSON-serializable value. Values are fresh
+    for `ttl` seconds after they are fetched. For `max_stale` more seconds,
+    a stale value is still returned but fetched again in the background.
+    When there are more than `max_entries` values, the least recently used
+    ones are evicted. In `offline` mode, values are never fetched: cached
+    values are returned however old they are.
+    """
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS responses (
+            source TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            fetched REAL NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (source, kind, key)
+        );
+        CREATE INDEX IF NOT EXISTS responses_by_accessed
+            ON responses (accessed);
+    """
+
+    def __init__(
+        self,
+        path: bytes | str,
+        ttl: float,
+        max_stale: float = 0,
+        max_entries: int = 0,
+        offline: bool = False,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.offline = offline
+
+        # Counters of the lookups, by their outcome.
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._revalidating: set[tuple[str, str, str]] = set()
+        self._conn = sqlite3.connect(syspath(path), check_same_thread=False)
+        self._conn.executescript(self._schema)
+        ((self._count,),) = self._conn.execute(
+            "SELECT count(*) FROM responses"
+        ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def lookup(
+        self,
+        source: str,
+        kind: str,
+        key: Any,
+        fetch: Callable[[], T],
+        default: T | None = None,
+    ) -> T | None:
+        """Get the value of a lookup from the cache, or else call `fetch`
+        to get it and store it unless it is None.
+
+        In offline mode, return `default` if the value is not cached.
+        """
+        ident = (source, kind, json.dumps(key, sort_keys=True, default=str))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched FROM responses"
+                " WHERE source = ? AND kind = ? AND key = ?",
+                ident,
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE responses SET accessed = ?"
+                    " WHERE source = ? AND kind = ? AND key = ?",
+                    (now, *ident),
+                )
+                self._conn.commit()
+
+        if row is not None:
+            try:
+                value = pickle.loads(row[0])
+            except Exception as exc:
+                log.debug("cached {0} {1} is unreadable: {2}", *ident[:2], exc)
+            else:
+                age = now - row[1]
+                if self.offline or age <= self.ttl:
+                    self._count_lookup("hits")
+                    log.debug("Using cached {0} {1}: {2}", *ident)
+                    return value
+                if age <= self.ttl + self.max_stale:
+                    self._count_lookup("stale_hits")
+                    log.debug("Using stale cached {0} {1}: {2}", *ident)
+                    self._revalidate(ident, fetch)
+                    return value
+
+        self._count_lookup("misses")
+        if self.offline:
+            log.debug("Offline, not looking up {0} {1}: {2}", *ident)
+            return default
+        value = fetch()
+        if value is not None:
+            self._store(ident, value)
+        return value
+
+    def _count_lookup(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _store(self, ident: tuple[str, str, str], value: Any):
+        try:
+            data = pickle.dumps(value)
+        except Exception as exc:
+            log.debug("Cannot cache {0} {1}: {2}", *ident[:2], exc)
+            return
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE responses SET value = ?, fetched = ?, accessed = ?"
+                " WHERE source = ? AND kind = ? AND key = ?",
+                (data, now, now, *ident),
+            )
+            if not cursor.rowcount:
+                self._conn.execute(
+                    "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (*ident, data, now, now),
+                )
+                self._count += 1
+            if self.max_entries and self._count > self.max_entries:
+                # Evict the least recently used values.
+                self._conn.execute(
+                    "DELETE FROM responses WHERE rowid IN (SELECT rowid"
+                    " FROM responses ORDER BY accessed LIMIT ?)",
+                    (self._count - self.max_entries,),
+                )
+                self._count = self.max_entries
+            self._conn.commit()
+
+    def _revalidate(self, ident: tuple[str, str, str], fetch: Callable):
+        """Fetch a stale value again in the background."""
+        with self._lock:
+            if ident in self._revalidating:
+                return
+            self._revalidating.add(ident)
+
+        def refresh():
+            try:
+                value = fetch()
+                if value is not None:
+                    self._store(ident, value)
+            except Exception as exc:
+                log.debug("Could not refresh {0} {1}: {2}", *ident[:2], exc)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(ident)
+
+        threading.Thread(target=refresh, name="revalidate", daemon=True).start()
+
+
+_cache: MetadataCache | None = None
+_cache_settings: tuple | None = None
+_cache_lock = threading.Lock()
+
+
+def metadata_cache() -> MetadataCache | None:
+    """Get the cache shared by all lookups, as configured by the
+    `metadata_cache` options, or None if it is disabled.
+    """
+    global _cache, _cache_settings
+
+    cache_config = config["metadata_cache"]
+    if not cache_config["enabled"].get(bool):
+        return None
+    settings = (
+        os.fsencode(cache_config["path"].as_filename()),
+        cache_config["ttl"].as_number(),
+        cache_config["max_stale"].as_number(),
+        cache_config["max_entries"].get(int),
+        cache_config["offline"].get(bool),
+    )
+
+    with _cache_lock:
+        if settings != _cache_settings:
+            if _cache is not None:
+                _cache.close()
+            try:
+                _cache = MetadataCache(*settings)
+            except sqlite3.Error as exc:
+                log.warning("metadata cache could not be opened: {0}", exc)
+                _cache = None
+            _cache_settings = settings
+        return _cache
+
+
+def config_key(view: ConfigView) -> str:
+    """Get a digest of the configuration of a source, to keep the values
+    looked up with different options apart without storing them.
+    """
+    dump = json.dumps(view.flatten(), sort_keys=True, default=str)
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+def cached_lookup(
+    source: str,
+    kind: str,
+    key: Any,
+    fetch: Callable[[], T],
+    default: T | None = None,
+) -> T | None:
+    """Look up a value through the shared `metadata_cache`, or just call
+    `fetch` if it is disabled.
+    """
+    if cache := metadata_cache():
+        return cache.lookup(source, kind, key, fetch, default)
+    return fetch()
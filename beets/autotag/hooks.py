@@ -17,7 +17,11 @@
 from __future__ import annotations
 
 import re
-from functools import total_ordering
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache, partial, total_ordering
 from typing import TYPE_CHECKING, Any, Callable, NamedTuple, TypeVar
 
 from jellyfish import levenshtein_distance
@@ -25,16 +29,20 @@ from unidecode import unidecode
 
 from beets import config, logging, plugins
 from beets.autotag import mb
+from beets.autotag.cache import cached_lookup, config_key
 from beets.util import as_string, cached_classproperty
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable, Iterator
+    from collections.abc import Iterable, Iterator, Sequence
+    from functools import _CacheInfo
 
     from beets.library import Item
 
 log = logging.getLogger("beets")
 
 V = TypeVar("V")
+A = TypeVar("A")
+R = TypeVar("R")
 
 
 # Classes used to represent candidate options.
@@ -275,6 +283,55 @@ SD_REPLACE = [
 ]
 
 
+# The same patterns, compiled by `_sd_compile` for the contents of the
+# lists in `_sd_key`.
+_SD_PATTERNS: list[tuple[re.Pattern[str], float]] = []
+_SD_REPLACE: list[tuple[re.Pattern[str], str]] = []
+_sd_key: tuple | None = None
+_SD_NON_ALNUM = re.compile(r"[^a-z0-9]")
+
+# The same strings are compared many times while matching: the titles of
+# the items against those of every candidate's tracks, and candidates
+# often share tracks. The normalized strings and the distances between
+# them are cached, within these bounds.
+SD_STRING_CACHE_SIZE = 8192
+SD_DIST_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=SD_STRING_CACHE_SIZE)
+def _sd_normalize(string: str) -> str:
+    """Lowercase a string, move the `SD_END_WORDS` that end it back to
+    its start and apply the `SD_REPLACE` substitutions.
+    """
+    string = string.lower()
+
+    # Don't penalize strings that move certain words to the end. For
+    # example, "the something" should be considered equal to
+    # "something, the".
+    for word in SD_END_WORDS:
+        if string.endswith(", %s" % word):
+            string = "{} {}".format(word, string[: -len(word) - 2])
+
+    # Perform a couple of basic normalizing substitutions.
+    for pat, repl in _SD_REPLACE:
+        string = pat.sub(repl, string)
+    return string
+
+
+@lru_cache(maxsize=SD_STRING_CACHE_SIZE)
+def _sd_simplify(string: str) -> str:
+    """Transliterate a string to ASCII and keep only its lowercase
+    letters and digits.
+    """
+    return _SD_NON_ALNUM.sub("", as_string(unidecode(string)).lower())
+
+
+@lru_cache(maxsize=SD_STRING_CACHE_SIZE)
+def _sd_drop_pattern(string: str, index: int) -> str:
+    """Remove the portions of a string matched by one of `SD_PATTERNS`."""
+    return _SD_PATTERNS[index][0].sub("", string)
+
+
 def _string_dist_basic(str1: str, str2: str) -> float:
     """Basic edit distance between two strings, ignoring
     non-alphanumeric characters and case. Comparisons are based on a
@@ -283,52 +340,26 @@ def _string_dist_basic(str1: str, str2: str) -> float:
     """
     assert isinstance(str1, str)
     assert isinstance(str2, str)
-    str1 = as_string(unidecode(str1))
-    str2 = as_string(unidecode(str2))
-    str1 = re.sub(r"[^a-z0-9]", "", str1.lower())
-    str2 = re.sub(r"[^a-z0-9]", "", str2.lower())
+    str1 = _sd_simplify(str1)
+    str2 = _sd_simplify(str2)
     if not str1 and not str2:
         return 0.0
     return levenshtein_distance(str1, str2) / float(max(len(str1), len(str2)))
 
 
-def string_dist(str1: str | None, str2: str | None) -> float:
-    """Gives an "intuitive" edit distance between two strings. This is
-    an edit distance, normalized by the string length, with a number of
-    tweaks that reflect intuition about text.
-    """
-    if str1 is None and str2 is None:
-        return 0.0
-    if str1 is None or str2 is None:
-        return 1.0
-
-    str1 = str1.lower()
-    str2 = str2.lower()
-
-    # Don't penalize strings that move certain words to the end. For
-    # example, "the something" should be considered equal to
-    # "something, the".
-    for word in SD_END_WORDS:
-        if str1.endswith(", %s" % word):
-            str1 = "{} {}".format(word, str1[: -len(word) - 2])
-        if str2.endswith(", %s" % word):
-            str2 = "{} {}".format(word, str2[: -len(word) - 2])
-
-    # Perform a couple of basic normalizing substitutions.
-    for pat, repl in SD_REPLACE:
-        str1 = re.sub(pat, repl, str1)
-        str2 = re.sub(pat, repl, str2)
-
+@lru_cache(maxsize=SD_DIST_CACHE_SIZE)
+def _string_dist_normalized(str1: str, str2: str) -> float:
+    """The distance between two strings normalized by `_sd_normalize`."""
     # Change the weight for certain string portions matched by a set
     # of regular expressions. We gradually change the strings and build
     # up penalties associated with parts of the string that were
     # deleted.
     base_dist = _string_dist_basic(str1, str2)
     penalty = 0.0
-    for pat, weight in SD_PATTERNS:
+    for index, (_, weight) in enumerate(_SD_PATTERNS):
         # Get strings that drop the pattern.
-        case_str1 = re.sub(pat, "", str1)
-        case_str2 = re.sub(pat, "", str2)
+        case_str1 = _sd_drop_pattern(str1, index)
+        case_str2 = _sd_drop_pattern(str2, index)
 
         if case_str1 != str1 or case_str2 != str2:
             # If the pattern was present (i.e., it is deleted in the
@@ -350,6 +381,50 @@ def string_dist(str1: str | None, str2: str | None) -> float:
     return base_dist + penalty
 
 
+def _sd_compile():
+    """Compile `SD_PATTERNS` and `SD_REPLACE` when the lists, or
+    `SD_END_WORDS`, have changed, and forget the strings and distances
+    cached with the old ones.
+    """
+    global _SD_PATTERNS, _SD_REPLACE, _sd_key
+    key = (tuple(SD_END_WORDS), tuple(SD_PATTERNS), tuple(SD_REPLACE))
+    if key == _sd_key:
+        return
+
+    _SD_PATTERNS = [(re.compile(pat), weight) for pat, weight in SD_PATTERNS]
+    _SD_REPLACE = [(re.compile(pat), repl) for pat, repl in SD_REPLACE]
+    _sd_normalize.cache_clear()
+    _sd_drop_pattern.cache_clear()
+    _string_dist_normalized.cache_clear()
+    _sd_key = key
+
+
+def string_dist(str1: str | None, str2: str | None) -> float:
+    """Gives an "intuitive" edit distance between two strings. This is
+    an edit distance, normalized by the string length, with a number of
+    tweaks that reflect intuition about text.
+    """
+    if str1 is None and str2 is None:
+        return 0.0
+    if str1 is None or str2 is None:
+        return 1.0
+
+    _sd_compile()
+    return _string_dist_normalized(_sd_normalize(str1), _sd_normalize(str2))
+
+
+def string_dist_cache_info() -> dict[str, _CacheInfo]:
+    """Get the hits and misses of the caches used by `string_dist`, by
+    the name of what they store.
+    """
+    return {
+        "normalized strings": _sd_normalize.cache_info(),
+        "simplified strings": _sd_simplify.cache_info(),
+        "pattern removals": _sd_drop_pattern.cache_info(),
+        "distances": _string_dist_normalized.cache_info(),
+    }
+
+
 @total_ordering
 class Distance:
     """Keeps track of multiple distance penalties. Provides a single
@@ -594,6 +669,93 @@ class TrackMatch(NamedTuple):
 # Aggregation of sources.
 
 
+def _lookup_pool(count: int) -> ThreadPoolExecutor | None:
+    """Get a pool of threads to run `count` lookups concurrently, or None
+    if `lookup_workers` asks for them to run one after another.
+    """
+    workers = min(config["match"]["lookup_workers"].get(int), count)
+    if workers <= 1:
+        return None
+    return ThreadPoolExecutor(workers, thread_name_prefix="lookup")
+
+
+def lookup_map(func: Callable[[A], R], args: Iterable[A]) -> Iterator[R]:
+    """Like `map`, but call `func` concurrently in a pool of
+    `lookup_workers` threads. The results are yielded in order.
+    """
+    args = list(args)
+    pool = _lookup_pool(len(args))
+    if pool is None:
+        yield from map(func, args)
+        return
+
+    try:
+        yield from pool.map(func, args)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _source_candidates(name: str, lookup: Callable[[], Iterable[R]]) -> list[R]:
+    """Get the candidates found by a source. If it fails with a
+    MusicBrainz error, log it and keep the candidates found until then.
+    """
+    log.debug("Looking up candidates from {0}", name)
+    candidates = []
+    try:
+        for candidate in lookup():
+            candidates.append(candidate)
+    except mb.MusicBrainzAPIError as exc:
+        exc.log(log)
+    return candidates
+
+
+def _gather_candidates(
+    sources: Sequence[tuple[str, Callable[[], Iterable[R]]]],
+) -> Iterator[R]:
+    """Look up the candidates of all the named sources concurrently.
+
+    The candidates are yielded as soon as the sources before them are
+    done, in the order of the sources, so that the results do not depend
+    on timing. The candidates of a source that is not done within
+    `lookup_timeout` seconds of starting are dropped, as are those of a
+    source that cannot start within that time because all the threads are
+    still busy.
+    """
+    pool = _lookup_pool(len(sources))
+    if pool is None:
+        for name, lookup in sources:
+            yield from _source_candidates(name, lookup)
+        return
+
+    timeout = config["match"]["lookup_timeout"].as_number() or None
+    started = [threading.Event() for _ in sources]
+    start_times = [0.0] * len(sources)
+
+    def run(index: int, name: str, lookup: Callable[[], Iterable[R]]):
+        start_times[index] = time.monotonic()
+        started[index].set()
+        return _source_candidates(name, lookup)
+
+    try:
+        futures = [
+            (name, pool.submit(run, index, name, lookup))
+            for index, (name, lookup) in enumerate(sources)
+        ]
+        for index, (name, future) in enumerate(futures):
+            try:
+                if timeout is None:
+                    yield from future.result()
+                elif started[index].wait(timeout):
+                    remaining = start_times[index] + timeout - time.monotonic()
+                    yield from future.result(max(remaining, 0))
+                else:
+                    raise FutureTimeoutError()
+            except FutureTimeoutError:
+                log.warning("Candidate lookup from {0} timed out", name)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 def album_for_mbid(release_id: str) -> AlbumInfo | None:
     """Get an AlbumInfo object for a MusicBrainz release ID. Return None
     if the ID is not found.
@@ -629,6 +791,29 @@ def track_for_id(_id: str) -> TrackInfo | None:
     return plugins.track_for_id(_id)
 
 
+def _plugin_candidates(
+    plugin: plugins.BeetsPlugin,
+    items: list[Item],
+    artist: str,
+    album: str,
+    va_likely: bool,
+    extra_tags: dict,
+) -> list[AlbumInfo]:
+    """Get the album candidates found by a plugin, through the metadata
+    cache if they only depend on the search terms.
+    """
+
+    def lookup() -> list[AlbumInfo]:
+        return list(
+            plugin.candidates(items, artist, album, va_likely, extra_tags)
+        )
+
+    if not plugin.cacheable_candidates:
+        return lookup()
+    key = (artist, album, va_likely, extra_tags, config_key(plugin.config))
+    return cached_lookup(plugin.name, "album search", key, lookup, default=[])
+
+
 @plugins.notify_info_yielded("albuminfo_received")
 def album_candidates(
     items: list[Item],
@@ -646,21 +831,51 @@ def album_candidates(
     constrain the search.
     """
 
+    sources: list[tuple[str, Callable[[], Iterable[AlbumInfo]]]] = []
     if config["musicbrainz"]["enabled"]:
         # Base candidates if we have album and artist to match.
         if artist and album:
-            yield from invoke_mb(
-                mb.match_album, artist, album, len(items), extra_tags
+            sources.append(
+                (
+                    "MusicBrainz",
+                    partial(
+                        mb.match_album, artist, album, len(items), extra_tags
+                    ),
+                )
             )
 
         # Also add VA matches from MusicBrainz where appropriate.
         if va_likely and album:
-            yield from invoke_mb(
-                mb.match_album, None, album, len(items), extra_tags
+            sources.append(
+                (
+                    "MusicBrainz (Various Artists)",
+                    partial(
+                        mb.match_album, None, album, len(items), extra_tags
+                    ),
+                )
             )
 
-    # Candidates from plugins.
-    yield from plugins.candidates(items, artist, album, va_likely, extra_tags)
+    # Candidates from plugins, which search for the album of the items
+    # when no album name is given.
+    if album == "":
+        album = items[0].album
+    for plugin in plugins.find_plugins():
+        sources.append(
+            (
+                plugin.name,
+                partial(
+                    _plugin_candidates,
+                    plugin,
+                    items,
+                    artist,
+                    album,
+                    va_likely,
+                    extra_tags,
+                ),
+            )
+        )
+
+    yield from _gather_candidates(sources)
 
 
 @plugins.notify_info_yielded("trackinfo_received")
@@ -670,9 +885,13 @@ def item_candidates(item: Item, artist: str, title: str) -> Iterable[tuple]:
     are specified by the user.
     """
 
+    sources: list[tuple[str, Callable[[], Iterable[TrackInfo]]]] = []
+
     # MusicBrainz candidates.
     if config["musicbrainz"]["enabled"] and artist and title:
-        yield from invoke_mb(mb.match_track, artist, title)
+        sources.append(("MusicBrainz", partial(mb.match_track, artist, title)))
+
+    yield from _gather_candidates(sources)
 
     # Plugin candidates.
     # yield from plugins.item_candidates(item, artist, title)
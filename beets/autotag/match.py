@@ -19,6 +19,7 @@ releases and tracks.
 from __future__ import annotations
 
 import datetime
+import itertools
 import re
 from enum import IntEnum
 from functools import cache
@@ -39,7 +40,7 @@ from beets.autotag import (
 from beets.util import plurality
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable, Sequence
+    from collections.abc import Callable, Iterable, Sequence
 
     from beets.library import Item
 
@@ -130,9 +131,9 @@ def assign_items(
     """
     log.debug("Computing track assignment...")
     # Construct the cost matrix.
-    costs = [[float(track_distance(i, t)) for t in tracks] for i in items]
+    costs = track_distance_matrix(items, tracks)
     # Assign items to tracks
-    _, _, assigned_item_idxs = lap.lapjv(np.array(costs), extend_cost=True)
+    _, _, assigned_item_idxs = lap.lapjv(costs, extend_cost=True)
     log.debug("...done.")
 
     # Each item in `assigned_item_idxs` list corresponds to a track in the
@@ -218,6 +219,175 @@ def track_distance(
     return dist
 
 
+def _values(values: Iterable[Any], func: Callable[[Any], Any]) -> np.ndarray:
+    """Collect a value for each item or track into an object array."""
+    return np.array([func(v) for v in values], dtype=object)
+
+
+def _defining_class(cls: type, name: str) -> type:
+    """Get the class in the MRO of `cls` that defines the attribute."""
+    return next(c for c in cls.__mro__ if name in vars(c))
+
+
+def track_distance_matrix(
+    items: Sequence[Item],
+    tracks: Sequence[TrackInfo],
+    incl_artist: bool = False,
+) -> np.ndarray:
+    """Compute the distance between each item and each track in an array
+    with a row per item and a column per track. Each distance is the same
+    as the one `track_distance` would give for the pair.
+
+    Rather than building a `Distance` for every pair, each component is
+    computed for all the pairs at once and the string distances are only
+    computed once for each distinct pair of strings.
+    """
+    shape = (len(items), len(tracks))
+    # The penalty of each component, and where it applies, in the order
+    # in which `track_distance` adds them.
+    components: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(key: str, dist: np.ndarray, present: np.ndarray):
+        present = np.broadcast_to(present.astype(bool), shape)
+        dist = np.broadcast_to(np.asarray(dist, dtype=float), shape)
+        components[key] = (np.where(present, dist, 0.0), present)
+
+    def string_dists(
+        item_strs: Sequence[str], track_strs: Sequence[str]
+    ) -> np.ndarray:
+        item_uniq = {s: n for n, s in enumerate(dict.fromkeys(item_strs))}
+        track_uniq = {s: n for n, s in enumerate(dict.fromkeys(track_strs))}
+        dists = np.array(
+            [[hooks.string_dist(i, t) for t in track_uniq] for i in item_uniq],
+            dtype=float,
+        ).reshape(len(item_uniq), len(track_uniq))
+        return dists[
+            np.ix_(
+                [item_uniq[s] for s in item_strs],
+                [track_uniq[s] for s in track_strs],
+            )
+        ]
+
+    # Length.
+    item_lengths = np.array([i.length for i in items], dtype=float)
+    info_lengths = np.array([t.length or 0 for t in tracks], dtype=float)
+    diff = np.abs(item_lengths[:, None] - info_lengths) - (
+        get_track_length_grace()
+    )
+    length_max = get_track_length_max()
+    if length_max:
+        length_dist = np.maximum(np.minimum(diff, length_max), 0) / length_max
+    else:
+        length_dist = np.zeros(shape)
+    add("track_length", length_dist, info_lengths != 0)
+
+    # Title.
+    add(
+        "track_title",
+        string_dists([i.title for i in items], [t.title for t in tracks]),
+        np.ones(shape),
+    )
+
+    # Artist.
+    if incl_artist:
+        add(
+            "track_artist",
+            string_dists([i.artist for i in items], [t.artist for t in tracks]),
+            _values(items, lambda i: i.artist.lower() not in VA_ARTISTS)[
+                :, None
+            ]
+            & _values(tracks, lambda t: bool(t.artist)),
+        )
+
+    # Track index.
+    item_tracks = _values(items, lambda i: i.track)[:, None]
+    add(
+        "track_index",
+        (item_tracks != _values(tracks, lambda t: t.medium_index))
+        & (item_tracks != _values(tracks, lambda t: t.index)),
+        _values(items, lambda i: bool(i.track))[:, None]
+        & _values(tracks, lambda t: bool(t.index)),
+    )
+
+    # Track ID.
+    item_trackids = _values(items, lambda i: i.mb_trackid)[:, None]
+    add(
+        "track_id",
+        item_trackids != _values(tracks, lambda t: t.track_id),
+        _values(items, lambda i: bool(i.mb_trackid))[:, None],
+    )
+
+    # Medium.
+    add(
+        "medium",
+        _values(items, lambda i: i.disc)[:, None]
+        != _values(tracks, lambda t: t.medium),
+        _values(items, lambda i: bool(i.disc))[:, None]
+        & _values(tracks, lambda t: bool(t.medium)),
+    )
+
+    # Plugins that only penalize the tracks of their data source add a
+    # component for each of them; the others are asked for every pair.
+    pair_plugins = []
+    sources = []
+    for plugin in plugins.find_plugins():
+        cls = type(plugin)
+        if cls.track_distance is plugins.BeetsPlugin.track_distance:
+            continue
+        source_weight = plugin.track_source_weight()
+        if source_weight is not None and issubclass(
+            _defining_class(cls, "track_source_weight"),
+            _defining_class(cls, "track_distance"),
+        ):
+            sources.append(source_weight)
+        else:
+            pair_plugins.append(plugin)
+    source_components = [
+        (
+            np.full(shape, weight),
+            np.broadcast_to(
+                _values(tracks, lambda t: t.data_source == data_source),
+                shape,
+            ).astype(bool),
+        )
+        for data_source, weight in sources
+    ]
+
+    # Sum the weighted components like `Distance.distance` does.
+    weights = hooks.Distance._weights
+    raw = np.zeros(shape)
+    max_dist = np.zeros(shape)
+    for key, (dist, present) in components.items():
+        raw += dist * weights[key]
+        max_dist += present * weights[key]
+    for dist, present in source_components:
+        raw += np.where(present, dist, 0.0) * weights["source"]
+        max_dist += present * weights["source"]
+    costs = np.divide(raw, max_dist, out=np.zeros(shape), where=max_dist != 0)
+
+    # Only the pairs to which the other plugins add penalties need a
+    # `Distance`.
+    if pair_plugins:
+        for (i, item), (j, track) in itertools.product(
+            enumerate(items), enumerate(tracks)
+        ):
+            plugin_dist = hooks.Distance()
+            for plugin in pair_plugins:
+                plugin_dist.update(plugin.track_distance(item, track))
+            if plugin_dist._penalties:
+                dist = hooks.Distance()
+                for key, (penalties, present) in components.items():
+                    if present[i, j]:
+                        dist.add(key, penalties[i, j])
+                for penalties, present in source_components:
+                    if present[i, j]:
+                        dist.add("source", penalties[i, j])
+                dist.update(plugin_dist)
+                costs[i, j] = dist.distance
+
+    return costs
+
+
 def distance(
     items: Sequence[Item],
     album_info: AlbumInfo,
@@ -509,9 +679,9 @@ def tag_album(
 
     # Search by explicit ID.
     if search_ids:
-        for search_id in search_ids:
-            log.debug("Searching for album ID: {0}", search_id)
-            if info := hooks.album_for_id(search_id):
+        log.debug("Searching for album IDs: {0}", ", ".join(search_ids))
+        for info in hooks.lookup_map(hooks.album_for_id, search_ids):
+            if info:
                 _add_candidate(items, candidates, info)
 
     # Use existing metadata or text search.
@@ -28,6 +28,7 @@ import musicbrainzngs
 import beets
 import beets.autotag.hooks
 from beets import config, logging, plugins, util
+from beets.autotag.cache import cached_lookup, config_key
 from beets.plugins import MetadataSourcePlugin
 from beets.util.id_extractors import (
     beatport_id_regex,
@@ -714,6 +715,21 @@ def match_album(
     if not any(criteria.values()):
         return
 
+    # The search result is missing some data (namely, the tracks),
+    # so we just use the IDs and fetch the rest of the information.
+    release_ids = cached_lookup(
+        "musicbrainz",
+        "release search",
+        (criteria, config_key(config["musicbrainz"])),
+        lambda: _search_release_ids(criteria),
+        default=[],
+    )
+    for albuminfo in beets.autotag.hooks.lookup_map(album_for_id, release_ids):
+        if albuminfo is not None:
+            yield albuminfo
+
+
+def _search_release_ids(criteria: dict[str, str]) -> list[str]:
     try:
         log.debug("Searching for MusicBrainz releases with: {!r}", criteria)
         res = musicbrainzngs.search_releases(
@@ -723,12 +739,7 @@ def match_album(
         raise MusicBrainzAPIError(
             exc, "release search", criteria, traceback.format_exc()
         )
-    for release in res["release-list"]:
-        # The search result is missing some data (namely, the tracks),
-        # so we just use the ID and fetch the rest of the information.
-        albuminfo = album_for_id(release["id"])
-        if albuminfo is not None:
-            yield albuminfo
+    return [release["id"] for release in res["release-list"]]
 
 
 def match_track(
@@ -746,6 +757,18 @@ def match_track(
     if not any(criteria.values()):
         return
 
+    recordings = cached_lookup(
+        "musicbrainz",
+        "recording search",
+        (criteria, config_key(config["musicbrainz"])),
+        lambda: _search_recordings(criteria),
+        default=[],
+    )
+    for recording in recordings:
+        yield track_info(recording)
+
+
+def _search_recordings(criteria: dict[str, str]) -> list[dict[str, Any]]:
     try:
         res = musicbrainzngs.search_recordings(
             limit=config["musicbrainz"]["searchlimit"].get(int), **criteria
@@ -754,8 +777,7 @@ def match_track(
         raise MusicBrainzAPIError(
             exc, "recording search", criteria, traceback.format_exc()
         )
-    for recording in res["recording-list"]:
-        yield track_info(recording)
+    return res["recording-list"]
 
 
 def _parse_id(s: str) -> str | None:
@@ -843,6 +865,13 @@ def album_for_id(releaseid: str) -> beets.autotag.hooks.AlbumInfo | None:
     if not albumid:
         log.debug("Invalid MBID ({0}).", releaseid)
         return None
+    key = (albumid, config_key(config["musicbrainz"]))
+    return cached_lookup(
+        "musicbrainz", "album", key, lambda: _fetch_album(albumid)
+    )
+
+
+def _fetch_album(albumid: str) -> beets.autotag.hooks.AlbumInfo | None:
     try:
         res = musicbrainzngs.get_release_by_id(albumid, RELEASE_INCLUDES)
 
@@ -879,6 +908,13 @@ def track_for_id(releaseid: str) -> beets.autotag.hooks.TrackInfo | None:
     if not trackid:
         log.debug("Invalid MBID ({0}).", releaseid)
         return None
+    key = (trackid, config_key(config["musicbrainz"]))
+    return cached_lookup(
+        "musicbrainz", "track", key, lambda: _fetch_track(trackid)
+    )
+
+
+def _fetch_track(trackid: str) -> beets.autotag.hooks.TrackInfo | None:
     try:
         res = musicbrainzngs.get_recording_by_id(trackid, TRACK_INCLUDES)
     except musicbrainzngs.ResponseError:
@@ -22,11 +22,21 @@ import re
 import sqlite3
 import threading
 import time
+import weakref
 from abc import ABC
 from collections import defaultdict
 from collections.abc import Generator, Iterable, Iterator, Mapping, Sequence
+from functools import cached_property
 from sqlite3 import Connection
-from typing import TYPE_CHECKING, Any, AnyStr, Callable, Generic, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AnyStr,
+    Callable,
+    Generic,
+    NamedTuple,
+    TypeVar,
+)
 
 from unidecode import unidecode
 
@@ -37,6 +47,7 @@ from . import types
 from .query import (
     FieldQueryType,
     FieldSort,
+    FlexAttrSource,
     MatchQuery,
     NullSort,
     Query,
@@ -90,14 +101,37 @@ class FormattedMapping(Mapping[str, str]):
     ):
         self.for_path = for_path
         self.model = model
-        if included_keys == self.ALL_KEYS:
-            # Performance note: this triggers a database query.
-            self.model_keys = self.model.keys(True)
-        else:
+        self.included_keys = included_keys
+        if included_keys != self.ALL_KEYS:
             self.model_keys = included_keys
 
+    @cached_property
+    def model_keys(self) -> Sequence[str]:
+        # Performance note: this loads the flexible attributes.
+        return self.model.keys(True)
+
+    def _has_key(self, key: str) -> bool:
+        """Check whether `key` is included in the mapping without
+        listing all the keys of the model.
+        """
+        if self.included_keys == self.ALL_KEYS:
+            return self._model_has_key(self.model, key)
+        return key in self.model_keys
+
+    @staticmethod
+    def _model_has_key(model: Model, key: str) -> bool:
+        """Check whether `model` has a value for `key`, only loading the
+        flexible attributes when `key` is neither a fixed nor a computed
+        field.
+        """
+        return (
+            key in model._fields
+            or key in model._getters()
+            or key in model._values_flex
+        )
+
     def __getitem__(self, key: str) -> str:
-        if key in self.model_keys:
+        if self._has_key(key):
             return self._get_formatted(self.model, key)
         else:
             raise KeyError(key)
@@ -120,14 +154,23 @@ class FormattedMapping(Mapping[str, str]):
             default = self.model._type(key).format(None)
         return super().get(key, default)
 
+    @cached_property
+    def _sep_replacements(self) -> tuple[str, str]:
+        """The replacements for path and drive separators, which are read
+        from the configuration once per mapping.
+        """
+        return (
+            beets.config["path_sep_replace"].as_str(),
+            beets.config["drive_sep_replace"].as_str(),
+        )
+
     def _get_formatted(self, model: Model, key: str) -> str:
         value = model._type(key).format(model.get(key))
         if isinstance(value, bytes):
             value = value.decode("utf-8", "ignore")
 
         if self.for_path:
-            sep_repl: str = beets.config["path_sep_replace"].as_str()
-            sep_drive: str = beets.config["drive_sep_replace"].as_str()
+            sep_repl, sep_drive = self._sep_replacements
 
             if re.match(r"^\w:", value):
                 value = re.sub(r"(?<=^\w):", sep_drive, value)
@@ -154,11 +197,11 @@ class LazyConvertDict:
     def __init__(self, model_cls: Model):
         """Initialize the object empty"""
         # FIXME: Dict[str, SQLiteType]
-        self._data: dict[str, Any] = {}
+        self._data: Any = {}
         self.model_cls = model_cls
         self._converted: dict[str, Any] = {}
 
-    def init(self, data: dict[str, Any]):
+    def init(self, data: Mapping[str, Any]):
         """Set the base data that should be lazily converted"""
         self._data = data
 
@@ -242,6 +285,94 @@ class LazyConvertDict:
         return len(self._converted) + len(self._data)
 
 
+class Index(NamedTuple):
+    """A SQLite index over one or more columns of a table."""
+
+    table: str
+    columns: tuple[str, ...]
+
+    @property
+    def name(self) -> str:
+        """The name beets gives to this index in the database."""
+        return "{}_by_{}".format(self.table, "_".join(self.columns))
+
+
+class FlexAttrsBatch:
+    """The flexible attributes of a batch of entities, fetched from the
+    database with a single query when they are first needed.
+    """
+
+    def __init__(self, db: Database, flex_table: str, ids: list[int]):
+        self.db = db
+        self.flex_table = flex_table
+        self.ids = ids
+        self._attrs: dict[int, FlexAttrs] | None = None
+
+    def _load(self) -> dict[int, FlexAttrs]:
+        """Index the flexible attributes of the batch by entity id."""
+        flex_values: dict[int, FlexAttrs] = {id: {} for id in self.ids}
+        with self.db.transaction() as tx:
+            rows = tx.query(
+                "SELECT entity_id, key, value "
+                f"FROM {self.flex_table} "
+                f"WHERE entity_id IN ({', '.join('?' * len(self.ids))})",
+                self.ids,
+            )
+        for row in rows:
+            flex_values[row["entity_id"]][row["key"]] = row["value"]
+        return flex_values
+
+    def get(self, entity_id: int) -> FlexAttrs:
+        """Get the flexible attributes of an entity in the batch."""
+        if self._attrs is None:
+            self._attrs = self._load()
+        return self._attrs.get(entity_id, {})
+
+
+class LazyFlexAttrs:
+    """The flexible attributes of a single entity, which are taken from
+    its `FlexAttrsBatch` on first access. This is the base data of a
+    model's `LazyConvertDict` for flexible attributes.
+    """
+
+    def __init__(self, batch: FlexAttrsBatch, entity_id: int):
+        self._batch: FlexAttrsBatch | None = batch
+        self._entity_id = entity_id
+        self._attrs: FlexAttrs = {}
+
+    @property
+    def attrs(self) -> FlexAttrs:
+        if self._batch is not None:
+            self._attrs = self._batch.get(self._entity_id)
+            self._batch = None
+        return self._attrs
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.attrs
+
+    def __getitem__(self, key: str) -> str:
+        return self.attrs[key]
+
+    def __delitem__(self, key: str):
+        del self.attrs[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.attrs)
+
+    def __len__(self) -> int:
+        return len(self.attrs)
+
+    def keys(self):
+        return self.attrs.keys()
+
+    def copy(self) -> FlexAttrs:
+        return self.attrs.copy()
+
+    def __reduce__(self):
+        # Pickle the loaded attributes rather than the database handle.
+        return dict, (self.attrs,)
+
+
 # Abstract base for model classes.
 
 
@@ -303,6 +434,12 @@ class Model(ABC, Generic[D]):
     do not relate to any specific field.
     """
 
+    _indexes: Sequence[tuple[str, ...]] = ()
+    """Column tuples of the fixed fields to index in the main table.
+    Each tuple becomes a (possibly composite) index that is created
+    when the database is opened.
+    """
+
     _always_dirty = False
     """By default, fields only become "dirty" when their value actually
     changes. Enabling this flag marks fields as dirty even when the new
@@ -340,6 +477,13 @@ class Model(ABC, Generic[D]):
         """Fields in the related table."""
         return cls._relation._fields.keys() - cls.shared_db_fields
 
+    @cached_classproperty
+    def flex_attr_sources(cls) -> list[FlexAttrSource]:
+        """The flexible attribute tables consulted, in order, when a
+        query looks up a flexible field of this model in SQL.
+        """
+        return [FlexAttrSource(cls._flex_table, f"{cls._table}.id")]
+
     @classmethod
     def _getters(cls: type[Model]):
         """Return a mapping from field names to getter functions."""
@@ -374,12 +518,14 @@ class Model(ABC, Generic[D]):
         cls: type[AnyModel],
         db: D | None = None,
         fixed_values: dict[str, Any] = {},
-        flex_values: dict[str, Any] = {},
+        flex_values: Mapping[str, Any] = {},
     ) -> AnyModel:
         """Create an object with values drawn from the database.
 
         This is a performance optimization: the checks involved with
-        ordinary construction are bypassed.
+        ordinary construction are bypassed. `flex_values` may be a
+        `LazyFlexAttrs` mapping, in which case the flexible attributes
+        are only fetched when they are first accessed.
         """
         obj = cls(db)
 
@@ -581,42 +727,25 @@ class Model(ABC, Generic[D]):
             fields = self._fields
         db = self._check_db()
 
-        # Build assignments for query.
-        assignments = []
-        subvars: list[SQLiteType] = []
+        # Collect the changed values.
+        fixed: dict[str, SQLiteType] = {}
         for key in fields:
             if key != "id" and key in self._dirty:
                 self._dirty.remove(key)
-                assignments.append(key + "=?")
-                value = self._type(key).to_sql(self[key])
-                subvars.append(value)
+                fixed[key] = self._type(key).to_sql(self[key])
 
-        with db.transaction() as tx:
-            # Main table update.
-            if assignments:
-                query = "UPDATE {} SET {} WHERE id=?".format(
-                    self._table, ",".join(assignments)
-                )
-                subvars.append(self.id)
-                tx.mutate(query, subvars)
-
-            # Modified/added flexible attributes.
-            for key, value in self._values_flex.items():
-                if key in self._dirty:
-                    self._dirty.remove(key)
-                    tx.mutate(
-                        "INSERT INTO {} "
-                        "(entity_id, key, value) "
-                        "VALUES (?, ?, ?);".format(self._flex_table),
-                        (self.id, key, value),
-                    )
-
-            # Deleted flexible attributes.
-            for key in self._dirty:
-                tx.mutate(
-                    f"DELETE FROM {self._flex_table} WHERE entity_id=? AND key=?",
-                    (self.id, key),
-                )
+        # Modified/added flexible attributes.
+        flex = {}
+        for key, value in self._values_flex.items():
+            if key in self._dirty:
+                self._dirty.remove(key)
+                flex[key] = value
+
+        # Deleted flexible attributes.
+        deleted = list(self._dirty)
+
+        with db.write_batch() as batch:
+            batch.store(self, fixed, flex, deleted)
 
         self.clear_dirty()
 
@@ -658,14 +787,15 @@ class Model(ABC, Generic[D]):
             self._db = db
         db = self._check_db(False)
 
-        with db.transaction() as tx:
-            new_id = tx.mutate(f"INSERT INTO {self._table} DEFAULT VALUES")
-            self.id = new_id
+        with db.write_batch() as batch:
+            self.id = batch.new_id(self._table)
+            self._dirty.discard("id")
             self.added = time.time()
 
-            # Mark every non-null field as dirty and store.
-            for key in self:
-                if self[key] is not None:
+            # Mark every non-null field as dirty and store, which queues
+            # the insertion of the row in the batch.
+            for key in (*self._fields, *self._values_flex):
+                if key != "id" and self[key] is not None:
                     self._dirty.add(key)
             self.store()
 
@@ -737,12 +867,15 @@ class Results(Generic[AnyModel]):
     constructs Model objects that reflect database rows.
     """
 
+    chunk_size = 256
+    """The number of rows pulled from the database cursor at a time.
+    """
+
     def __init__(
         self,
         model_class: type[AnyModel],
-        rows: list[sqlite3.Row],
+        rows: Iterable[sqlite3.Row],
         db: D,
-        flex_rows,
         query: Query | None = None,
         sort=None,
     ):
@@ -750,8 +883,13 @@ class Results(Generic[AnyModel]):
         `model_class`.
 
         `model_class` is a subclass of `Model` that will be
-        constructed. `rows` is a query result: a list of mappings. The
-        new objects will be associated with the database `db`.
+        constructed. `rows` is a query result: either a list of mappings
+        or a live `sqlite3.Cursor`, from which rows are then pulled in
+        chunks as the results are consumed. The new objects will be
+        associated with the database `db`.
+
+        The flexible attributes of the objects are fetched in batches of
+        `chunk_size` rows, when one object of the batch first needs them.
 
         If `query` is provided, it is used as a predicate to filter the
         results for a "slow query" that cannot be evaluated by the
@@ -761,22 +899,97 @@ class Results(Generic[AnyModel]):
         one.
         """
         self.model_class = model_class
-        self.rows = rows
         self.db = db
         self.query = query
         self.sort = sort
-        self.flex_rows = flex_rows
 
-        # We keep a queue of rows we haven't yet consumed for
-        # materialization. We preserve the original total number of
-        # rows.
-        self._rows = rows
-        self._row_count = len(rows)
+        # We keep a buffer of rows we haven't yet consumed for
+        # materialization along with a pointer to the next row to
+        # consume. When the buffer runs dry, the next chunk is fetched
+        # from the cursor, if any.
+        self._cursor: sqlite3.Cursor | None
+        if isinstance(rows, list):
+            self._rows = rows
+            self._cursor = None
+        else:
+            self._rows = []
+            self._cursor = rows
+            db._register_stream(self)
+        self._row_index = 0
+
+        # The flexible attribute batch covering the buffered rows up to
+        # (but excluding) `_flex_batch_end`.
+        self._flex_batch: FlexAttrsBatch | None = None
+        self._flex_batch_end = 0
 
         # The materialized objects corresponding to rows that have been
         # consumed.
         self._objects: list[AnyModel] = []
 
+    @property
+    def _exhausted(self) -> bool:
+        """Whether every row has been consumed for materialization."""
+        return self._cursor is None and self._row_index >= len(self._rows)
+
+    def _next_row(self) -> sqlite3.Row | None:
+        """Consume the next row, fetching another chunk from the cursor
+        if the buffer is empty. Return None if no rows are left.
+        """
+        if self._row_index >= len(self._rows) and self._cursor is not None:
+            self._fetch_chunk()
+
+        if self._row_index < len(self._rows):
+            if self._row_index >= self._flex_batch_end:
+                self._start_flex_batch()
+            row = self._rows[self._row_index]
+            self._row_index += 1
+            return row
+        return None
+
+    def _start_flex_batch(self):
+        """Set up the flexible attribute batch for the next `chunk_size`
+        buffered rows, starting at the current row.
+        """
+        end = self._row_index + self.chunk_size
+        ids = [row["id"] for row in self._rows[self._row_index : end]]
+        self._flex_batch = FlexAttrsBatch(
+            self.db, self.model_class._flex_table, ids
+        )
+        self._flex_batch_end = end
+
+    def _fetch_chunk(self):
+        """Replace the (consumed) row buffer with the next chunk of rows
+        from the cursor.
+        """
+        with self.db.transaction():
+            # Waiting for the transaction may have drained the cursor.
+            if self._cursor is None:
+                return
+            rows = self._cursor.fetchmany(self.chunk_size)
+
+        self._rows = rows
+        self._row_index = 0
+        self._flex_batch_end = 0
+        if len(rows) < self.chunk_size:
+            self._close_cursor()
+
+    def _drain(self):
+        """Buffer all the remaining rows of the cursor and close it,
+        releasing its hold on the database.
+        """
+        if self._cursor is not None:
+            self._rows = self._rows[self._row_index :]
+            self._rows.extend(self._cursor.fetchall())
+            self._row_index = 0
+            self._flex_batch_end = 0
+            self._close_cursor()
+
+    def _close_cursor(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+            self.db._unregister_stream(self)
+
     def _get_objects(self) -> Iterator[AnyModel]:
         """Construct and generate Model objects for they query. The
         objects are returned in the order emitted from the database; no
@@ -787,30 +1000,24 @@ class Results(Generic[AnyModel]):
         a `Results` object a second time should be much faster than the
         first.
         """
-
-        # Index flexible attributes by the item ID, so we have easier access
-        flex_attrs = self._get_indexed_flex_attrs()
-
         index = 0  # Position in the materialized objects.
-        while index < len(self._objects) or self._rows:
+        while True:
             # Are there previously-materialized objects to produce?
             if index < len(self._objects):
                 yield self._objects[index]
                 index += 1
-
-            # Otherwise, we consume another row, materialize its object
-            # and produce it.
-            else:
-                while self._rows:
-                    row = self._rows.pop(0)
-                    obj = self._make_model(row, flex_attrs.get(row["id"], {}))
-                    # If there is a slow-query predicate, ensurer that the
-                    # object passes it.
-                    if not self.query or self.query.match(obj):
-                        self._objects.append(obj)
-                        index += 1
-                        yield obj
-                        break
+                continue
+
+            # Otherwise, we consume another row and materialize its
+            # object, which is produced on the next pass.
+            row = self._next_row()
+            if row is None:
+                return
+            obj = self._make_model(row)
+            # If there is a slow-query predicate, ensurer that the
+            # object passes it.
+            if not self.query or self.query.match(obj):
+                self._objects.append(obj)
 
     def __iter__(self) -> Iterator[AnyModel]:
         """Construct and generate Model objects for all matching
@@ -825,23 +1032,12 @@ class Results(Generic[AnyModel]):
             # Objects are pre-sorted (i.e., by the database).
             return self._get_objects()
 
-    def _get_indexed_flex_attrs(self) -> dict[int, FlexAttrs]:
-        """Index flexible attributes by the entity id they belong to"""
-        flex_values: dict[int, FlexAttrs] = {}
-        for row in self.flex_rows:
-            if row["entity_id"] not in flex_values:
-                flex_values[row["entity_id"]] = {}
-
-            flex_values[row["entity_id"]][row["key"]] = row["value"]
-
-        return flex_values
-
-    def _make_model(
-        self, row: sqlite3.Row, flex_values: FlexAttrs = {}
-    ) -> AnyModel:
-        """Create a Model object for the given row"""
+    def _make_model(self, row: sqlite3.Row) -> AnyModel:
+        """Create a Model object for the row that was consumed last"""
+        assert self._flex_batch is not None
         cols = dict(row)
         values = {k: v for (k, v) in cols.items() if not k[:4] == "flex"}
+        flex_values = LazyFlexAttrs(self._flex_batch, row["id"])
 
         # Construct the Python object
         obj = self.model_class._awaken(self.db, values, flex_values)
@@ -849,7 +1045,7 @@ class Results(Generic[AnyModel]):
 
     def __len__(self) -> int:
         """Get the number of matching objects."""
-        if not self._rows:
+        if self._exhausted:
             # Fully materialized. Just count the objects.
             return len(self._objects)
 
@@ -862,7 +1058,9 @@ class Results(Generic[AnyModel]):
 
         else:
             # A fast query. Just count the rows.
-            return self._row_count
+            with self.db.transaction():
+                self._drain()
+            return len(self._objects) + len(self._rows) - self._row_index
 
     def __nonzero__(self) -> bool:
         """Does this result contain any objects?"""
@@ -876,7 +1074,7 @@ class Results(Generic[AnyModel]):
         """Get the nth item in this result set. This is inefficient: all
         items up to n are materialized and thrown away.
         """
-        if not self._rows and not self.sort:
+        if self._exhausted and not self.sort:
             # Fully materialized and already in order. Just look up the
             # object.
             return self._objects[n]
@@ -910,8 +1108,14 @@ class Transaction:
     current transaction.
     """
 
+    _locked = False
+    """Whether this root transaction holds the database lock. With
+    concurrent reads enabled, the lock is only taken on the first write.
+    """
+
     def __init__(self, db: Database):
         self.db = db
+        self._root = self
 
     def __enter__(self) -> Transaction:
         """Begin a transaction. This transaction may be created while
@@ -919,13 +1123,30 @@ class Transaction:
         """
         with self.db._tx_stack() as stack:
             first = not stack
+            if not first:
+                self._root = stack[0]
             stack.append(self)
-        if first:
+        if first and not self.db.concurrent_reads:
             # Beginning a "root" transaction, which corresponds to an
             # SQLite transaction.
-            self.db._db_lock.acquire()
+            self._lock()
         return self
 
+    def _lock(self):
+        """Acquire the database lock for the root transaction, unless it
+        already holds it.
+        """
+        root = self._root
+        if root._locked:
+            return
+        if self.db.concurrent_reads:
+            # Our streaming cursors read from an older snapshot, which
+            # SQLite refuses to turn into a write transaction if another
+            # connection has committed since.
+            self.db._drain_streams()
+        self.db._db_lock.acquire()
+        root._locked = True
+
     def __exit__(
         self,
         exc_type: type[Exception],
@@ -936,8 +1157,10 @@ class Transaction:
         entered but not yet exited transaction. If it is the last active
         transaction, the database updates are committed.
         """
-        # Beware of races; currently secured by db._db_lock
-        self.db.revision += self._mutated
+        # Beware of races; secured by db._db_lock, which every writing
+        # transaction holds.
+        if self._mutated:
+            self.db.revision += 1
         with self.db._tx_stack() as stack:
             assert stack.pop() is self
             empty = not stack
@@ -945,7 +1168,9 @@ class Transaction:
             # Ending a "root" transaction. End the SQLite transaction.
             self.db._connection().commit()
             self._mutated = False
-            self.db._db_lock.release()
+            if self._locked:
+                self._locked = False
+                self.db._db_lock.release()
 
     def query(
         self, statement: str, subvals: Sequence[SQLiteType] = ()
@@ -953,15 +1178,61 @@ class Transaction:
         """Execute an SQL statement with substitution values and return
         a list of rows from the database.
         """
-        cursor = self.db._connection().execute(statement, subvals)
-        return cursor.fetchall()
+        return self.cursor(statement, subvals).fetchall()
+
+    def cursor(
+        self, statement: str, subvals: Sequence[SQLiteType] = ()
+    ) -> sqlite3.Cursor:
+        """Execute an SQL statement with substitution values and return
+        the live cursor, from which rows can be fetched incrementally.
+        """
+        self._flush_batch()
+        return self.db._connection().execute(statement, subvals)
 
     def mutate(self, statement: str, subvals: Sequence[SQLiteType] = ()) -> Any:
         """Execute an SQL statement with substitution values and return
         the row ID of the last affected row.
         """
-        try:
+        self._lock()
+        self._flush_batch()
+        with self._access_errors():
             cursor = self.db._connection().execute(statement, subvals)
+        self._mutated = True
+        return cursor.lastrowid
+
+    def mutate_many(
+        self, statement: str, subvals_seq: Iterable[Sequence[SQLiteType]]
+    ):
+        """Execute an SQL statement once for every sequence of
+        substitution values in `subvals_seq`.
+        """
+        self._lock()
+        self._flush_batch()
+        with self._access_errors():
+            self.db._connection().executemany(statement, subvals_seq)
+        self._mutated = True
+
+    def script(self, statements: str):
+        """Execute a string containing multiple SQL statements."""
+        # We don't know whether this mutates, but quite likely it does.
+        self._lock()
+        self._flush_batch()
+        self._mutated = True
+        self.db._connection().executescript(statements)
+
+    def _flush_batch(self):
+        """Write the changes queued in the thread's write batch, if any,
+        so that the next statement sees them.
+        """
+        batch = self.db._write_batch()
+        if batch:
+            batch._write(self)
+
+    @contextlib.contextmanager
+    def _access_errors(self) -> Generator[None]:
+        """Surface errors accessing the database file as `DBAccessError`."""
+        try:
+            yield
         except sqlite3.OperationalError as e:
             # In two specific cases, SQLite reports an error while accessing
             # the underlying database file. We surface these exceptions as
@@ -973,15 +1244,143 @@ class Transaction:
                 raise DBAccessError(e.args[0])
             else:
                 raise
-        else:
-            self._mutated = True
-            return cursor.lastrowid
 
-    def script(self, statements: str):
-        """Execute a string containing multiple SQL statements."""
-        # We don't know whether this mutates, but quite likely it does.
-        self._mutated = True
-        self.db._connection().executescript(statements)
+
+class WriteBatch:
+    """A unit of work that collects the changes of stored models and
+    writes them with a few `executemany` statements, one for each table
+    and set of changed fields.
+
+    Use :meth:`Database.write_batch` to get one. While it is active,
+    :meth:`Model.store` queues the changes in the batch, and
+    :meth:`Model.add` the new rows, whose IDs are allocated up front.
+    They are written before the thread executes any other statement, so
+    reads still see them, and committed together when the batch ends.
+    """
+
+    flush_size = 1000
+    """The number of queued rows after which they are written."""
+
+    _DELETED = object()
+    """Marks a queued deletion of a flexible attribute."""
+
+    def __init__(self, db: Database):
+        self.db = db
+        # Fixed field values by table and row ID.
+        self._fixed: dict[tuple[str, int], dict[str, SQLiteType]] = {}
+        # The keys of `_fixed` for the rows that are to be inserted.
+        self._new: set[tuple[str, int]] = set()
+        # Flexible attribute values by table, entity ID and key.
+        self._flex: dict[tuple[str, int, str], Any] = {}
+        # The next free row ID of each table, while nothing else writes.
+        self._next_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._fixed) + len(self._flex)
+
+    def new_id(self, table: str) -> int:
+        """Allocate the ID of a row to be inserted into `table`.
+
+        The transaction of the batch takes the database lock and begins
+        writing, so that no other thread or process can insert rows until
+        the batch ends. The IDs are allocated again after any other
+        statement of this thread.
+        """
+        if table not in self._next_ids:
+            with self.db.transaction() as tx:
+                tx._lock()
+                conn = self.db._connection()
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                ((max_id,),) = tx.query(f"SELECT MAX(id) FROM {table}")
+            self._next_ids[table] = (max_id or 0) + 1
+        new_id = self._next_ids[table]
+        self._next_ids[table] += 1
+        self._new.add((table, new_id))
+        self._fixed[table, new_id] = {}
+        return new_id
+
+    def store(
+        self,
+        model: Model,
+        fixed: Mapping[str, SQLiteType],
+        flex: Mapping[str, Any],
+        deleted: Iterable[str] = (),
+    ):
+        """Queue changed fixed fields, flexible attributes and deleted
+        flexible attributes of `model`. Later changes to the same field
+        replace earlier ones.
+        """
+        if fixed:
+            self._fixed.setdefault((model._table, model.id), {}).update(fixed)
+        for key, value in flex.items():
+            self._flex[model._flex_table, model.id, key] = value
+        for key in deleted:
+            self._flex[model._flex_table, model.id, key] = self._DELETED
+
+        if len(self) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued changes in a transaction."""
+        if self:
+            with self.db.transaction() as tx:
+                self._write(tx)
+
+    def _write(self, tx: Transaction):
+        """Write all queued changes using the transaction `tx`."""
+        # The statement that follows may insert rows itself.
+        self._next_ids.clear()
+        if not self:
+            return
+        fixed, self._fixed = self._fixed, {}
+        new, self._new = self._new, set()
+        flex, self._flex = self._flex, {}
+
+        # Group the rows with the same fields into a statement, inserting
+        # the new rows first so that later statements can find them.
+        inserts: defaultdict[tuple[str, tuple[str, ...]], list[list[Any]]]
+        inserts = defaultdict(list)
+        updates: defaultdict[tuple[str, tuple[str, ...]], list[list[Any]]]
+        updates = defaultdict(list)
+        for (table, id), values in fixed.items():
+            keys = tuple(sorted(values))
+            rows = inserts if (table, id) in new else updates
+            rows[table, keys].append([*(values[k] for k in keys), id])
+        for (table, keys), rows in inserts.items():
+            tx.mutate_many(
+                "INSERT INTO {} ({}) VALUES ({})".format(
+                    table,
+                    ",".join([*keys, "id"]),
+                    ",".join("?" * (len(keys) + 1)),
+                ),
+                rows,
+            )
+        for (table, keys), rows in updates.items():
+            tx.mutate_many(
+                "UPDATE {} SET {} WHERE id=?".format(
+                    table, ",".join(f"{key}=?" for key in keys)
+                ),
+                rows,
+            )
+
+        flex_inserts: defaultdict[str, list[tuple[int, str, Any]]]
+        flex_inserts = defaultdict(list)
+        deletes: defaultdict[str, list[tuple[int, str]]] = defaultdict(list)
+        for (table, id, key), value in flex.items():
+            if value is self._DELETED:
+                deletes[table].append((id, key))
+            else:
+                flex_inserts[table].append((id, key, value))
+        for table, flex_rows in flex_inserts.items():
+            tx.mutate_many(
+                f"INSERT INTO {table} (entity_id, key, value) VALUES (?, ?, ?)",
+                flex_rows,
+            )
+        for table, keys_rows in deletes.items():
+            tx.mutate_many(
+                f"DELETE FROM {table} WHERE entity_id=? AND key=?", keys_rows
+            )
 
 
 class Database:
@@ -1001,7 +1400,9 @@ class Database:
     data is written in a transaction.
     """
 
-    def __init__(self, path, timeout: float = 5.0):
+    def __init__(
+        self, path, timeout: float = 5.0, concurrent_reads: bool = False
+    ):
         if sqlite3.threadsafety == 0:
             raise RuntimeError(
                 "sqlite3 must be compiled with multi-threading support"
@@ -1009,13 +1410,25 @@ class Database:
 
         self.path = path
         self.timeout = timeout
+        self.concurrent_reads = concurrent_reads
 
         self._connections: dict[int, sqlite3.Connection] = {}
         self._tx_stacks: defaultdict[int, list[Transaction]] = defaultdict(list)
         self._extensions: list[str] = []
 
-        # A lock to protect the _connections and _tx_stacks maps, which
-        # both map thread IDs to private resources.
+        # Result sets that are still reading rows from a cursor on a
+        # thread's connection, which only happens with `concurrent_reads`.
+        # An open cursor reads from a snapshot of the database, so these
+        # are drained before the thread starts writing.
+        self._streams: defaultdict[int, weakref.WeakSet[Results]] = defaultdict(
+            weakref.WeakSet
+        )
+
+        # The write batch each thread is currently collecting changes in.
+        self._batches: dict[int, WriteBatch] = {}
+
+        # A lock to protect the _connections, _tx_stacks, _streams and
+        # _batches maps, which all map thread IDs to private resources.
         self._shared_map_lock = threading.Lock()
 
         # A lock to protect access to the database itself. SQLite does
@@ -1026,12 +1439,16 @@ class Database:
         # whole-second sleeps (!) that would trigger its internal
         # timeout. Using this lock ensures only one SQLite transaction
         # is active at a time.
+        # With `concurrent_reads`, the database uses write-ahead logging
+        # instead, where readers never block and are not blocked by the
+        # writer. Then only transactions that write take this lock.
         self._db_lock = threading.Lock()
 
         # Set up database schema.
         for model_cls in self._models:
             self._make_table(model_cls._table, model_cls._fields)
             self._make_attribute_table(model_cls._flex_table)
+            self._make_indexes(self._model_indexes(model_cls))
 
     # Primitive access control: connections and transactions.
 
@@ -1072,6 +1489,13 @@ class Database:
         )
         self.add_functions(conn)
 
+        if self.concurrent_reads:
+            # The journal mode is stored in the database file, but setting
+            # it again is cheap. Syncing on every commit is not needed for
+            # durability with a write-ahead log.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+
         if self.supports_extensions:
             conn.enable_load_extension(True)
 
@@ -1111,6 +1535,11 @@ class Database:
         from all threads. This does not render the database object
         unusable; new connections can still be opened on demand.
         """
+        with self._shared_map_lock:
+            streams = [r for rs in self._streams.values() for r in rs]
+        for results in streams:
+            results._drain()
+
         with self._shared_map_lock:
             while self._connections:
                 _thread_id, conn = self._connections.popitem()
@@ -1131,12 +1560,69 @@ class Database:
         with self._shared_map_lock:
             yield self._tx_stacks[thread_id]
 
+    def _register_stream(self, results: Results):
+        """Record that `results` is reading from a cursor on the current
+        thread's connection.
+        """
+        thread_id = threading.current_thread().ident
+        assert thread_id is not None
+        with self._shared_map_lock:
+            self._streams[thread_id].add(results)
+
+    def _unregister_stream(self, results: Results):
+        """Forget about a result set whose cursor has been closed."""
+        with self._shared_map_lock:
+            for streams in self._streams.values():
+                streams.discard(results)
+
+    def _drain_streams(self):
+        """Buffer the remaining rows of all result sets still streaming
+        from the current thread's connection and close their cursors.
+        """
+        thread_id = threading.current_thread().ident
+        assert thread_id is not None
+        with self._shared_map_lock:
+            streams = list(self._streams.pop(thread_id, ()))
+        for results in streams:
+            results._drain()
+
     def transaction(self) -> Transaction:
         """Get a :class:`Transaction` object for interacting directly
         with the underlying SQLite database.
         """
         return Transaction(self)
 
+    @contextlib.contextmanager
+    def write_batch(self) -> Generator[WriteBatch]:
+        """A context manager that collects the changes of all models
+        stored by the current thread in a :class:`WriteBatch` and writes
+        them in a single transaction. Nested calls share the outer batch.
+        """
+        thread_id = threading.current_thread().ident
+        assert thread_id is not None
+        with self._shared_map_lock:
+            batch = self._batches.get(thread_id)
+        if batch is not None:
+            yield batch
+            return
+
+        batch = WriteBatch(self)
+        with self.transaction():
+            with self._shared_map_lock:
+                self._batches[thread_id] = batch
+            try:
+                yield batch
+            finally:
+                with self._shared_map_lock:
+                    del self._batches[thread_id]
+                batch.flush()
+
+    def _write_batch(self) -> WriteBatch | None:
+        """Get the write batch of the current thread, if it has one."""
+        thread_id = threading.current_thread().ident
+        with self._shared_map_lock:
+            return self._batches.get(thread_id)
+
     def load_extension(self, path: str):
         """Load an SQLite extension into all open connections."""
         if not self.supports_extensions:
@@ -1206,6 +1692,60 @@ class Database:
                 """.format(flex_table)
             )
 
+    def _model_indexes(self, model_cls: type[Model]) -> list[Index]:
+        """Return the indexes to maintain on the table of `model_cls`."""
+        return [
+            Index(model_cls._table, tuple(columns))
+            for columns in model_cls._indexes
+        ]
+
+    def _make_indexes(self, indexes: Iterable[Index]):
+        """Create the given indexes if they don't exist."""
+        setup_sql = "".join(
+            "CREATE INDEX IF NOT EXISTS {} ON {} ({});\n".format(
+                index.name, index.table, ", ".join(index.columns)
+            )
+            for index in indexes
+        )
+        if setup_sql:
+            with self.transaction() as tx:
+                tx.script(setup_sql)
+
+    # Index maintenance.
+
+    def indexes(self) -> dict[str, Index]:
+        """Return a mapping from names to the indexes that currently exist
+        in the database, including those SQLite creates for UNIQUE
+        constraints.
+        """
+        out = {}
+        with self.transaction() as tx:
+            rows = tx.query(
+                "SELECT name, tbl_name FROM sqlite_master "
+                "WHERE type = 'index' ORDER BY tbl_name, name"
+            )
+            for name, table in rows:
+                info = tx.query(f'PRAGMA index_info("{name}")')
+                columns = tuple(row["name"] for row in info)
+                out[name] = Index(table, columns)
+        return out
+
+    def create_index(self, index: Index):
+        """Create an index, unless an index with the same name exists."""
+        self._make_indexes([index])
+
+    def drop_index(self, name: str):
+        """Remove the index with the given name from the database."""
+        with self.transaction() as tx:
+            tx.script(f'DROP INDEX IF EXISTS "{name}";')
+
+    def analyze(self):
+        """Gather statistics about the tables and indexes, which SQLite's
+        query planner uses to choose between indexes.
+        """
+        with self.transaction() as tx:
+            tx.script("ANALYZE;")
+
     # Querying.
 
     def _fetch(
@@ -1221,30 +1761,10 @@ class Database:
         """
         query = query or TrueQuery()  # A null query.
         sort = sort or NullSort()  # Unsorted.
-        where, subvals = query.clause()
+        # Filter as much as possible in SQLite and only evaluate the
+        # remainder of the query in Python.
+        sql, subvals, residual = self._matching_sql(model_cls, query)
         order_by = sort.order_clause()
-
-        table = model_cls._table
-        _from = table
-        if query.field_names & model_cls.other_db_fields:
-            _from += f" {model_cls.relation_join}"
-
-        # group by id to avoid duplicates when joining with the relation
-        sql = (
-            f"SELECT {table}.* "
-            f"FROM ({_from}) "
-            f"WHERE {where or 1} "
-            f"GROUP BY {table}.id"
-        )
-        # Fetch flexible attributes for items matching the main query.
-        # Doing the per-item filtering in python is faster than issuing
-        # one query per item to sqlite.
-        flex_sql = (
-            "SELECT * "
-            f"FROM {model_cls._flex_table} "
-            f"WHERE entity_id IN (SELECT id FROM ({sql}))"
-        )
-
         if order_by:
             # the sort field may exist in both 'items' and 'albums' tables
             # (when they are joined), causing ambiguous column OperationalError
@@ -1254,18 +1774,88 @@ class Database:
             sql = f"SELECT * FROM ({sql}) ORDER BY {order_by}"
 
         with self.transaction() as tx:
-            rows = tx.query(sql, subvals)
-            flex_rows = tx.query(flex_sql, subvals)
+            if self.concurrent_reads:
+                # With a write-ahead log, an open cursor does not keep
+                # other connections from committing, so the rows can be
+                # pulled as they are consumed.
+                rows = tx.cursor(sql, subvals)
+            else:
+                # Otherwise it holds a shared lock on the database file
+                # until it is closed.
+                rows = tx.query(sql, subvals)
 
+        # Flexible attributes are fetched by the results in batches, as
+        # the rows are consumed.
         return Results(
             model_cls,
             rows,
             self,
-            flex_rows,
-            None if where else query,  # Slow query component.
+            residual,  # Slow query component.
             sort if sort.is_slow() else None,  # Slow sort component.
         )
 
+    def _matching_sql(
+        self, model_cls: type[Model], query: Query
+    ) -> tuple[str, Sequence[SQLiteType], Query | None]:
+        """Build the SQL statement selecting the rows of the objects
+        matching the part of `query` that SQLite can evaluate. Return it
+        with its substitution values and the rest of the query, if any.
+        """
+        where, subvals, residual = query.clause_with_residual()
+
+        table = model_cls._table
+        _from = table
+        if query.field_names & model_cls.other_db_fields:
+            _from += f" {model_cls.relation_join}"
+
+        # group by id to avoid duplicates when joining with the relation
+        sql = (
+            f"SELECT {table}.* "
+            f"FROM ({_from}) "
+            f"WHERE {where or 1} "
+            f"GROUP BY {table}.id"
+        )
+        return sql, subvals, residual
+
+    def _select(
+        self,
+        model_cls: type[Model],
+        query: Query | None,
+        columns: Sequence[str],
+        sort: Sort | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[sqlite3.Row] | None:
+        """Evaluate the SQL expressions `columns` over the rows of the
+        objects of type `model_cls` matching the query, without building
+        the objects: aggregate expressions give a single row, others a row
+        per object, in the order of `sort` and at most `limit` rows after
+        skipping `offset` rows. Return None if part of the query or the
+        sort can only be evaluated in Python.
+        """
+        query = query or TrueQuery()
+        if query.field_names & model_cls.other_db_fields:
+            sql, subvals, residual = self._matching_sql(model_cls, query)
+            sql = f"SELECT {', '.join(columns)} FROM ({sql})"
+        else:
+            # Without a join, select from the table itself so that SQLite
+            # can use its indexes for the columns and the order.
+            where, subvals, residual = query.clause_with_residual()
+            sql = (
+                f"SELECT {', '.join(columns)} FROM {model_cls._table} "
+                f"WHERE {where or 1}"
+            )
+        if residual is not None or (sort and sort.is_slow()):
+            return None
+
+        if order_by := sort and sort.order_clause():
+            sql += f" ORDER BY {order_by}"
+        if limit is not None or offset:
+            limit = -1 if limit is None else limit
+            sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        with self.transaction() as tx:
+            return tx.query(sql, subvals)
+
     def _get(
         self,
         model_cls: type[AnyModel],
@@ -24,7 +24,7 @@ from datetime import datetime, timedelta
 from functools import reduce
 from operator import mul, or_
 from re import Pattern
-from typing import TYPE_CHECKING, Any, Generic, TypeVar, Union
+from typing import TYPE_CHECKING, Any, Generic, NamedTuple, TypeVar, Union
 
 from beets import util
 
@@ -90,6 +90,23 @@ class Query(ABC):
         """
         return None, ()
 
+    def clause_with_residual(
+        self,
+    ) -> tuple[str | None, Sequence[SQLiteType], Query | None]:
+        """Split the query into a part that SQLite can evaluate and a
+        part that has to be evaluated in Python.
+
+        Return (clause, subvals, residual). The objects matching the
+        query are exactly those that satisfy the WHERE clause `clause`
+        (or all objects, if it is None) and that are matched by the
+        `residual` query (if it is not None).
+        """
+        clause, subvals = self.clause()
+        if clause:
+            return clause, subvals, None
+        else:
+            return None, (), self
+
     @abstractmethod
     def match(self, obj: Model):
         """Check whether this query matches a given Model. Can be used to
@@ -120,12 +137,50 @@ AnySQLiteType = TypeVar("AnySQLiteType", bound=SQLiteType)
 FieldQueryType = type["FieldQuery"]
 
 
+class FlexAttrSource(NamedTuple):
+    """A table of flexible attributes in which the value of a field is
+    looked up for the entity whose id is given by the SQL expression
+    `entity_id`.
+    """
+
+    table: str
+    entity_id: str
+
+
+NUMERIC_TEXT_CLAUSE = (
+    "(TRIM(value) GLOB '*[0-9]*' AND TRIM(value) NOT GLOB '*[^0-9.eE+-]*')"
+)
+"""An SQLite expression that is true if the `value` of a flexible
+attribute looks like a number.
+"""
+
+
 class FieldQuery(Query, Generic[P]):
     """An abstract query that searches in a specific field for a
     pattern. Subclasses must provide a `value_match` class method, which
     determines whether a certain pattern string matches a certain value
     string. Subclasses may also provide `col_clause` to implement the
     same matching functionality in SQLite.
+
+    Subclasses that implement `value_clause` can also be evaluated in
+    SQLite for flexible attributes, provided that the model has set up
+    `flex_sources`.
+    """
+
+    flex_sources: Sequence[FlexAttrSource] = ()
+    """The tables in which the (flexible) field is looked up, in order of
+    precedence, when the query is evaluated in SQLite.
+    """
+
+    flex_type: str = "TEXT"
+    """The SQLite type of the (flexible) field's values. Flexible
+    attributes are stored as text, so values are cast to this type
+    before matching unless it is "TEXT".
+    """
+
+    value_type: str | None = None
+    """The SQLite type that the query compares values as, if any. It is
+    used for flexible attributes whose `flex_type` is "TEXT".
     """
 
     @property
@@ -147,11 +202,67 @@ class FieldQuery(Query, Generic[P]):
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
         return self.field, ()
 
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
+        """Generate an SQLite expression that matches the value given by
+        the SQL expression `value` against the pattern.
+
+        Raise NotImplementedError if this is not supported, in which
+        case queries on flexible attributes are slow.
+        """
+        raise NotImplementedError()
+
+    def matches_null(self) -> bool:
+        """Determine whether objects that lack the field match."""
+        return self.value_match(self.pattern, None)
+
+    def flex_clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
+        """Generate an SQLite expression implementing the query for a
+        flexible attribute. Its value is taken from the first of the
+        `flex_sources` that has it.
+        """
+        if self.pattern is None:
+            # Comparisons with NULL are NULL in SQLite.
+            return None, ()
+
+        if self.flex_type != "TEXT":
+            value = f"CAST(value AS {self.flex_type})"
+        elif self.value_type in ("INTEGER", "REAL", "NUMERIC"):
+            # CAST turns text that is not a number into 0, which must not
+            # match, so only numbers are converted.
+            value = (
+                f"(CASE WHEN {NUMERIC_TEXT_CLAUSE} "
+                f"THEN CAST(value AS {self.value_type}) END)"
+            )
+        elif self.value_type:
+            value = f"CAST(value AS {self.value_type})"
+        else:
+            value = "value"
+        try:
+            clause, clause_subvals = self.value_clause(value)
+        except NotImplementedError:
+            return None, ()
+
+        # Each lookup is NULL if the entity does not have the attribute.
+        # A stored NULL value matches like a missing one, but must not fall
+        # through to the next source.
+        missing = "1" if self.matches_null() else "0"
+        lookups = []
+        subvals: list[SQLiteType] = []
+        for source in self.flex_sources:
+            lookups.append(
+                f"(SELECT COALESCE({clause}, {missing}) FROM {source.table} "
+                f"WHERE entity_id = {source.entity_id} AND key = ?)"
+            )
+            subvals += [*clause_subvals, self.field_name]
+        return f"COALESCE({', '.join(lookups)}, {missing})", subvals
+
     def clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
         if self.fast:
             return self.col_clause()
+        elif self.flex_sources:
+            return self.flex_clause()
         else:
-            # Matching a flexattr. This is a slow query.
+            # Matching a computed field. This is a slow query.
             return None, ()
 
     @classmethod
@@ -183,7 +294,10 @@ class MatchQuery(FieldQuery[AnySQLiteType]):
     """A query that looks for exact matches in an Model field."""
 
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
-        return self.field + " = ?", [self.pattern]
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
+        return value + " = ?", [self.pattern]
 
     @classmethod
     def value_match(cls, pattern: AnySQLiteType, value: Any) -> bool:
@@ -234,12 +348,15 @@ class StringQuery(StringFieldQuery[str]):
     """A query that matches a whole string in a specific Model field."""
 
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
         search = (
             self.pattern.replace("\\", "\\\\")
             .replace("%", "\\%")
             .replace("_", "\\_")
         )
-        clause = self.field + " like ? escape '\\'"
+        clause = value + " like ? escape '\\'"
         subvals = [search]
         return clause, subvals
 
@@ -252,13 +369,16 @@ class SubstringQuery(StringFieldQuery[str]):
     """A query that matches a substring in a specific Model field."""
 
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
         pattern = (
             self.pattern.replace("\\", "\\\\")
             .replace("%", "\\%")
             .replace("_", "\\_")
         )
         search = "%" + pattern + "%"
-        clause = self.field + " like ? escape '\\'"
+        clause = value + " like ? escape '\\'"
         subvals = [search]
         return clause, subvals
 
@@ -287,7 +407,10 @@ class RegexpQuery(StringFieldQuery[Pattern[str]]):
         super().__init__(field_name, pattern_re, fast)
 
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
-        return f" regexp({self.field}, ?)", [self.pattern.pattern]
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
+        return f" regexp({value}, ?)", [self.pattern.pattern]
 
     @staticmethod
     def _normalize(s: str) -> str:
@@ -362,6 +485,8 @@ class NumericQuery(FieldQuery[str]):
     a float.
     """
 
+    value_type = "NUMERIC"
+
     def _convert(self, s: str) -> float | int | None:
         """Convert a string to a numeric type (float or int).
 
@@ -410,19 +535,25 @@ class NumericQuery(FieldQuery[str]):
                 return False
             return True
 
+    def matches_null(self) -> bool:
+        return False
+
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
         if self.point is not None:
-            return self.field + "=?", (self.point,)
+            return value + "=?", (self.point,)
         else:
             if self.rangemin is not None and self.rangemax is not None:
                 return (
-                    "{0} >= ? AND {0} <= ?".format(self.field),
+                    "{0} >= ? AND {0} <= ?".format(value),
                     (self.rangemin, self.rangemax),
                 )
             elif self.rangemin is not None:
-                return f"{self.field} >= ?", (self.rangemin,)
+                return f"{value} >= ?", (self.rangemin,)
             elif self.rangemax is not None:
-                return f"{self.field} <= ?", (self.rangemax,)
+                return f"{value} <= ?", (self.rangemax,)
             else:
                 return "1", ()
 
@@ -528,6 +659,35 @@ class AndQuery(MutableCollectionQuery):
     def clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
         return self.clause_with_joiner("and")
 
+    def clause_with_residual(
+        self,
+    ) -> tuple[str | None, Sequence[SQLiteType], Query | None]:
+        """Push the clauses of all subqueries down to SQLite, leaving
+        only their residual parts to be evaluated in Python.
+        """
+        clause_parts = []
+        subvals: list[SQLiteType] = []
+        residuals = []
+        for subq in self.subqueries:
+            subq_clause, subq_subvals, subq_residual = (
+                subq.clause_with_residual()
+            )
+            if subq_clause:
+                clause_parts.append("(" + subq_clause + ")")
+                subvals += subq_subvals
+            if subq_residual:
+                residuals.append(subq_residual)
+
+        clause = " and ".join(clause_parts) or None
+        residual: Query | None
+        if not residuals:
+            residual = None
+        elif len(residuals) == 1:
+            residual = residuals[0]
+        else:
+            residual = AndQuery(residuals)
+        return clause, subvals, residual
+
     def match(self, obj: Model) -> bool:
         return all(q.match(obj) for q in self.subqueries)
 
@@ -538,6 +698,31 @@ class OrQuery(MutableCollectionQuery):
     def clause(self) -> tuple[str | None, Sequence[SQLiteType]]:
         return self.clause_with_joiner("or")
 
+    def clause_with_residual(
+        self,
+    ) -> tuple[str | None, Sequence[SQLiteType], Query | None]:
+        """If every subquery has an SQL part, their disjunction narrows
+        down the candidates, which are then matched against the whole
+        query. Otherwise, every object is a candidate.
+        """
+        clause_parts = []
+        subvals: list[SQLiteType] = []
+        exact = True
+        for subq in self.subqueries:
+            subq_clause, subq_subvals, subq_residual = (
+                subq.clause_with_residual()
+            )
+            if not subq_clause:
+                return None, (), self
+            clause_parts.append("(" + subq_clause + ")")
+            subvals += subq_subvals
+            exact = exact and subq_residual is None
+
+        if not clause_parts:
+            # An empty disjunction matches nothing.
+            return None, (), self
+        return " or ".join(clause_parts), subvals, None if exact else self
+
     def match(self, obj: Model) -> bool:
         return any(q.match(obj) for q in self.subqueries)
 
@@ -779,6 +964,8 @@ class DateQuery(FieldQuery[str]):
     using an ellipsis interval syntax similar to that of NumericQuery.
     """
 
+    value_type = "NUMERIC"
+
     def __init__(self, field_name: str, pattern: str, fast: bool = True):
         super().__init__(field_name, pattern, fast)
         start, end = _parse_periods(pattern)
@@ -791,20 +978,26 @@ class DateQuery(FieldQuery[str]):
         date = datetime.fromtimestamp(timestamp)
         return self.interval.contains(date)
 
+    def matches_null(self) -> bool:
+        return False
+
     _clause_tmpl = "{0} {1} ?"
 
     def col_clause(self) -> tuple[str, Sequence[SQLiteType]]:
+        return self.value_clause(self.field)
+
+    def value_clause(self, value: str) -> tuple[str, Sequence[SQLiteType]]:
         clause_parts = []
         subvals = []
 
         # Convert the `datetime` objects to an integer number of seconds since
         # the (local) Unix epoch using `datetime.timestamp()`.
         if self.interval.start:
-            clause_parts.append(self._clause_tmpl.format(self.field, ">="))
+            clause_parts.append(self._clause_tmpl.format(value, ">="))
             subvals.append(int(self.interval.start.timestamp()))
 
         if self.interval.end:
-            clause_parts.append(self._clause_tmpl.format(self.field, "<"))
+            clause_parts.append(self._clause_tmpl.format(value, "<"))
             subvals.append(int(self.interval.end.timestamp()))
 
         if clause_parts:
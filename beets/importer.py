@@ -23,11 +23,14 @@ import os
 import pickle
 import re
 import shutil
+import sqlite3
+import threading
 import time
-from bisect import bisect_left, insort
-from collections import defaultdict
-from dataclasses import dataclass
+from collections import defaultdict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
+from functools import partial
 from tempfile import mkdtemp
 from typing import Callable, Iterable, Sequence
 
@@ -85,115 +88,241 @@ class ImportAbortError(Exception):
     pass
 
 
-@dataclass
 class ImportState:
     """Representing the progress of an import task.
 
-    Opens the state file on creation of the class. If you want
-    to ensure the state is written to disk, you should use the
-    context manager protocol.
-
     Tagprogress allows long tagging tasks to be resumed when they pause.
 
     Taghistory is a utility for manipulating the "incremental" import log.
     This keeps track of all directories that were ever imported, which
     allows the importer to only import new stuff.
 
+    Both are stored in an SQLite database next to the configured state
+    file, with an added ``.sqlite`` extension, and every change is written
+    as it is made. A state file in the old pickled format is imported when the
+    database is created. An `ImportSession` keeps one state open for the
+    whole import; other states should be closed when they are no longer
+    needed.
+
     Usage
     -----
     ```
-    # Readonly
-    progress = ImportState().tagprogress
-
-    # Read and write
     with ImportState() as state:
-        state["key"] = "value"
+        state.progress_add(toppath, path)
+        state.progress_has_element(toppath, path)
     ```
     """
 
-    tagprogress: dict[PathBytes, list[PathBytes]]
-    taghistory: set[tuple[PathBytes, ...]]
     path: PathBytes
+    db_path: PathBytes
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS progress (
+            toppath BLOB NOT NULL,
+            path BLOB NOT NULL,
+            PRIMARY KEY (toppath, path)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS history (
+            paths BLOB PRIMARY KEY
+        );
+    """
 
     def __init__(self, readonly=False, path: PathBytes | None = None):
         self.path = path or os.fsencode(config["statefile"].as_filename())
-        self.tagprogress = {}
-        self.taghistory = set()
-        self._open()
+        self.db_path = self.path + b".sqlite"
+        self._lock = threading.Lock()
+
+        new = not os.path.exists(syspath(self.db_path))
+        try:
+            self._conn = sqlite3.connect(
+                syspath(self.db_path), check_same_thread=False
+            )
+            self._check_tables()
+            self._conn.executescript(self._schema)
+        except sqlite3.Error as exc:
+            log.error("state file could not be opened: {0}", exc)
+            self._conn.close()
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            self._conn.executescript(self._schema)
+        else:
+            if new:
+                self._import_pickle()
+
+    def _check_tables(self):
+        """Make sure that the database does not hold any other tables than
+        those of the state, so that another database is never changed.
+        """
+        tables = {
+            name
+            for (name,) in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        if other := tables - {"progress", "history"}:
+            raise sqlite3.DatabaseError(
+                f"{displayable_path(self.db_path)} holds other tables: "
+                f"{', '.join(sorted(other))}"
+            )
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._save()
+        self.close()
 
-    def _open(
-        self,
-    ):
+    def close(self):
+        """Close the database of the state."""
+        with self._lock:
+            self._conn.close()
+
+    def _import_pickle(self):
+        """Import the state from a state file in the old pickled format."""
+        if not os.path.exists(syspath(self.path)):
+            return
         try:
-            with open(self.path, "rb") as f:
+            with open(syspath(self.path), "rb") as f:
                 state = pickle.load(f)
-                # Read the states
-                self.tagprogress = state.get("tagprogress", {})
-                self.taghistory = state.get("taghistory", set())
+            tagprogress = state.get("tagprogress", {})
+            taghistory = state.get("taghistory", set())
         except Exception as exc:
             # The `pickle` module can emit all sorts of exceptions during
             # unpickling, including ImportError. We use a catch-all
             # exception to avoid enumerating them all (the docs don't even have a
             # full list!).
             log.debug("state file could not be read: {0}", exc)
+            return
 
-    def _save(self):
-        try:
-            with open(self.path, "wb") as f:
-                pickle.dump(
-                    {
-                        "tagprogress": self.tagprogress,
-                        "taghistory": self.taghistory,
-                    },
-                    f,
-                )
-        except OSError as exc:
-            log.error("state file could not be written: {0}", exc)
+        self._write(
+            "INSERT OR IGNORE INTO progress VALUES (?, ?)",
+            [
+                (toppath, path)
+                for toppath, paths in tagprogress.items()
+                for path in (self._NO_PATH, *paths)
+            ],
+        )
+        self._write(
+            "INSERT OR IGNORE INTO history VALUES (?)",
+            [(self._history_key(paths),) for paths in taghistory],
+        )
+
+    def _read(self, sql: str, *params) -> list[tuple]:
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as exc:
+                log.error("state file could not be read: {0}", exc)
+                return []
+
+    def _write(self, sql: str, rows: Iterable[tuple]):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.executemany(sql, rows)
+            except sqlite3.Error as exc:
+                log.error("state file could not be written: {0}", exc)
 
     # -------------------------------- Tagprogress ------------------------------- #
 
+    # Recorded for every top path with progress, even if no paths have been
+    # imported yet.
+    _NO_PATH = b""
+
+    @property
+    def tagprogress(self) -> dict[PathBytes, list[PathBytes]]:
+        """The sorted paths imported under each top path."""
+        tagprogress: dict[PathBytes, list[PathBytes]] = {}
+        for toppath, path in self._read(
+            "SELECT toppath, path FROM progress ORDER BY toppath, path"
+        ):
+            imported = tagprogress.setdefault(toppath, [])
+            if path != self._NO_PATH:
+                imported.append(path)
+        return tagprogress
+
     def progress_add(self, toppath: PathBytes, *paths: PathBytes):
         """Record that the files under all of the `paths` have been imported
         under `toppath`.
         """
-        with self as state:
-            imported = state.tagprogress.setdefault(toppath, [])
-            for path in paths:
-                if imported and imported[-1] <= path:
-                    imported.append(path)
-                else:
-                    insort(imported, path)
+        self._write(
+            "INSERT OR IGNORE INTO progress VALUES (?, ?)",
+            [(toppath, path) for path in (self._NO_PATH, *paths)],
+        )
 
     def progress_has_element(self, toppath: PathBytes, path: PathBytes) -> bool:
         """Return whether `path` has been imported in `toppath`."""
-        imported = self.tagprogress.get(toppath, [])
-        i = bisect_left(imported, path)
-        return i != len(imported) and imported[i] == path
+        return bool(
+            self._read(
+                "SELECT 1 FROM progress WHERE toppath = ? AND path = ?",
+                toppath,
+                path,
+            )
+        )
 
     def progress_has(self, toppath: PathBytes) -> bool:
         """Return `True` if there exist paths that have already been
         imported under `toppath`.
         """
-        return toppath in self.tagprogress
+        return bool(
+            self._read(
+                "SELECT 1 FROM progress WHERE toppath = ? LIMIT 1", toppath
+            )
+        )
 
     def progress_reset(self, toppath: PathBytes | None):
         """Reset the progress for `toppath`."""
-        with self as state:
-            if toppath in state.tagprogress:
-                del state.tagprogress[toppath]
+        self._write("DELETE FROM progress WHERE toppath = ?", [(toppath,)])
 
     # -------------------------------- Taghistory -------------------------------- #
 
-    def history_add(self, paths: list[PathBytes]):
+    @staticmethod
+    def _history_key(paths: Iterable[PathBytes]) -> bytes:
+        # Paths cannot contain null bytes.
+        return b"\0".join(paths)
+
+    @property
+    def taghistory(self) -> set[tuple[PathBytes, ...]]:
+        """All the lists of paths in the history."""
+        return {
+            tuple(key.split(b"\0")) if key else ()
+            for (key,) in self._read("SELECT paths FROM history")
+        }
+
+    def history_add(self, paths: Sequence[PathBytes]):
         """Add the paths to the history."""
-        with self as state:
-            state.taghistory.add(tuple(paths))
+        self._write(
+            "INSERT OR IGNORE INTO history VALUES (?)",
+            [(self._history_key(paths),)],
+        )
+
+    def history_mark(self) -> int:
+        """Return a mark of the current end of the history."""
+        ((mark,),) = self._read("SELECT max(rowid) FROM history") or [(0,)]
+        return mark or 0
+
+    def history_has(
+        self, paths: Sequence[PathBytes], mark: int | None = None
+    ) -> bool:
+        """Return whether the paths are in the history, or in the part of
+        it before the given `history_mark`.
+        """
+        sql = "SELECT 1 FROM history WHERE paths = ?"
+        params: list[bytes | int] = [self._history_key(paths)]
+        if mark is not None:
+            sql += " AND rowid <= ?"
+            params.append(mark)
+        return bool(self._read(sql, *params))
+
+
+@contextmanager
+def _open_state(state: ImportState | None):
+    """Use the given import state, or else open one for the duration of
+    the context.
+    """
+    if state is not None:
+        yield state
+    else:
+        with ImportState() as state:
+            yield state
 
 
 class ImportSession:
@@ -364,17 +493,23 @@ class ImportSession:
             # also add the music to the library database, so later
             # stages need to read and write data from there.
             if self.config["autotag"]:
-                stages += [lookup_candidates(self), user_query(self)]
+                stages += [
+                    self._stage_workers(lookup_candidates),
+                    user_query(self),
+                ]
             else:
                 stages += [import_asis(self)]
 
             # Plugin stages.
             for stage_func in plugins.early_import_stages():
-                stages.append(plugin_stage(self, stage_func))
+                stages.append(self._plugin_stage(stage_func))
             for stage_func in plugins.import_stages():
-                stages.append(plugin_stage(self, stage_func))
+                stages.append(self._plugin_stage(stage_func))
 
-            stages += [manipulate_files(self)]
+            stages += [
+                self._stage_workers(manipulate_files),
+                finalize_tasks(self),
+            ]
 
         pl = pipeline.Pipeline(stages)
 
@@ -388,6 +523,40 @@ class ImportSession:
         except ImportAbortError:
             # User aborted operation. Silently stop.
             pass
+        finally:
+            if self._state is not None:
+                self._state.close()
+                self._state = None
+            for stats in pl.stats:
+                log.debug(
+                    "import stage {0}, {1:.2f} messages/s",
+                    stats,
+                    stats.throughput(pl.elapsed),
+                )
+
+    def _stage_workers(self, stage_func):
+        """Make the coroutines running a pipeline stage, in as many
+        threads as configured by `stage_workers`, keeping the order of
+        the tasks.
+        """
+        count = self.config["stage_workers"][stage_func.__name__].get(int)
+        if count <= 1:
+            return stage_func(self)
+        return pipeline.ordered([stage_func(self) for _ in range(count)])
+
+    def _plugin_stage(self, stage_func):
+        """Make the coroutines running a plugin's import stage. Stages that
+        opt in with `plugins.process_pool_stage` get a pool of
+        `process_workers` processes and a thread for each of them.
+        """
+        if not getattr(stage_func, "process_pool", False):
+            return plugin_stage(self, stage_func)
+
+        pool = pipeline.ProcessPool(self.config["process_workers"].get(int))
+        stage_func = partial(stage_func, pool=pool)
+        return pipeline.ProcessStage(
+            pool, [plugin_stage(self, stage_func) for _ in range(pool.workers)]
+        )
 
     # Incremental and resumed imports
 
@@ -396,22 +565,34 @@ class ImportSession:
         been imported in a previous session.
         """
         if self.is_resuming(toppath) and all(
-            [ImportState().progress_has_element(toppath, p) for p in paths]
+            self.state.progress_has_element(toppath, p) for p in paths
         ):
             return True
-        if self.config["incremental"] and tuple(paths) in self.history_dirs:
-            return True
+        if self.config["incremental"]:
+            if self._history_mark is None:
+                # Only skip the directories that were in the history when
+                # the session first looked at it.
+                self._history_mark = self.state.history_mark()
+            if self.state.history_has(paths, self._history_mark):
+                return True
 
         return False
 
-    _history_dirs = None
+    _state: ImportState | None = None
+    _history_mark: int | None = None
+
+    @property
+    def state(self) -> ImportState:
+        """The state of resumed and incremental imports, which is opened
+        once for the session.
+        """
+        if self._state is None:
+            self._state = ImportState()
+        return self._state
 
     @property
     def history_dirs(self) -> set[tuple[PathBytes, ...]]:
-        # FIXME: This could be simplified to a cached property
-        if self._history_dirs is None:
-            self._history_dirs = ImportState().taghistory
-        return self._history_dirs
+        return self.state.taghistory
 
     def already_merged(self, paths: Sequence[PathBytes]):
         """Returns true if all the paths being imported were part of a merge
@@ -444,7 +625,7 @@ class ImportSession:
 
         Determines the return value of `is_resuming(toppath)`.
         """
-        if self.want_resume and ImportState().progress_has(toppath):
+        if self.want_resume and self.state.progress_has(toppath):
             # Either accept immediately or prompt for input to decide.
             if self.want_resume is True or self.should_resume(toppath):
                 log.warning(
@@ -454,7 +635,7 @@ class ImportSession:
                 self._is_resuming[toppath] = True
             else:
                 # Clear progress; we're starting from the top.
-                ImportState().progress_reset(toppath)
+                self.state.progress_reset(toppath)
 
 
 # The importer task class.
@@ -576,16 +757,18 @@ class ImportTask(BaseImportTask):
             self.choice_flag = action.APPLY  # Implicit choice.
             self.match = choice  # type: ignore[assignment]
 
-    def save_progress(self):
+    def save_progress(self, state: ImportState | None = None):
         """Updates the progress state to indicate that this album has
         finished.
         """
         if self.toppath:
-            ImportState().progress_add(self.toppath, *self.paths)
+            with _open_state(state) as state:
+                state.progress_add(self.toppath, *self.paths)
 
-    def save_history(self):
+    def save_history(self, state: ImportState | None = None):
         """Save the directory in the history for incremental imports."""
-        ImportState().history_add(self.paths)
+        with _open_state(state) as state:
+            state.history_add(self.paths)
 
     # Logical decisions.
 
@@ -669,7 +852,7 @@ class ImportTask(BaseImportTask):
             self.album.set_parse(field, format(self.album, value))
             for item in items:
                 item.set_parse(field, format(item, value))
-        with lib.transaction():
+        with lib.write_batch():
             for item in items:
                 item.store()
             self.album.store()
@@ -678,12 +861,12 @@ class ImportTask(BaseImportTask):
         """Save progress, clean up files, and emit plugin event."""
         # Update progress.
         if session.want_resume:
-            self.save_progress()
+            self.save_progress(session.state)
         if session.config["incremental"] and not (
             # Should we skip recording to incremental list?
             self.skip and session.config["incremental_skip_later"]
         ):
-            self.save_history()
+            self.save_history(session.state)
 
         self.cleanup(
             copy=session.config["copy"],
@@ -862,7 +1045,7 @@ class ImportTask(BaseImportTask):
             if write and (self.apply or self.choice_flag == action.RETAG):
                 item.try_write()
 
-        with session.lib.transaction():
+        with session.lib.write_batch():
             for item in self.imported_items():
                 item.store()
 
@@ -871,7 +1054,7 @@ class ImportTask(BaseImportTask):
     def add(self, lib: library.Library):
         """Add the items as an album to the library and remove replaced items."""
         self.align_album_level_fields()
-        with lib.transaction():
+        with lib.write_batch():
             self.record_replaced(lib)
             self.remove_replaced(lib)
 
@@ -1101,7 +1284,7 @@ class SingletonImportTask(ImportTask):
     duplicate_items = find_duplicates
 
     def add(self, lib):
-        with lib.transaction():
+        with lib.write_batch():
             self.record_replaced(lib)
             self.remove_replaced(lib)
             lib.add(self.item)
@@ -1154,16 +1337,17 @@ class SentinelImportTask(ImportTask):
         self.is_album = True
         self.choice_flag = None
 
-    def save_history(self):
+    def save_history(self, state: ImportState | None = None):
         pass
 
-    def save_progress(self):
+    def save_progress(self, state: ImportState | None = None):
         if not self.paths:
             # "Done" sentinel.
-            ImportState().progress_reset(self.toppath)
+            with _open_state(state) as state:
+                state.progress_reset(self.toppath)
         elif self.toppath:
             # "Directory progress" sentinel for singletons
-            super().save_progress()
+            super().save_progress(state)
 
     @property
     def skip(self) -> bool:
@@ -1301,6 +1485,9 @@ class ImportTaskFactory:
         self.skipped = 0  # Skipped due to incremental/resume.
         self.imported = 0  # "Real" tasks created.
         self.is_archive = ArchiveImportTask.is_archive(syspath(toppath))
+        # The pool of workers reading items, and the reads started in it.
+        self._executor: Executor | None = None
+        self._reads: dict[PathBytes, Future] = {}
 
     def tasks(self):
         """Yield all import tasks for music found in the user-specified
@@ -1323,16 +1510,17 @@ class ImportTaskFactory:
                 return
 
         # Search for music in the directory.
-        for dirs, paths in self.paths():
-            if self.session.config["singletons"]:
-                for path in paths:
-                    tasks = self._create(self.singleton(path))
-                    yield from tasks
-                yield self.sentinel(dirs)
+        with self._read_pool():
+            for dirs, paths in self._read_ahead(self.paths()):
+                if self.session.config["singletons"]:
+                    for path in paths:
+                        tasks = self._create(self.singleton(path))
+                        yield from tasks
+                    yield self.sentinel(dirs)
 
-            else:
-                tasks = self._create(self.album(paths, dirs))
-                yield from tasks
+                else:
+                    tasks = self._create(self.album(paths, dirs))
+                    yield from tasks
 
         # Produce the final sentinel for this toppath to indicate that
         # it is finished. This is usually just a SentinelImportTask, but
@@ -1373,6 +1561,65 @@ class ImportTaskFactory:
             for dirs, paths in albums_in_dir(self.toppath):
                 yield dirs, paths
 
+    @contextmanager
+    def _read_pool(self):
+        """Set up the pool of workers that read the items, if the
+        `read_workers` option asks for more than one.
+        """
+        workers = self.session.config["read_workers"].get(int)
+        if workers <= 1:
+            yield
+            return
+
+        if self.session.config["read_processes"]:
+            self._executor = pipeline.process_executor(
+                workers, _init_read_worker, (_plugin_media_fields(),)
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="read"
+            )
+        try:
+            yield
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._reads.clear()
+
+    def _read_ahead(self, groups: Iterable[tuple[list, list[PathBytes]]]):
+        """Pass the `(dirs, paths)` pairs through, after starting to read
+        the items of their paths in the worker pool. The items of the next
+        `read_ahead` pairs are read while a pair is being handled.
+        """
+        if self._executor is None:
+            yield from groups
+            return
+
+        ahead = self.session.config["read_ahead"].get(int)
+        pending: deque[tuple[list, list[PathBytes]]] = deque()
+        for dirs, paths in groups:
+            self._start_reads(dirs, paths)
+            pending.append((dirs, paths))
+            if len(pending) > ahead:
+                yield pending.popleft()
+        yield from pending
+
+    def _start_reads(self, dirs: list, paths: list[PathBytes]):
+        """Start reading the items of paths that are not skipped."""
+        assert self._executor is not None
+        if self.session.config["singletons"]:
+            paths = [
+                path
+                for path in paths
+                if not self.session.already_imported(self.toppath, [path])
+            ]
+        elif self.session.already_imported(self.toppath, dirs):
+            return
+
+        for path in paths:
+            if path not in self._reads:
+                self._reads[path] = self._executor.submit(_read_item, path)
+
     def singleton(self, path: PathBytes):
         """Return a `SingletonImportTask` for the music file."""
         if self.session.already_imported(self.toppath, [path]):
@@ -1455,16 +1702,62 @@ class ImportTaskFactory:
         If an item cannot be read, return `None` instead and log an
         error.
         """
-        try:
-            return library.Item.from_path(path)
-        except library.ReadError as exc:
-            if isinstance(exc.reason, mediafile.FileTypeError):
-                # Silently ignore non-music files.
-                pass
-            elif isinstance(exc.reason, mediafile.UnreadableFileError):
-                log.warning("unreadable file: {0}", displayable_path(path))
-            else:
-                log.error("error reading {0}: {1}", displayable_path(path), exc)
+        future = self._reads.pop(path, None)
+        item, problem = future.result() if future else _read_item(path)
+        if problem:
+            level, message = problem
+            getattr(log, level)("{0}", message)
+        return item
+
+
+def _plugin_media_fields() -> dict[str, mediafile.MediaField]:
+    """Get the descriptors of the media fields that plugins added to
+    `Item`, to add them again in the worker processes.
+    """
+    return {
+        name: mediafile.MediaFile.__dict__[name]
+        for name in library.Item._media_fields
+        if name not in library.Item._fields
+    }
+
+
+def _init_read_worker(fields: dict[str, mediafile.MediaField]):
+    """Add the media fields of the plugins in a worker process that reads
+    items, which starts without any plugins loaded.
+    """
+    for name, descriptor in fields.items():
+        if name not in mediafile.MediaFile.__dict__:
+            mediafile.MediaFile.add_field(name, descriptor)
+        library.Item._media_fields.add(name)
+
+
+def _read_item(
+    path: PathBytes,
+) -> tuple[library.Item | None, tuple[str, str] | None]:
+    """Read an `Item` from the path, in a worker of an
+    `ImportTaskFactory` or directly.
+
+    Return the item, or None along with the level and message to log if
+    it cannot be read. Non-music files are ignored silently. The error
+    itself is not returned because it cannot always leave a worker
+    process.
+    """
+    try:
+        return library.Item.from_path(path), None
+    except library.ReadError as exc:
+        if isinstance(exc.reason, mediafile.FileTypeError):
+            # Silently ignore non-music files.
+            return None, None
+        elif isinstance(exc.reason, mediafile.UnreadableFileError):
+            return None, (
+                "warning",
+                f"unreadable file: {displayable_path(path)}",
+            )
+        else:
+            return None, (
+                "error",
+                f"error reading {displayable_path(path)}: {exc}",
+            )
 
 
 # Pipeline utilities
@@ -1743,8 +2036,7 @@ def plugin_stage(
 @pipeline.stage
 def manipulate_files(session: ImportSession, task: ImportTask):
     """A coroutine (pipeline stage) that performs necessary file
-    manipulations *after* items have been added to the library and
-    finalizes each task.
+    manipulations *after* items have been added to the library.
     """
     if not task.skip:
         if task.should_remove_duplicates:
@@ -1771,7 +2063,15 @@ def manipulate_files(session: ImportSession, task: ImportTask):
             write=session.config["write"],
         )
 
-    # Progress, cleanup, and event.
+    return task
+
+
+@pipeline.mutator_stage
+def finalize_tasks(session: ImportSession, task: ImportTask):
+    """A coroutine (pipeline stage) that finalizes each task once its
+    files are in place: it saves the progress, cleans up and emits the
+    plugin events.
+    """
     task.finalize(session)
 
 
@@ -21,11 +21,14 @@ import re
 import shlex
 import string
 import sys
+import threading
 import time
 import unicodedata
+from collections import defaultdict
 from functools import cached_property
+from itertools import chain
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple
 
 import platformdirs
 from mediafile import MediaFile, UnreadableFileError
@@ -41,9 +44,11 @@ from beets.util import (
     samefile,
     syspath,
 )
-from beets.util.functemplate import Template, template
+from beets.util.functemplate import Template, force, lazy, pure, template
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
     from .dbcore.query import FieldQuery, FieldQueryType
 
 # To use the SQLite "blob" type, it doesn't suffice to provide a byte
@@ -362,16 +367,26 @@ class LibModel(dbcore.Model["Library"]):
 
     def store(self, fields=None):
         super().store(fields)
+        self._update_disambiguation()
         plugins.send("database_change", lib=self._db, model=self)
 
     def remove(self):
         super().remove()
+        self._update_disambiguation(removed=True)
         plugins.send("database_change", lib=self._db, model=self)
 
     def add(self, lib=None):
         super().add(lib)
+        self._update_disambiguation()
         plugins.send("database_change", lib=self._db, model=self)
 
+    def _update_disambiguation(self, removed=False):
+        """Reflect a change of this object in the library's indexes for
+        `%aunique` and `%sunique`.
+        """
+        if isinstance(self._db, Library):
+            self._db._update_disambiguation(self, removed)
+
     def __format__(self, spec):
         if not spec:
             spec = beets.config[self._format_config_key].as_str()
@@ -398,7 +413,29 @@ class LibModel(dbcore.Model["Library"]):
             # Using an explicit table name resolves this.
             field = f"{cls._table}.{field}"
 
-        return query_cls(field, pattern, fast)
+        query = query_cls(field, pattern, fast)
+        if not fast and cls._is_plain_flex_field(field):
+            # A flexible attribute that is not computed by a getter can
+            # still be looked up in SQL from the attribute tables.
+            query.flex_sources = cls.flex_attr_sources
+            field_type = cls._types.get(field) or cls._relation._types.get(
+                field
+            )
+            if field_type and field_type.sql in ("INTEGER", "REAL"):
+                query.flex_type = field_type.sql
+        return query
+
+    @classmethod
+    def _is_plain_flex_field(cls, field: str) -> bool:
+        """Return whether `field` can only be stored as a flexible
+        attribute, on this model or on its relation.
+        """
+        return not (
+            field in cls._getters()
+            or field in cls._relation._getters()
+            or field in cls._queries
+            or field in cls._relation._queries
+        )
 
     @classmethod
     def any_field_query(cls, *args, **kwargs) -> dbcore.OrQuery:
@@ -432,16 +469,15 @@ class FormattedItemMapping(dbcore.db.FormattedMapping):
     ALL_KEYS = "*"
 
     def __init__(self, item, included_keys=ALL_KEYS, for_path=False):
+        super().__init__(item, included_keys=included_keys, for_path=for_path)
+        self.item = item
+
+    @cached_property
+    def model_keys(self):
         # We treat album and item keys specially here,
         # so exclude transitive album keys from the model's keys.
-        super().__init__(item, included_keys=[], for_path=for_path)
-        self.included_keys = included_keys
-        if included_keys == self.ALL_KEYS:
-            # Performance note: this triggers a database query.
-            self.model_keys = item.keys(computed=True, with_album=False)
-        else:
-            self.model_keys = included_keys
-        self.item = item
+        # Performance note: this loads the flexible attributes.
+        return self.item.keys(computed=True, with_album=False)
 
     @cached_property
     def all_keys(self):
@@ -467,16 +503,29 @@ class FormattedItemMapping(dbcore.db.FormattedMapping):
     def album(self):
         return self.item._cached_album
 
+    def _has_album_key(self, key):
+        """Check whether `key` is one of the `album_keys` without listing
+        all the keys of the album.
+        """
+        if self.included_keys != self.ALL_KEYS:
+            return key in self.album_keys
+        album = self.album
+        return (
+            album is not None
+            and (key in Album.item_keys or key not in self.item._fields)
+            and self._model_has_key(album, key)
+        )
+
     def _get(self, key):
         """Get the value for a key, either from the album or the item.
 
         Raise a KeyError for invalid keys.
         """
-        if self.for_path and key in self.album_keys:
+        if self.for_path and self._has_album_key(key):
             return self._get_formatted(self.album, key)
-        elif key in self.model_keys:
+        elif self._has_key(key):
             return self._get_formatted(self.model, key)
-        elif key in self.album_keys:
+        elif self._has_album_key(key):
             return self._get_formatted(self.album, key)
         else:
             raise KeyError(key)
@@ -642,6 +691,15 @@ class Item(LibModel):
 
     _queries = {"singleton": SingletonQuery}
 
+    _indexes = [
+        ("album_id",),
+        ("path",),
+        ("mb_trackid",),
+        ("artist", "title"),
+        ("added",),
+        ("mtime",),
+    ]
+
     _format_config_key = "format_item"
 
     # Cached album object. Read-only.
@@ -663,6 +721,18 @@ class Item(LibModel):
             f"ON {cls._table}.album_id = {cls._relation._table}.id"
         )
 
+    @cached_classproperty
+    def flex_attr_sources(cls) -> list[dbcore.query.FlexAttrSource]:
+        """Item attributes take precedence; otherwise the value is
+        inherited from the album, mirroring :meth:`Item.get`.
+        """
+        return [
+            *super().flex_attr_sources,
+            dbcore.query.FlexAttrSource(
+                cls._relation._flex_table, f"{cls._table}.album_id"
+            ),
+        ]
+
     @property
     def filepath(self) -> Path:
         """The path to the item's file as pathlib.Path."""
@@ -1018,8 +1088,6 @@ class Item(LibModel):
             util.remove(self.path)
             util.prune_dirs(os.path.dirname(self.path), self._db.directory)
 
-        self._db._memotable = {}
-
     def move(
         self,
         operation=MoveOperation.MOVE,
@@ -1088,29 +1156,22 @@ class Item(LibModel):
         """
         db = self._check_db()
         basedir = basedir or db.directory
-        path_formats = path_formats or db.path_formats
+        path_formats = db.compiled_path_formats(path_formats)
 
         # Use a path format based on a query, falling back on the
         # default.
-        for query, path_format in path_formats:
-            if query == PF_KEY_DEFAULT:
-                continue
-            query, _ = parse_query_string(query, type(self))
-            if query.match(self):
+        for query, subpath_tmpl in path_formats:
+            if query is not None and query.match(self):
                 # The query matches the item! Use the corresponding path
                 # format.
                 break
         else:
             # No query matched; fall back to default.
-            for query, path_format in path_formats:
-                if query == PF_KEY_DEFAULT:
+            for query, subpath_tmpl in path_formats:
+                if query is None:
                     break
             else:
                 assert False, "no default path format"
-        if isinstance(path_format, Template):
-            subpath_tmpl = path_format
-        else:
-            subpath_tmpl = template(path_format)
 
         # Evaluate the selected template.
         subpath = self.evaluate_template(subpath_tmpl, True)
@@ -1257,6 +1318,12 @@ class Album(LibModel):
         "original_day",
     ]
 
+    _indexes = [
+        ("mb_albumid",),
+        ("albumartist", "album"),
+        ("added",),
+    ]
+
     _format_config_key = "format_album"
 
     @cached_classproperty
@@ -1510,7 +1577,7 @@ class Album(LibModel):
                 elif key != "id":  # is a flexible attribute
                     track_updates[key] = self[key]
 
-        with self._db.transaction():
+        with self._db.write_batch():
             super().store(fields)
             if track_updates:
                 for item in self.items():
@@ -1538,6 +1605,168 @@ class Album(LibModel):
             item.try_sync(write, move)
 
 
+class DisambiguationIndex:
+    """Albums, or singleton items, of a library grouped by the values of
+    some key fields, which `%aunique` and `%sunique` disambiguate using the
+    first of some other fields whose values tell the members of a group
+    apart.
+
+    The index is built with a single pass over the library and then kept up
+    to date as objects are added, stored and removed. Its lock is never
+    held while the database is accessed, so that updates made from within
+    a transaction cannot deadlock with a lookup.
+    """
+
+    def __init__(
+        self,
+        model_cls: type[LibModel],
+        keys: Sequence[str],
+        disam: Sequence[str],
+    ):
+        self.model_cls = model_cls
+        self.keys = keys
+        self.disam = disam
+
+        self._lock = threading.Lock()
+        # The disambiguator values of the members of each group, by ID.
+        self._groups: defaultdict[tuple, dict[int, tuple]] = defaultdict(dict)
+        # The group of each member.
+        self._members: dict[int, tuple] = {}
+        # The position of the first disambiguator that tells the members
+        # of a group apart, or None if there is none.
+        self._choices: dict[tuple, int | None] = {}
+        # Computed disambiguation values, along with the group they were
+        # computed for.
+        self._values: dict[int, tuple[tuple, str | None]] = {}
+        self._valued: defaultdict[tuple, set[int]] = defaultdict(set)
+        # The IDs of the objects changed while the index is being built,
+        # or None once it is ready.
+        self._touched: set[int] | None = set()
+
+    @property
+    def ready(self) -> bool:
+        return self._touched is None
+
+    def build(self, lib: Library):
+        """Fill the index with the matching objects of the library."""
+        if self.model_cls is Album:
+            candidates = lib.albums()
+        else:
+            candidates = lib.items(dbcore.query.NoneQuery("album_id"))
+        entries = [self._entry(obj) for obj in candidates]
+
+        with self._lock:
+            touched = self._touched or set()
+            for id, entry in entries:
+                # Objects changed during the build are indexed already.
+                if id not in touched:
+                    self._insert(id, entry)
+            self._touched = None
+
+    @staticmethod
+    def _hashable(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    def _key(self, obj: LibModel) -> tuple:
+        return tuple(self._hashable(obj.get(k)) for k in self.keys)
+
+    def _entry(self, obj: LibModel) -> tuple[int, tuple[tuple, tuple] | None]:
+        """Get the key and disambiguator values of an object, or None if it
+        does not belong in the index.
+        """
+        if self.model_cls is not Album and obj.album_id is not None:
+            return obj.id, None
+        disam_values = tuple(self._hashable(obj.get(d, "")) for d in self.disam)
+        return obj.id, (self._key(obj), disam_values)
+
+    def _invalidate(self, key: tuple):
+        self._choices.pop(key, None)
+        for id in self._valued.pop(key, ()):
+            self._values.pop(id, None)
+
+    def _insert(self, id: int, entry: tuple[tuple, tuple] | None):
+        self._delete(id)
+        if entry is not None:
+            key, disam_values = entry
+            self._members[id] = key
+            self._groups[key][id] = disam_values
+            self._invalidate(key)
+
+    def _delete(self, id: int):
+        self._values.pop(id, None)
+        key = self._members.pop(id, None)
+        if key is not None:
+            group = self._groups[key]
+            del group[id]
+            if not group:
+                del self._groups[key]
+            self._invalidate(key)
+
+    def update(self, obj: LibModel):
+        """Add an object to the index, or move it to its new group."""
+        id, entry = self._entry(obj)
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(id)
+            self._insert(id, entry)
+
+    def remove(self, id: int):
+        """Remove the object with the given ID from the index."""
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(id)
+            self._delete(id)
+
+    def _choice(self, key: tuple) -> int | None:
+        if key not in self._choices:
+            group = self._groups.get(key, {})
+            for i in range(len(self.disam)):
+                # If there are as many unique values as members, this
+                # field is sufficient to disambiguate.
+                values = {disam_values[i] for disam_values in group.values()}
+                if len(values) == len(group):
+                    self._choices[key] = i
+                    break
+            else:
+                self._choices[key] = None
+        return self._choices[key]
+
+    def value(self, id: int, get_obj: Callable[[], LibModel]) -> str | None:
+        """Get the disambiguation value for the object with the given ID:
+        an empty string if no other object shares its key values, the
+        formatted value of the disambiguating field, or None if no field
+        disambiguates it. `get_obj` is called to get the object unless the
+        value is known already.
+        """
+        with self._lock:
+            if id in self._values:
+                return self._values[id][1]
+
+        obj = get_obj()
+        key = self._key(obj)
+        with self._lock:
+            unique = len(self._groups.get(key, ())) == 1
+            choice = None if unique else self._choice(key)
+            members = self._groups.get(key, {}).copy()
+
+        value: str | None
+        if unique:
+            value = ""
+        elif choice is None:
+            value = None
+        else:
+            disambiguator = self.disam[choice]
+            value = obj.formatted(for_path=True).get(disambiguator) or ""
+
+        with self._lock:
+            # Only remember the value if the group has not changed
+            # meanwhile.
+            if self._groups.get(key, {}) == members:
+                self._values[id] = (key, value)
+                self._valued[key].add(id)
+        return value
+
+
 # Query construction helpers.
 
 
@@ -1585,6 +1814,34 @@ def parse_query_string(s, model_cls):
     return parse_query_parts(parts, model_cls)
 
 
+class PathFormat(NamedTuple):
+    """A path format with its query and template parsed."""
+
+    query: dbcore.Query | None
+    """The query selecting the items to which the format applies, or
+    None for the default format.
+    """
+
+    template: Template
+
+
+def compile_path_formats(path_formats) -> list[PathFormat]:
+    """Parse the queries and templates of a sequence of `(query,
+    template)` path formats, as found in `Library.path_formats`.
+    """
+    compiled = []
+    for query, path_format in path_formats:
+        if not isinstance(path_format, Template):
+            path_format = template(path_format)
+        if query == PF_KEY_DEFAULT:
+            compiled.append(PathFormat(None, path_format))
+        else:
+            compiled.append(
+                PathFormat(parse_query_string(query, Item)[0], path_format)
+            )
+    return compiled
+
+
 # The Library: interface to the database.
 
 
@@ -1601,15 +1858,111 @@ class Library(dbcore.Database):
         replacements=None,
     ):
         timeout = beets.config["timeout"].as_number()
-        super().__init__(path, timeout=timeout)
+        concurrent_reads = beets.config["concurrent_reads"].get(bool)
+        super().__init__(
+            path, timeout=timeout, concurrent_reads=concurrent_reads
+        )
 
         self.directory = normpath(directory or platformdirs.user_music_path())
 
         self.path_formats = path_formats
         self.replacements = replacements
 
-        # Used for template substitution performance.
-        self._memotable: dict[tuple[str, ...], str] = {}
+        # Indexes for %aunique and %sunique, built when first needed.
+        self._disambiguation_indexes: dict[tuple, DisambiguationIndex] = {}
+        self._disambiguation_lock = threading.Lock()
+
+        # Compiled path formats by the formats and plugin generation they
+        # were compiled with.
+        self._path_formats_cache: dict[tuple, list[PathFormat]] = {}
+
+    def _model_indexes(self, model_cls):
+        """Besides the model's own indexes, also maintain those declared
+        by plugins and in the `indexes` configuration option. Indexes on
+        fields that are not fixed fields of the model are ignored.
+        """
+        indexes = super()._model_indexes(model_cls)
+        configured = beets.config["indexes"][model_cls._table].as_str_seq()
+        for columns in chain(
+            plugins.indexes(model_cls), (c.split() for c in configured)
+        ):
+            index = dbcore.Index(model_cls._table, tuple(columns))
+            unknown = [c for c in columns if c not in model_cls._fields]
+            if unknown:
+                log.warning(
+                    "ignoring index on unknown {} field(s): {}",
+                    model_cls.__name__.lower(),
+                    ", ".join(unknown),
+                )
+            elif index not in indexes:
+                indexes.append(index)
+        return indexes
+
+    def compiled_path_formats(self, path_formats=None) -> list[PathFormat]:
+        """Return the library's path formats, or the given ones, with their
+        queries and templates parsed.
+
+        The result is cached, and compiled again when the formats change or
+        when plugins change the available fields, types and queries.
+        """
+        path_formats = path_formats or self.path_formats
+        if all(isinstance(pf, PathFormat) for pf in path_formats):
+            return list(path_formats)
+
+        key = (
+            tuple(
+                (q, f.original if isinstance(f, Template) else f)
+                for q, f in path_formats
+            ),
+            plugins.generation(),
+        )
+        if key in self._path_formats_cache:
+            return self._path_formats_cache[key]
+
+        if len(self._path_formats_cache) >= 8:
+            self._path_formats_cache.clear()
+        compiled = compile_path_formats(path_formats)
+        self._path_formats_cache[key] = compiled
+        return compiled
+
+    def _disambiguation_index(
+        self,
+        model_cls: type[LibModel],
+        keys: tuple[str, ...],
+        disam: tuple[str, ...],
+    ) -> DisambiguationIndex:
+        """Get the disambiguation index of albums or singletons for the
+        given key and disambiguator fields, building it if necessary.
+        """
+        index_key = (model_cls, keys, disam)
+        with self._disambiguation_lock:
+            index = self._disambiguation_indexes.get(index_key)
+            owner = index is None
+            if owner:
+                index = DisambiguationIndex(model_cls, keys, disam)
+                self._disambiguation_indexes[index_key] = index
+
+        if owner:
+            index.build(self)
+        elif not index.ready:
+            # Another thread is building the index: rather than wait for
+            # it, which could deadlock on the database, use a private one.
+            index = DisambiguationIndex(model_cls, keys, disam)
+            index.build(self)
+        return index
+
+    def _update_disambiguation(self, obj: LibModel, removed: bool = False):
+        """Update the disambiguation indexes with a stored, added or
+        removed object.
+        """
+        with self._disambiguation_lock:
+            indexes = list(self._disambiguation_indexes.values())
+        for index in indexes:
+            if isinstance(obj, index.model_cls):
+                if removed:
+                    index.remove(obj.id)
+                else:
+                    index.update(obj)
 
     # Adding objects to the database.
 
@@ -1620,7 +1973,6 @@ class Library(dbcore.Database):
         Return the object's new id.
         """
         obj.add(self)
-        self._memotable = {}
         return obj.id
 
     def add_album(self, items):
@@ -1639,7 +1991,7 @@ class Library(dbcore.Database):
 
         # Add the album structure and set the items' album_id fields.
         # Store or add the items.
-        with self.transaction():
+        with self.write_batch():
             album.add(self)
             for item in items:
                 item.album_id = album.id
@@ -1652,21 +2004,27 @@ class Library(dbcore.Database):
 
     # Querying.
 
-    def _fetch(self, model_cls, query, sort=None):
-        """Parse a query and fetch.
-
-        If an order specification is present in the query string
-        the `sort` argument is ignored.
+    @staticmethod
+    def _parse_query(model_cls, query):
+        """Parse a query string or list of query parts, if necessary.
+        Return the query and the sort it specifies, if any.
         """
-        # Parse the query, if necessary.
         try:
-            parsed_sort = None
             if isinstance(query, str):
-                query, parsed_sort = parse_query_string(query, model_cls)
+                return parse_query_string(query, model_cls)
             elif isinstance(query, (list, tuple)):
-                query, parsed_sort = parse_query_parts(query, model_cls)
+                return parse_query_parts(query, model_cls)
         except dbcore.query.InvalidQueryArgumentValueError as exc:
             raise dbcore.InvalidQueryError(query, exc)
+        return query, None
+
+    def _fetch(self, model_cls, query, sort=None):
+        """Parse a query and fetch.
+
+        If an order specification is present in the query string
+        the `sort` argument is ignored.
+        """
+        query, parsed_sort = self._parse_query(model_cls, query)
 
         # Any non-null sort specified by the parsed query overrides the
         # provided sort.
@@ -1675,6 +2033,20 @@ class Library(dbcore.Database):
 
         return super()._fetch(model_cls, query, sort)
 
+    def select(
+        self, model_cls, query, columns, sort=None, limit=None, offset=0
+    ):
+        """Parse a query and evaluate the SQL expressions `columns` over
+        the matching objects of type `model_cls`, as `_fetch` would sort
+        them, and at most `limit` rows after skipping `offset` rows.
+
+        Return None if the query cannot be evaluated by SQLite alone.
+        """
+        query, parsed_sort = self._parse_query(model_cls, query)
+        if parsed_sort and not isinstance(parsed_sort, dbcore.query.NullSort):
+            sort = parsed_sort
+        return self._select(model_cls, query, columns, sort, limit, offset)
+
     @staticmethod
     def get_default_album_sort():
         """Get a :class:`Sort` object for albums from the config option."""
@@ -1771,52 +2143,61 @@ class DefaultTemplateFunctions:
         return out
 
     @staticmethod
+    @pure
     def tmpl_lower(s):
         """Convert a string to lower case."""
         return s.lower()
 
     @staticmethod
+    @pure
     def tmpl_upper(s):
         """Convert a string to upper case."""
         return s.upper()
 
     @staticmethod
+    @pure
     def tmpl_capitalize(s):
         """Converts to a capitalized string."""
         return s.capitalize()
 
     @staticmethod
+    @pure
     def tmpl_title(s):
         """Convert a string to title case."""
         return string.capwords(s)
 
     @staticmethod
+    @pure
     def tmpl_left(s, chars):
         """Get the leftmost characters of a string."""
         return s[0 : _int_arg(chars)]
 
     @staticmethod
+    @pure
     def tmpl_right(s, chars):
         """Get the rightmost characters of a string."""
         return s[-_int_arg(chars) :]
 
     @staticmethod
+    @pure
+    @lazy
     def tmpl_if(condition, trueval, falseval=""):
         """If ``condition`` is nonempty and nonzero, emit ``trueval``;
         otherwise, emit ``falseval`` (if provided).
         """
+        condition = force(condition)
         try:
             int_condition = _int_arg(condition)
         except ValueError:
             if condition.lower() == "false":
-                return falseval
+                return force(falseval)
         else:
             condition = int_condition
 
         if condition:
-            return trueval
+            return force(trueval)
         else:
-            return falseval
+            return force(falseval)
 
     @staticmethod
     def tmpl_asciify(s):
@@ -1840,7 +2221,7 @@ class DefaultTemplateFunctions:
         pair of characters to be used as brackets surrounding the
         disambiguator or empty to have no brackets.
         """
-        # Fast paths: no album, no item or library, or memoized value.
+        # Fast paths: no album, no item or library.
         if not self.item or not self.lib:
             return ""
 
@@ -1852,23 +2233,14 @@ class DefaultTemplateFunctions:
         if album_id is None:
             return ""
 
-        memokey = self._tmpl_unique_memokey("aunique", keys, disam, album_id)
-        memoval = self.lib._memotable.get(memokey)
-        if memoval is not None:
-            return memoval
-
-        album = self.lib.get_album(album_id)
-
         return self._tmpl_unique(
             "aunique",
             keys,
             disam,
             bracket,
+            Album,
             album_id,
-            album,
-            album.item_keys,
-            # Do nothing for singletons.
-            lambda a: a is None,
+            lambda: self.lib.get_album(album_id),
         )
 
     def tmpl_sunique(self, keys=None, disam=None, bracket=None):
@@ -1882,7 +2254,7 @@ class DefaultTemplateFunctions:
         pair of characters to be used as brackets surrounding the
         disambiguator or empty to have no brackets.
         """
-        # Fast paths: no album, no item or library, or memoized value.
+        # Fast paths: no album, no item or library.
         if not self.item or not self.lib:
             return ""
 
@@ -1891,7 +2263,8 @@ class DefaultTemplateFunctions:
         else:
             raise NotImplementedError("sunique is only implemented for items")
 
-        if item_id is None:
+        # Do nothing for non singletons.
+        if item_id is None or self.item.album_id is not None:
             return ""
 
         return self._tmpl_unique(
@@ -1899,35 +2272,26 @@ class DefaultTemplateFunctions:
             keys,
             disam,
             bracket,
+            Item,
             item_id,
-            self.item,
-            Item.all_keys(),
-            # Do nothing for non singletons.
-            lambda i: i.album_id is not None,
+            lambda: self.item,
         )
 
-    def _tmpl_unique_memokey(self, name, keys, disam, item_id):
-        """Get the memokey for the unique template named "name" for the
-        specific parameters.
-        """
-        return (name, keys, disam, item_id)
-
     def _tmpl_unique(
         self,
         name,
         keys,
         disam,
         bracket,
-        item_id,
-        db_item,
-        item_keys,
-        skip_item,
+        model_cls,
+        obj_id,
+        get_obj,
     ):
-        """Generate a string that is guaranteed to be unique among all items of
-        the same type as "db_item" who share the same set of keys.
+        """Generate a string that is guaranteed to be unique among all
+        objects of type "model_cls" who share the same set of keys.
 
         A field from "disam" is used in the string if one is sufficient to
-        disambiguate the items. Otherwise, a fallback opaque value is
+        disambiguate the objects. Otherwise, a fallback opaque value is
         used. Both "keys" and "disam" should be given as
         whitespace-separated lists of field names, while "bracket" is a
         pair of characters to be used as brackets surrounding the
@@ -1937,27 +2301,13 @@ class DefaultTemplateFunctions:
         configuration section where the default values of the parameters
         are stored.
 
-        "skip_item" is a function that must return True when the template
-        should return an empty string.
-
-        "initial_subqueries" is a list of subqueries that should be included
-        in the query to find the ambiguous items.
+        "get_obj" is a function returning the object with the ID "obj_id",
+        which is only called if the string has not been computed yet.
         """
-        memokey = self._tmpl_unique_memokey(name, keys, disam, item_id)
-        memoval = self.lib._memotable.get(memokey)
-        if memoval is not None:
-            return memoval
-
-        if skip_item(db_item):
-            self.lib._memotable[memokey] = ""
-            return ""
-
         keys = keys or beets.config[name]["keys"].as_str()
         disam = disam or beets.config[name]["disambiguators"].as_str()
         if bracket is None:
             bracket = beets.config[name]["bracket"].as_str()
-        keys = keys.split()
-        disam = disam.split()
 
         # Assign a left and right bracket or leave blank if argument is empty.
         if len(bracket) == 2:
@@ -1967,49 +2317,22 @@ class DefaultTemplateFunctions:
             bracket_l = ""
             bracket_r = ""
 
-        # Find matching items to disambiguate with.
-        query = db_item.duplicates_query(keys)
-        ambigous_items = (
-            self.lib.items(query)
-            if isinstance(db_item, Item)
-            else self.lib.albums(query)
+        index = self.lib._disambiguation_index(
+            model_cls, tuple(keys.split()), tuple(disam.split())
         )
+        disam_value = index.value(obj_id, get_obj)
 
-        # If there's only one item to matching these details, then do
-        # nothing.
-        if len(ambigous_items) == 1:
-            self.lib._memotable[memokey] = ""
-            return ""
-
-        # Find the first disambiguator that distinguishes the items.
-        for disambiguator in disam:
-            # Get the value for each item for the current field.
-            disam_values = {s.get(disambiguator, "") for s in ambigous_items}
-
-            # If the set of unique values is equal to the number of
-            # items in the disambiguation set, we're done -- this is
-            # sufficient disambiguation.
-            if len(disam_values) == len(ambigous_items):
-                break
-        else:
+        if disam_value is None:
             # No disambiguator distinguished all fields.
-            res = f" {bracket_l}{item_id}{bracket_r}"
-            self.lib._memotable[memokey] = res
-            return res
-
-        # Flatten disambiguation value into a string.
-        disam_value = db_item.formatted(for_path=True).get(disambiguator)
+            return f" {bracket_l}{obj_id}{bracket_r}"
 
         # Return empty string if disambiguator is empty.
         if disam_value:
-            res = f" {bracket_l}{disam_value}{bracket_r}"
-        else:
-            res = ""
-
-        self.lib._memotable[memokey] = res
-        return res
+            return f" {bracket_l}{disam_value}{bracket_r}"
+        return ""
 
     @staticmethod
+    @pure
     def tmpl_first(s, count=1, skip=0, sep="; ", join_str="; "):
         """Get the item(s) from x to y in a string separated by something
         and join then with something.
@@ -2025,6 +2348,7 @@ class DefaultTemplateFunctions:
         count = skip + int(count)
         return join_str.join(s.split(sep)[skip:count])
 
+    @lazy
     def tmpl_ifdef(self, field, trueval="", falseval=""):
         """If field exists return trueval or the field (default)
         otherwise, emit return falseval (if provided).
@@ -2037,7 +2361,9 @@ class DefaultTemplateFunctions:
         Returns:
             The string, based on condition.
         """
+        field = force(field)
         if field in self.item:
+            trueval = force(trueval)
             return trueval if trueval else self.item.formatted().get(field)
         else:
-            return falseval
+            return force(falseval)
@@ -23,7 +23,7 @@ import sys
 import traceback
 from collections import defaultdict
 from collections.abc import Iterable
-from functools import wraps
+from functools import partial, wraps
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -118,6 +118,12 @@ class BeetsPlugin:
     early_import_stages: list[ImportStageFunc]
     import_stages: list[ImportStageFunc]
 
+    # Whether the album candidates of the plugin only depend on the
+    # `artist`, `album`, `va_likely` and `extra_tags` arguments of
+    # `candidates` and its configuration, so that they, and the albums
+    # and tracks it looks up by ID, can be kept in the metadata cache.
+    cacheable_candidates = False
+
     def __init__(self, name: str | None = None):
         """Perform one-time plugin setup."""
 
@@ -222,6 +228,13 @@ class BeetsPlugin:
 
         return Distance()
 
+    def track_source_weight(self) -> tuple[str, float] | None:
+        """If `track_distance` only adds the ``source`` penalty to tracks
+        from one data source, return that source and the penalty, so that
+        it can be added to the tracks without a `Distance` for each item.
+        """
+        return None
+
     def album_distance(
         self,
         items: list[Item],
@@ -341,6 +354,26 @@ class BeetsPlugin:
 
 _classes: set[type[BeetsPlugin]] = set()
 
+# A counter that changes whenever the loaded plugins, or the types and
+# queries they add to the models, may have changed, so that what was
+# derived from them can be computed again.
+_generation = 0
+
+
+def generation() -> int:
+    """Return the current plugin generation, which changes whenever the
+    plugins, or the configuration they were set up with, change.
+    """
+    return _generation
+
+
+def bump_generation() -> None:
+    """Invalidate what was derived from the plugins, after loading or
+    unloading them, or reading the configuration.
+    """
+    global _generation
+    _generation += 1
+
 
 def load_plugins(names: Sequence[str] = ()) -> None:
     """Imports the modules for a sequence of plugin names. Each name
@@ -369,6 +402,7 @@ def load_plugins(names: Sequence[str] = ()) -> None:
                         and obj not in _classes
                     ):
                         _classes.add(obj)
+                        bump_generation()
 
         except Exception:
             log.warning(
@@ -397,6 +431,7 @@ def find_plugins() -> list[BeetsPlugin]:
         # Only instantiate each plugin class once.
         if cls not in _instances:
             _instances[cls] = cls()
+            bump_generation()
         plugins.append(_instances[cls])
     return plugins
 
@@ -436,6 +471,7 @@ def types(model_cls: type[AnyModel]) -> dict[str, type[SQLiteType]]:
                     "another type.".format(plugin.name, field)
                 )
         types.update(plugin_types)
+    bump_generation()
     return types
 
 
@@ -446,9 +482,19 @@ def named_queries(model_cls: type[AnyModel]) -> dict[str, FieldQueryType]:
     for plugin in find_plugins():
         plugin_queries = getattr(plugin, attr_name, {})
         queries.update(plugin_queries)
+    bump_generation()
     return queries
 
 
+def indexes(model_cls: type[AnyModel]) -> list[tuple[str, ...]]:
+    # Gather `item_indexes` and `album_indexes` from the plugins.
+    attr_name = f"{model_cls.__name__.lower()}_indexes"
+    out: list[tuple[str, ...]] = []
+    for plugin in find_plugins():
+        out.extend(tuple(columns) for columns in getattr(plugin, attr_name, ()))
+    return out
+
+
 def track_distance(item: Item, info: TrackInfo) -> Distance:
     """Gets the track distance calculated by all loaded plugins.
     Returns a Distance object.
@@ -475,36 +521,33 @@ def album_distance(
     return dist
 
 
-def candidates(
-    items: list[Item],
-    artist: str,
-    album: str,
-    va_likely: bool,
-    extra_tags: dict[str, Any] | None = None,
-) -> Iterable[AlbumInfo]:
-    """Gets MusicBrainz candidates for an album from each plugin."""
-    for plugin in find_plugins():        
-        if album == '':
-            album = items[0].album
-        yield from plugin.candidates(
-            items, artist, album, va_likely, extra_tags
-        )
-
-
 def item_candidates(item: Item, artist: str, title: str) -> Iterable[TrackInfo]:
     """Gets MusicBrainz candidates for an item from the plugins."""
     for plugin in find_plugins():
         yield from plugin.item_candidates(item, artist, title)
 
 
+def _lookup_by_id(plugin: BeetsPlugin, kind: str, _id: str, fetch):
+    """Look up an album or track by ID with a plugin, through the
+    metadata cache if the plugin is a cacheable metadata source.
+    """
+    from beets.autotag.cache import cached_lookup, config_key
+
+    if not plugin.cacheable_candidates:
+        return fetch()
+    key = (_id, config_key(plugin.config))
+    return cached_lookup(plugin.name, kind, key, fetch)
+
+
 def album_for_id(_id: str) -> AlbumInfo | None:
     """Get AlbumInfo object for the given ID string.
 
     A single ID can yield just a single album, so we return the first match.
     """
-    plugin_list = find_plugins()
-    for plugin in plugin_list:
-        if info := plugin.album_for_id(_id):
+    for plugin in find_plugins():
+        if info := _lookup_by_id(
+            plugin, "album", _id, partial(plugin.album_for_id, _id)
+        ):
             send("albuminfo_received", info=info)
             return info
 
@@ -517,7 +560,9 @@ def track_for_id(_id: str) -> TrackInfo | None:
     A single ID can yield just a single track, so we return the first match.
     """
     for plugin in find_plugins():
-        if info := plugin.track_for_id(_id):
+        if info := _lookup_by_id(
+            plugin, "track", _id, partial(plugin.track_for_id, _id)
+        ):
             send("trackinfo_received", info=info)
             return info
 
@@ -535,6 +580,19 @@ def template_funcs() -> TFuncMap[str]:
     return funcs
 
 
+def process_pool_stage(func: Callable[P, Ret]) -> Callable[P, Ret]:
+    """Decorate an import stage to opt in to handing its CPU-heavy work
+    to a pool of processes.
+
+    The stage then runs in as many threads as there are processes in the
+    pool, and is called with the pool as its `pool` keyword argument: it
+    can run picklable functions in the pool with `pool.call(func, *args)`.
+    The rest of the stage must be thread-safe.
+    """
+    func.process_pool = True  # type: ignore[attr-defined]
+    return func
+
+
 def early_import_stages() -> list[ImportStageFunc]:
     """Get a list of early import stage functions defined by plugins."""
     stages: list[ImportStageFunc] = []
@@ -788,6 +846,8 @@ R = TypeVar("R", bound=Response)
 
 
 class MetadataSourcePlugin(Generic[R], BeetsPlugin, metaclass=abc.ABCMeta):
+    cacheable_candidates = True
+
     def __init__(self):
         super().__init__()
         self.config.add({"source_weight": 0.5})
@@ -963,3 +1023,6 @@ class MetadataSourcePlugin(Generic[R], BeetsPlugin, metaclass=abc.ABCMeta):
         return get_distance(
             data_source=self.data_source, info=info, config=self.config
         )
+
+    def track_source_weight(self) -> tuple[str, float]:
+        return self.data_source, self.config["source_weight"].as_number()
@@ -492,6 +492,7 @@ class PluginMixin(ConfigMixin):
         Album._types = getattr(Album, "_original_types", {})
         Item._queries = getattr(Item, "_original_queries", {})
         Album._queries = getattr(Album, "_original_queries", {})
+        beets.plugins.bump_generation()
 
     @contextmanager
     def configure_plugin(self, config: Any):
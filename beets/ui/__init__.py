@@ -1720,6 +1720,7 @@ def _configure(options):
     else:
         overlay_path = None
     config.set_args(options)
+    plugins.bump_generation()
 
     # Configure the logger.
     if config["verbose"].get(int):
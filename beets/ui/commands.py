@@ -18,14 +18,26 @@ interface.
 
 import os
 import re
+import sqlite3
 from collections import Counter
 from collections.abc import Sequence
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from platform import python_version
 from typing import Any, NamedTuple
 
 import beets
-from beets import autotag, config, importer, library, logging, plugins, ui, util
+from beets import (
+    autotag,
+    config,
+    dbcore,
+    importer,
+    library,
+    logging,
+    plugins,
+    ui,
+    util,
+)
 from beets.autotag import Recommendation, hooks
 from beets.ui import (
     decargs,
@@ -1616,100 +1628,243 @@ default_commands.append(list_cmd)
 # update: Update library contents according to on-disk tags.
 
 
-def update_items(lib, query, album, move, pretend, fields, exclude_fields=None):
+class ScannedDirectories:
+    """The modification times of the directories of the library when
+    `beet update` last scanned all their items, kept in an SQLite
+    database. An incremental update skips the directories whose
+    modification time has not changed since.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(syspath(path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS directories"
+            " (path BLOB PRIMARY KEY, mtime INTEGER NOT NULL) WITHOUT ROWID"
+        )
+
+    def get(self, path):
+        """Get the modification time of a directory when it was last
+        scanned, or None if it was never scanned.
+        """
+        row = self._conn.execute(
+            "SELECT mtime FROM directories WHERE path = ?", (path,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def record(self, mtimes):
+        """Record the modification times of the scanned directories,
+        given as a dict mapping their paths to their times.
+        """
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                mtimes.items(),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def _stat_mtime(path):
+    """Get the modification time of a file in whole seconds, like
+    `Item.current_mtime`, or None if it does not exist.
+    """
+    if not path:
+        return None
+    try:
+        return int(os.stat(syspath(path)).st_mtime)
+    except OSError:
+        return None
+
+
+def _stat_dir_mtime(path):
+    """Get the precise modification time of a directory, in nanoseconds,
+    or None if it does not exist.
+    """
+    try:
+        return os.stat(syspath(path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _update_item(lib, item, mtime, item_fields, move, pretend):
+    """Update the library to reflect the tags of one item, whose file's
+    modification time is `mtime` (or None if it is gone). Return whether
+    its album needs updating too. Raise a `ReadError` if its file
+    cannot be read.
+    """
+    # Item deleted?
+    if mtime is None:
+        ui.print_(format(item))
+        ui.print_(ui.colorize("text_error", "  deleted"))
+        if not pretend:
+            item.remove(True)
+        return True
+
+    # Did the item change since last checked?
+    if mtime <= item.mtime:
+        log.debug(
+            "skipping {0} because mtime is up to date ({1})",
+            displayable_path(item.path),
+            item.mtime,
+        )
+        return False
+
+    # Read new data.
+    old_artist, old_albumartist = item.artist, item.albumartist
+    item.read()
+
+    # Special-case album artist when it matches track artist. (Hacky
+    # but necessary for preserving album-level metadata for non-
+    # autotagged imports.)
+    if not item.albumartist:
+        if old_albumartist == old_artist == item.artist:
+            item.albumartist = old_albumartist
+            item._dirty.discard("albumartist")
+
+    # Check for and display changes.
+    changed = ui.show_model_changes(item, fields=item_fields)
+
+    # Save changes.
+    if pretend:
+        return False
+    if changed:
+        # Move the item if it's in the library.
+        if move and lib.directory in ancestry(item.path):
+            item.move(store=False)
+
+        item.store(fields=item_fields)
+        return True
+
+    # The file's mtime was different, but there were no changes to the
+    # metadata. Store the new mtime, which is set in the call to read(),
+    # so we don't check this again in the future.
+    item.store(fields=item_fields)
+    return False
+
+
+def update_items(
+    lib,
+    query,
+    album,
+    move,
+    pretend,
+    fields,
+    exclude_fields=None,
+    incremental=None,
+):
     """For all the items matched by the query, update the library to
     reflect the item's embedded tags.
     :param fields: The fields to be stored. If not specified, all fields will
     be.
     :param exclude_fields: The fields to not be stored. If not specified, all
     fields will be.
+    :param incremental: Skip the directories that did not change since they
+    were last scanned. Defaults to the `update.incremental` option.
     """
-    with lib.transaction():
-        items, _ = _do_query(lib, query, album)
-        if move and fields is not None and "path" not in fields:
-            # Special case: if an item needs to be moved, the path field has to
-            # updated; otherwise the new path will not be reflected in the
-            # database.
-            fields.append("path")
-        if fields is None:
-            # no fields were provided, update all media fields
-            item_fields = fields or library.Item._media_fields
-            if move and "path" not in item_fields:
-                # move is enabled, add 'path' to the list of fields to update
-                item_fields.add("path")
-        else:
-            # fields was provided, just update those
-            item_fields = fields
-        # get all the album fields to update
-        album_fields = fields or library.Album._fields.keys()
-        if exclude_fields:
-            # remove any excluded fields from the item and album sets
-            item_fields = [f for f in item_fields if f not in exclude_fields]
-            album_fields = [f for f in album_fields if f not in exclude_fields]
-
-        # Walk through the items and pick up their changes.
-        affected_albums = set()
-        for item in items:
-            # Item deleted?
-            if not item.path or not os.path.exists(syspath(item.path)):
-                ui.print_(format(item))
-                ui.print_(ui.colorize("text_error", "  deleted"))
-                if not pretend:
-                    item.remove(True)
-                affected_albums.add(item.album_id)
-                continue
-
-            # Did the item change since last checked?
-            if item.current_mtime() <= item.mtime:
-                log.debug(
-                    "skipping {0} because mtime is up to date ({1})",
-                    displayable_path(item.path),
-                    item.mtime,
-                )
-                continue
-
-            # Read new data.
-            try:
-                item.read()
-            except library.ReadError as exc:
-                log.error(
-                    "error reading {0}: {1}", displayable_path(item.path), exc
+    update_config = config["update"]
+    if incremental is None:
+        incremental = update_config["incremental"].get(bool)
+    # The directories are only recorded as scanned when all their items
+    # were checked and stored with their new modification time.
+    record = not (pretend or query or album or fields or exclude_fields)
+
+    items, _ = _do_query(lib, query, album)
+    if move and fields is not None and "path" not in fields:
+        # Special case: if an item needs to be moved, the path field has to
+        # updated; otherwise the new path will not be reflected in the
+        # database.
+        fields.append("path")
+    if fields is None:
+        # no fields were provided, update all media fields
+        item_fields = fields or library.Item._media_fields
+        if move and "path" not in item_fields:
+            # move is enabled, add 'path' to the list of fields to update
+            item_fields.add("path")
+    else:
+        # fields was provided, just update those
+        item_fields = fields
+    # get all the album fields to update
+    album_fields = fields or library.Album._fields.keys()
+    if exclude_fields:
+        # remove any excluded fields from the item and album sets
+        item_fields = [f for f in item_fields if f not in exclude_fields]
+        album_fields = [f for f in album_fields if f not in exclude_fields]
+
+    scanned = None
+    if incremental or record:
+        scanned = ScannedDirectories(update_config["statefile"].as_filename())
+    dir_mtimes = {}
+    unchanged_dirs = set()
+    unreadable_dirs = set()
+
+    # Walk through the items and pick up their changes. The files of
+    # each batch of items are checked by several threads and their
+    # changes are written in one transaction.
+    affected_albums = set()
+    batch_size = max(update_config["batch_size"].get(int), 1)
+    workers = max(update_config["stat_workers"].get(int), 1)
+    try:
+        with ThreadPoolExecutor(workers) as executor:
+            items = iter(items)
+            while batch := list(islice(items, batch_size)):
+                dirs = {os.path.dirname(item.path) for item in batch}
+                dirs.difference_update(dir_mtimes)
+                dir_mtimes.update(
+                    zip(dirs, executor.map(_stat_dir_mtime, dirs))
                 )
-                continue
 
-            # Special-case album artist when it matches track artist. (Hacky
-            # but necessary for preserving album-level metadata for non-
-            # autotagged imports.)
-            if not item.albumartist:
-                old_item = lib.get_item(item.id)
-                if old_item.albumartist == old_item.artist == item.artist:
-                    item.albumartist = old_item.albumartist
-                    item._dirty.discard("albumartist")
-
-            # Check for and display changes.
-            changed = ui.show_model_changes(item, fields=item_fields)
-
-            # Save changes.
-            if not pretend:
-                if changed:
-                    # Move the item if it's in the library.
-                    if move and lib.directory in ancestry(item.path):
-                        item.move(store=False)
-
-                    item.store(fields=item_fields)
-                    affected_albums.add(item.album_id)
-                else:
-                    # The file's mtime was different, but there were no
-                    # changes to the metadata. Store the new mtime,
-                    # which is set in the call to read(), so we don't
-                    # check this again in the future.
-                    item.store(fields=item_fields)
+                if incremental:
+                    for path in dirs:
+                        mtime = dir_mtimes[path]
+                        if mtime is not None and mtime == scanned.get(path):
+                            log.debug(
+                                "skipping {0} because it is unchanged since "
+                                "it was scanned",
+                                displayable_path(path),
+                            )
+                            unchanged_dirs.add(path)
+                    batch = [
+                        item
+                        for item in batch
+                        if os.path.dirname(item.path) not in unchanged_dirs
+                    ]
+
+                mtimes = executor.map(_stat_mtime, [i.path for i in batch])
+                with lib.write_batch():
+                    for item, mtime in zip(batch, mtimes):
+                        try:
+                            if _update_item(
+                                lib, item, mtime, item_fields, move, pretend
+                            ):
+                                affected_albums.add(item.album_id)
+                        except library.ReadError as exc:
+                            log.error(
+                                "error reading {0}: {1}",
+                                displayable_path(item.path),
+                                exc,
+                            )
+                            unreadable_dirs.add(os.path.dirname(item.path))
+
+        if record:
+            # Directories with unreadable files are checked again next time.
+            scanned.record(
+                {
+                    d: m
+                    for d, m in dir_mtimes.items()
+                    if m is not None and d not in unreadable_dirs
+                }
+            )
+    finally:
+        if scanned:
+            scanned.close()
 
-        # Skip album changes while pretending.
-        if pretend:
-            return
+    # Skip album changes while pretending.
+    if pretend:
+        return
 
-        # Modify affected albums to reflect changes in their items.
+    # Modify affected albums to reflect changes in their items.
+    with lib.write_batch():
         for album_id in affected_albums:
             if album_id is None:  # Singletons.
                 continue
@@ -1752,6 +1907,7 @@ def update_func(lib, opts, args):
         opts.pretend,
         opts.fields,
         opts.exclude_fields,
+        opts.incremental,
     )
 
 
@@ -1801,6 +1957,19 @@ update_cmd.parser.add_option(
     dest="exclude_fields",
     help="list of fields to exclude from updates",
 )
+update_cmd.parser.add_option(
+    "-I",
+    "--incremental",
+    action="store_true",
+    default=None,
+    help="skip directories that did not change since they were scanned",
+)
+update_cmd.parser.add_option(
+    "--full",
+    action="store_false",
+    dest="incremental",
+    help="check every file, even in unchanged directories",
+)
 update_cmd.func = update_func
 default_commands.append(update_cmd)
 
@@ -1888,31 +2057,75 @@ default_commands.append(remove_cmd)
 # stats: Show library/query statistics.
 
 
+# The statistics of `show_stats`, computed by SQLite when the query allows.
+_STATS_COLUMNS = [
+    "COUNT(*)",
+    "TOTAL(length)",
+    "COALESCE(SUM(CAST(length * bitrate / 8 AS INTEGER)), 0)",
+    "COUNT(DISTINCT COALESCE(artist, ''))",
+    "COUNT(DISTINCT NULLIF(album_id, 0))",
+    "COUNT(DISTINCT COALESCE(albumartist, ''))",
+]
+
+
+def _exact_size(paths):
+    """Get the total size of the files at `paths`, stating them in
+    parallel.
+    """
+
+    def getsize(path):
+        try:
+            return os.path.getsize(syspath(path))
+        except OSError as exc:
+            log.info("could not get size of {}: {}", path, exc)
+            return 0
+
+    with ThreadPoolExecutor() as executor:
+        return sum(executor.map(getsize, paths))
+
+
 def show_stats(lib, query, exact):
     """Shows some statistics about the matched items."""
-    items = lib.items(query)
+    rows = lib.select(library.Item, query, _STATS_COLUMNS)
+    if rows is not None:
+        # The whole query runs in SQLite: aggregate without loading items.
+        (
+            total_items,
+            total_time,
+            total_size,
+            num_artists,
+            num_albums,
+            num_album_artists,
+        ) = rows[0]
+        if exact:
+            paths = lib.select(library.Item, query, ["path"])
+            total_size = _exact_size(row[0] for row in paths)
+    else:
+        total_size = 0
+        total_time = 0.0
+        total_items = 0
+        artists = set()
+        albums = set()
+        album_artists = set()
+        paths = []
 
-    total_size = 0
-    total_time = 0.0
-    total_items = 0
-    artists = set()
-    albums = set()
-    album_artists = set()
+        for item in lib.items(query):
+            if exact:
+                paths.append(item.path)
+            else:
+                total_size += int(item.length * item.bitrate / 8)
+            total_time += item.length
+            total_items += 1
+            artists.add(item.artist)
+            album_artists.add(item.albumartist)
+            if item.album_id:
+                albums.add(item.album_id)
 
-    for item in items:
         if exact:
-            try:
-                total_size += os.path.getsize(syspath(item.path))
-            except OSError as exc:
-                log.info("could not get size of {}: {}", item.path, exc)
-        else:
-            total_size += int(item.length * item.bitrate / 8)
-        total_time += item.length
-        total_items += 1
-        artists.add(item.artist)
-        album_artists.add(item.albumartist)
-        if item.album_id:
-            albums.add(item.album_id)
+            total_size = _exact_size(paths)
+        num_artists = len(artists)
+        num_albums = len(albums)
+        num_album_artists = len(album_artists)
 
     size_str = "" + ui.human_bytes(total_size)
     if exact:
@@ -1930,9 +2143,9 @@ Album artists: {}""".format(
             f" ({total_time:.2f} seconds)" if exact else "",
             "Total size" if exact else "Approximate total size",
             size_str,
-            len(artists),
-            len(albums),
-            len(album_artists),
+            num_artists,
+            num_albums,
+            num_album_artists,
         ),
     )
 
@@ -2025,7 +2238,7 @@ def modify_items(lib, mods, dels, query, write, move, album, confirm, inherit):
         )
 
     # Apply changes to database and files
-    with lib.transaction():
+    with lib.write_batch():
         for obj in changed:
             obj.try_sync(write, move, inherit)
 
@@ -2413,6 +2626,82 @@ config_cmd.func = config_func
 default_commands.append(config_cmd)
 
 
+# index: Manage database indexes.
+
+
+def index_func(lib, opts, args):
+    model_cls = library.Album if opts.album else library.Item
+    declared = {index.name for index in lib._model_indexes(model_cls)}
+
+    if opts.create:
+        if not args:
+            raise ui.UserError("no fields to index given")
+        unknown = [f for f in args if f not in model_cls._fields]
+        if unknown:
+            raise ui.UserError(
+                "only fixed fields can be indexed: {}".format(
+                    ", ".join(unknown)
+                )
+            )
+        index = dbcore.Index(model_cls._table, tuple(args))
+        lib.create_index(index)
+        print_(f"created index {index.name}")
+
+    elif opts.drop:
+        if not args:
+            raise ui.UserError("no indexes to drop given")
+        existing = lib.indexes()
+        for name in args:
+            if name not in existing:
+                raise ui.UserError(f"no such index: {name}")
+            if name.startswith("sqlite_"):
+                raise ui.UserError(f"index {name} belongs to a constraint")
+        for name in args:
+            lib.drop_index(name)
+            print_(f"dropped index {name}")
+            if name in declared:
+                log.warning(
+                    "index {} is configured and will be recreated when "
+                    "the library is opened again",
+                    name,
+                )
+
+    elif not opts.analyze:
+        for name, index in lib.indexes().items():
+            print_(
+                "{}: {} ({})".format(
+                    name, index.table, ", ".join(index.columns)
+                )
+            )
+
+    if opts.analyze:
+        lib.analyze()
+
+
+index_cmd = ui.Subcommand("index", help="list, create or drop database indexes")
+index_cmd.parser.add_option(
+    "-c",
+    "--create",
+    action="store_true",
+    help="create an index on the given fields",
+)
+index_cmd.parser.add_option(
+    "-d",
+    "--drop",
+    action="store_true",
+    help="drop the indexes with the given names",
+)
+index_cmd.parser.add_option(
+    "-z",
+    "--analyze",
+    action="store_true",
+    help="update the statistics used to pick indexes",
+)
+index_cmd.parser.add_album_option()
+index_cmd.func = index_func
+default_commands.append(index_cmd)
+
+
 # completion: print completion script
 
 
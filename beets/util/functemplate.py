@@ -84,10 +84,35 @@ def ex_call(func, args):
     return ast.Call(func, args, [])
 
 
-def compile_func(arg_names, statements, name="_the_func", debug=False):
+def ex_lambda(body):
+    """A lambda expression without parameters."""
+    return ast.Lambda(
+        ast.arguments(
+            posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]
+        ),
+        body,
+    )
+
+
+def ex_join(exprs):
+    """An expression joining the string conversions of some expressions."""
+    return ex_call(
+        ast.Attribute(ex_literal(""), "join", ast.Load()),
+        [
+            ex_call(
+                "map", [ex_rvalue(str.__name__), ast.List(exprs, ast.Load())]
+            )
+        ],
+    )
+
+
+def compile_func(
+    arg_names, statements, name="_the_func", debug=False, namespace=None
+):
     """Compile a list of statements as the body of a function and return
-    the resulting Python function. If `debug`, then print out the
-    bytecode of the compiled function.
+    the resulting Python function. The names in `namespace` are available
+    as globals to the function. If `debug`, then print out the bytecode of
+    the compiled function.
     """
     args_fields = {
         "args": [ast.arg(arg=n, annotation=None) for n in arg_names],
@@ -121,10 +146,117 @@ def compile_func(arg_names, statements, name="_the_func", debug=False):
                 dis.dis(const)
 
     the_locals = {}
-    exec(prog, {}, the_locals)
+    exec(prog, dict(namespace or {}), the_locals)
     return the_locals[name]
 
 
+# Template function markers.
+
+
+def pure(func):
+    """Mark a template function as pure: its result only depends on its
+    arguments. Compiled templates evaluate calls to pure functions with
+    literal arguments only once.
+    """
+    func.pure = True
+    return func
+
+
+def lazy(func):
+    """Mark a template function as taking its arguments unevaluated. Each
+    argument is passed as a callable that returns its value, so that
+    functions like ``%if`` only evaluate the arguments they use. Use
+    `force` to get the value of an argument.
+    """
+    func.lazy = True
+    return func
+
+
+def force(arg):
+    """Get the value of an argument of a `lazy` template function, which
+    may also be called directly with plain values.
+    """
+    return arg() if callable(arg) else arg
+
+
+class _Compiler:
+    """The state of the translation of a template to a Python function:
+    the fields whose values are looked up once when the function starts,
+    and the call sites it uses.
+    """
+
+    def __init__(self):
+        self.fields = {}
+        self.namespace = {}
+
+    def field(self, symbol):
+        """Get the expression of the local variable holding the value of
+        a field looked up at the start of the function.
+        """
+        if symbol.ident not in self.fields:
+            self.fields[symbol.ident] = (
+                f"{VARIABLE_PREFIX}{len(self.fields)}",
+                symbol.original,
+            )
+        return ex_rvalue(self.fields[symbol.ident][0])
+
+    def call_site(self, call, constant):
+        """Get the expression of the `_CallSite` object for a call."""
+        name = f"{FUNCTION_PREFIX}{len(self.namespace)}"
+        self.namespace[name] = _CallSite(call.ident, call.original, constant)
+        return ex_rvalue(name)
+
+    def statements(self):
+        """The statements looking up the values of the fields."""
+        return [
+            ast.Assign(
+                [ast.Name(name, ast.Store())],
+                ex_call(
+                    ast.Attribute(ex_rvalue("values"), "get", ast.Load()),
+                    [ident, original],
+                ),
+            )
+            for ident, (name, original) in self.fields.items()
+        ]
+
+
+class _CallSite:
+    """A function call in a compiled template. Calling it with the
+    template functions and the (possibly unevaluated) arguments behaves
+    like `Call.evaluate`.
+    """
+
+    def __init__(self, ident, original, constant):
+        self.ident = ident
+        self.original = original
+        self.constant = constant
+        # The function and result of the last call, for pure functions
+        # called with literal arguments.
+        self._folded = None
+
+    def __call__(self, functions, *args):
+        func = functions.get(self.ident)
+        if func is None:
+            return self.original
+
+        folded = self._folded
+        if folded is not None and folded[0] is func:
+            return folded[1]
+
+        if not getattr(func, "lazy", False):
+            args = [force(arg) for arg in args]
+        try:
+            out = str(func(*args))
+        except Exception as exc:
+            # Function raised exception! Maybe inlining the name of
+            # the exception will help debug.
+            return "<%s>" % str(exc)
+
+        if self.constant and getattr(func, "pure", False):
+            self._folded = (func, out)
+        return out
+
+
 # AST nodes for the template language.
 
 
@@ -149,11 +281,17 @@ class Symbol:
             # Keep original text.
             return self.original
 
-    def translate(self):
-        """Compile the variable lookup."""
-        ident = self.ident
-        expr = ex_rvalue(VARIABLE_PREFIX + ident)
-        return [expr], {ident}, set()
+    def translate(self, compiler, top_level=False):
+        """Compile the variable lookup. Fields used at the top level of
+        the template are always needed, so they are looked up up front;
+        the others only when they are evaluated.
+        """
+        if top_level or self.ident in compiler.fields:
+            return compiler.field(self)
+        return ex_call(
+            ast.Attribute(ex_rvalue("values"), "get", ast.Load()),
+            [self.ident, self.original],
+        )
 
 
 class Call:
@@ -174,9 +312,15 @@ class Call:
         Unicode string.
         """
         if self.ident in env.functions:
-            arg_vals = [expr.evaluate(env) for expr in self.args]
+            func = env.functions[self.ident]
+            if getattr(func, "lazy", False):
+                arg_vals = [
+                    functools.partial(expr.evaluate, env) for expr in self.args
+                ]
+            else:
+                arg_vals = [expr.evaluate(env) for expr in self.args]
             try:
-                out = env.functions[self.ident](*arg_vals)
+                out = func(*arg_vals)
             except Exception as exc:
                 # Function raised exception! Maybe inlining the name of
                 # the exception will help debug.
@@ -185,36 +329,26 @@ class Call:
         else:
             return self.original
 
-    def translate(self):
-        """Compile the function call."""
-        varnames = set()
-        funcnames = {self.ident}
-
+    def translate(self, compiler, top_level=False):
+        """Compile the function call. Arguments made of text only are
+        passed as strings and the others as callables evaluating them,
+        which are only called if the function needs them.
+        """
         arg_exprs = []
         for arg in self.args:
-            subexprs, subvars, subfuncs = arg.translate()
-            varnames.update(subvars)
-            funcnames.update(subfuncs)
-
-            # Create a subexpression that joins the result components of
-            # the arguments.
-            arg_exprs.append(
-                ex_call(
-                    ast.Attribute(ex_literal(""), "join", ast.Load()),
-                    [
-                        ex_call(
-                            "map",
-                            [
-                                ex_rvalue(str.__name__),
-                                ast.List(subexprs, ast.Load()),
-                            ],
-                        )
-                    ],
-                )
-            )
+            text = arg.text()
+            if text is not None:
+                arg_exprs.append(ex_literal(text))
+            else:
+                arg_exprs.append(ex_lambda(arg.translate_value(compiler)))
 
-        subexpr_call = ex_call(FUNCTION_PREFIX + self.ident, arg_exprs)
-        return [subexpr_call], varnames, funcnames
+        constant = len(arg_exprs) == sum(
+            isinstance(arg, ast.Constant) for arg in arg_exprs
+        )
+        return ex_call(
+            compiler.call_site(self, constant),
+            [ex_rvalue("functions"), *arg_exprs],
+        )
 
 
 class Expression:
@@ -240,22 +374,37 @@ class Expression:
                 out.append(part.evaluate(env))
         return "".join(map(str, out))
 
-    def translate(self):
-        """Compile the expression to a list of Python AST expressions, a
-        set of variable names used, and a set of function names.
+    def text(self):
+        """Get the text of an expression without Symbols and Calls, or
+        None.
+        """
+        if all(isinstance(part, str) for part in self.parts):
+            return "".join(self.parts)
+        return None
+
+    def translate(self, compiler, top_level=False):
+        """Compile the expression to a list of Python AST expressions,
+        merging adjacent text.
         """
         expressions = []
-        varnames = set()
-        funcnames = set()
         for part in self.parts:
-            if isinstance(part, str):
-                expressions.append(ex_literal(part))
+            if not isinstance(part, str):
+                expressions.append(part.translate(compiler, top_level))
+            elif expressions and isinstance(expressions[-1], ast.Constant):
+                expressions[-1] = ex_literal(expressions[-1].value + part)
             else:
-                e, v, f = part.translate()
-                expressions.extend(e)
-                varnames.update(v)
-                funcnames.update(f)
-        return expressions, varnames, funcnames
+                expressions.append(ex_literal(part))
+        return expressions
+
+    def translate_value(self, compiler):
+        """Compile the expression to a Python AST expression evaluating
+        to its string value.
+        """
+        expressions = self.translate(compiler)
+        if len(expressions) == 1 and isinstance(self.parts[0], Call):
+            # Calls already evaluate to strings.
+            return expressions[0]
+        return ex_join(expressions)
 
 
 # Parser.
@@ -545,66 +694,27 @@ class Template:
 
     def interpret(self, values={}, functions={}):
         """Like `substitute`, but forces the interpreter (rather than
-        the compiled version) to be used. The interpreter includes
-        exception-handling code for missing variables and buggy template
-        functions but is much slower.
+        the compiled version) to be used. The interpreter is much slower.
         """
         return self.expr.evaluate(Environment(values, functions))
 
     def substitute(self, values={}, functions={}):
         """Evaluate the template given the values and functions."""
-        try:
-            res = self.compiled(values, functions)
-        except Exception:  # Handle any exceptions thrown by compiled version.
-            res = self.interpret(values, functions)
-
-        return res
+        return self.compiled(values, functions)
 
     def translate(self):
         """Compile the template to a Python function."""
-        expressions, varnames, funcnames = self.expr.translate()
-
-        argnames = []
-        for varname in varnames:
-            argnames.append(VARIABLE_PREFIX + varname)
-        for funcname in funcnames:
-            argnames.append(FUNCTION_PREFIX + funcname)
-
-        func = compile_func(
-            argnames,
-            [ast.Return(ast.List(expressions, ast.Load()))],
+        text = self.expr.text()
+        if text is not None:
+            return lambda values={}, functions={}: text
+
+        compiler = _Compiler()
+        for part in self.expr.parts:
+            if isinstance(part, Symbol):
+                compiler.field(part)
+        expressions = self.expr.translate(compiler, top_level=True)
+        return compile_func(
+            ["values", "functions"],
+            [*compiler.statements(), ast.Return(ex_join(expressions))],
+            namespace=compiler.namespace,
         )
-
-        def wrapper_func(values={}, functions={}):
-            args = {}
-            for varname in varnames:
-                args[VARIABLE_PREFIX + varname] = values[varname]
-            for funcname in funcnames:
-                args[FUNCTION_PREFIX + funcname] = functions[funcname]
-            parts = func(**args)
-            return "".join(parts)
-
-        return wrapper_func
-
-
-# Performance tests.
-
-if __name__ == "__main__":
-    import timeit
-
-    _tmpl = Template("foo $bar %baz{foozle $bar barzle} $bar")
-    _vars = {"bar": "qux"}
-    _funcs = {"baz": str.upper}
-    interp_time = timeit.timeit(
-        "_tmpl.interpret(_vars, _funcs)",
-        "from __main__ import _tmpl, _vars, _funcs",
-        number=10000,
-    )
-    print(interp_time)
-    comp_time = timeit.timeit(
-        "_tmpl.substitute(_vars, _funcs)",
-        "from __main__ import _tmpl, _vars, _funcs",
-        number=10000,
-    )
-    print(comp_time)
-    print("Speedup:", interp_time / comp_time)
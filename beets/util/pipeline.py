@@ -28,13 +28,30 @@ When running a parallel pipeline, it is also possible to use
 multiple coroutines for the same pipeline stage; this lets you speed
 up a bottleneck stage by dividing its work among multiple threads.
 To do so, pass an iterable of coroutines to the Pipeline constructor
-in place of any single coroutine.
+in place of any single coroutine. The messages of such a stage are sent
+on as soon as they are ready, unless the coroutines are wrapped in
+`ordered`, in which case they are sent on in the order in which the stage
+received them.
+
+Stages that are limited by the CPU rather than by I/O can hand their
+work to a pool of processes instead, so that they are not held back by
+the GIL: see `process_stage` and `ProcessPool`. Their messages keep their
+order, and stage functions can still return BUBBLE or `multiple`.
+
+The time the threads of each stage spend working, waiting for messages
+and waiting for the next stage to accept theirs is recorded in the
+`StageStats` of the pipeline, to find the stage that slows it down.
 """
 
 from __future__ import annotations
 
+import multiprocessing
+import os
 import queue
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
 from threading import Lock, Thread
 from typing import Callable, Generator, TypeVar
 
@@ -141,6 +158,189 @@ class CountedQueue(queue.Queue):
                     _invalidate_queue(self, POISON, False)
 
 
+class StageStats:
+    """Statistics about the threads running a stage of a parallel
+    pipeline: how many messages they processed and how long they spent
+    processing them (`busy`), waiting for messages (`idle`) and waiting
+    for the next stage to accept their messages (`blocked`). The times
+    are summed over the threads of the stage.
+    """
+
+    def __init__(self, name, workers, in_queue=None):
+        self.name = name
+        self.workers = workers
+        self.in_queue = in_queue
+        self.messages = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.max_queue_depth = 0
+        self._lock = Lock()
+
+    @property
+    def queue_depth(self):
+        """The number of messages waiting to be processed by the stage."""
+        if self.in_queue is None:
+            return 0
+        return self.in_queue.qsize()
+
+    def add(self, messages=0, busy=0.0, idle=0.0, blocked=0.0):
+        """Record the work done by one of the threads."""
+        with self._lock:
+            self.messages += messages
+            self.busy += busy
+            self.idle += idle
+            self.blocked += blocked
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def throughput(self, elapsed):
+        """The number of messages processed per second over `elapsed`
+        seconds.
+        """
+        return self.messages / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.name} ({self.workers} thread(s)): {self.messages} "
+            f"messages, busy {self.busy:.2f}s, idle {self.idle:.2f}s, "
+            f"blocked {self.blocked:.2f}s, queue depth up to "
+            f"{self.max_queue_depth}"
+        )
+
+
+class OrderedStage(tuple):
+    """Coroutines running a pipeline stage in several threads, whose
+    messages are sent to the next stage in the order in which the stage
+    received them.
+    """
+
+
+def ordered(coros):
+    """Run the stage of a parallel pipeline with each coroutine in
+    `coros` in its own thread, keeping the order of the messages.
+    """
+    return OrderedStage(coros)
+
+
+def process_executor(workers, initializer=None, initargs=()):
+    """Make a `ProcessPoolExecutor` with `workers` processes that are
+    started from a fork server, or spawned where there is none, but
+    never forked: the executor starts them from a pipeline thread while
+    the other threads may hold locks, which a forked child would keep
+    forever. The processes start with a fresh interpreter, so
+    `initializer` should set up whatever state they need.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=context,
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+class ProcessPool:
+    """A pool of worker processes that the coroutines of a pipeline stage
+    can hand work to with `call`. The processes only run while the stage
+    is part of a parallel pipeline; otherwise, the work is done in the
+    calling thread.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def start(self):
+        self._executor = process_executor(self.workers)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def call(self, func, *args):
+        """Call `func` with `args` in one of the processes and wait for
+        its result. The function, its arguments and its result must be
+        picklable.
+        """
+        if self._executor is None:
+            return func(*args)
+        return self._executor.submit(func, *args).result()
+
+
+class ProcessStage(OrderedStage):
+    """The coroutines of an ordered stage that hand their work to `pool`,
+    which runs while the pipeline runs in parallel. There should be as
+    many coroutines as processes in the pool.
+    """
+
+    def __new__(cls, pool, coros):
+        stage = super().__new__(cls, coros)
+        stage.pool = pool
+        return stage
+
+
+def _process_coro(pool, func, args):
+    msg = None
+    while True:
+        msg = yield msg
+        msg = pool.call(func, *args, msg)
+
+
+def process_stage(func, *args, workers=None):
+    """Make a pipeline stage that calls `func(*args, msg)` for each
+    message in a pool of `workers` processes (as many as there are CPUs
+    by default) and sends what it returns to the next stage, in order.
+    The function, its arguments, the messages and the results must be
+    picklable.
+    """
+    pool = ProcessPool(workers)
+    return ProcessStage(
+        pool, [_process_coro(pool, func, args) for _ in range(pool.workers)]
+    )
+
+
+class _Sequencer:
+    """Numbers the messages received by the threads of an ordered stage
+    and sends their results to the next stage in the same order.
+    """
+
+    def __init__(self, in_queue, out_queue):
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self._get_lock = Lock()
+        self._put_lock = Lock()
+        self._next_in = 0
+        self._next_out = 0
+        self._pending = {}
+
+    def get(self):
+        """Get the next message with its sequence number."""
+        with self._get_lock:
+            msg = self.in_queue.get()
+            if msg is POISON:
+                return None, msg
+            seq = self._next_in
+            self._next_in += 1
+        return seq, msg
+
+    def put(self, seq, msgs, aborted):
+        """Send the messages produced for message `seq` once those of
+        all the previous messages have been sent. Stop if `aborted()`.
+        """
+        with self._put_lock:
+            self._pending[seq] = msgs
+            while self._next_out in self._pending:
+                for msg in self._pending.pop(self._next_out):
+                    if aborted():
+                        return
+                    self.out_queue.put(msg)
+                self._next_out += 1
+
+
 class MultiMessage:
     """A message yielded by a pipeline stage encapsulating multiple
     values to be sent to the next stage.
@@ -186,6 +386,7 @@ def stage(
     [3, 4, 5]
     """
 
+    @wraps(func)
     def coro(*args: Unpack[A]) -> Generator[R | T | None, T, None]:
         task: R | T | None = None
         while True:
@@ -210,6 +411,7 @@ def mutator_stage(func: Callable[[Unpack[A], T], R]):
     [{'x': True}, {'a': False, 'x': True}]
     """
 
+    @wraps(func)
     def coro(*args: Unpack[A]) -> Generator[T | None, T, None]:
         task = None
         while True:
@@ -235,12 +437,22 @@ def _allmsgs(obj):
 class PipelineThread(Thread):
     """Abstract base class for pipeline-stage threads."""
 
-    def __init__(self, all_threads):
+    def __init__(self, all_threads, stats=None):
         super().__init__()
         self.abort_lock = Lock()
         self.abort_flag = False
         self.all_threads = all_threads
         self.exc_info = None
+        self.stats = stats
+
+    def aborted(self):
+        with self.abort_lock:
+            return self.abort_flag
+
+    def record(self, **times):
+        """Add a message and the time spent on it to the stage's stats."""
+        if self.stats is not None:
+            self.stats.add(messages=1, **times)
 
     def abort(self):
         """Shut down the thread at the next chance possible."""
@@ -265,8 +477,8 @@ class FirstPipelineThread(PipelineThread):
     The coroutine should just be a generator.
     """
 
-    def __init__(self, coro, out_queue, all_threads):
-        super().__init__(all_threads)
+    def __init__(self, coro, out_queue, all_threads, stats=None):
+        super().__init__(all_threads, stats)
         self.coro = coro
         self.out_queue = out_queue
         self.out_queue.acquire()
@@ -274,22 +486,25 @@ class FirstPipelineThread(PipelineThread):
     def run(self):
         try:
             while True:
-                with self.abort_lock:
-                    if self.abort_flag:
-                        return
+                if self.aborted():
+                    return
 
                 # Get the value from the generator.
+                start = time.perf_counter()
                 try:
                     msg = next(self.coro)
                 except StopIteration:
                     break
+                busy = time.perf_counter() - start
 
                 # Send messages to the next stage.
                 for msg in _allmsgs(msg):
-                    with self.abort_lock:
-                        if self.abort_flag:
-                            return
+                    if self.aborted():
+                        return
                     self.out_queue.put(msg)
+                self.record(
+                    busy=busy, blocked=time.perf_counter() - start - busy
+                )
 
         except BaseException:
             self.abort_all(sys.exc_info())
@@ -304,12 +519,15 @@ class MiddlePipelineThread(PipelineThread):
     last.
     """
 
-    def __init__(self, coro, in_queue, out_queue, all_threads):
-        super().__init__(all_threads)
+    def __init__(
+        self, coro, in_queue, out_queue, all_threads, stats=None, sequencer=None
+    ):
+        super().__init__(all_threads, stats)
         self.coro = coro
         self.in_queue = in_queue
         self.out_queue = out_queue
         self.out_queue.acquire()
+        self.sequencer = sequencer
 
     def run(self):
         try:
@@ -317,28 +535,39 @@ class MiddlePipelineThread(PipelineThread):
             next(self.coro)
 
             while True:
-                with self.abort_lock:
-                    if self.abort_flag:
-                        return
+                if self.aborted():
+                    return
 
                 # Get the message from the previous stage.
-                msg = self.in_queue.get()
+                start = time.perf_counter()
+                if self.sequencer:
+                    seq, msg = self.sequencer.get()
+                else:
+                    msg = self.in_queue.get()
                 if msg is POISON:
                     break
+                received = time.perf_counter()
 
-                with self.abort_lock:
-                    if self.abort_flag:
-                        return
+                if self.aborted():
+                    return
 
                 # Invoke the current stage.
                 out = self.coro.send(msg)
+                processed = time.perf_counter()
 
                 # Send messages to next stage.
-                for msg in _allmsgs(out):
-                    with self.abort_lock:
-                        if self.abort_flag:
+                if self.sequencer:
+                    self.sequencer.put(seq, _allmsgs(out), self.aborted)
+                else:
+                    for msg in _allmsgs(out):
+                        if self.aborted():
                             return
-                    self.out_queue.put(msg)
+                        self.out_queue.put(msg)
+                self.record(
+                    idle=received - start,
+                    busy=processed - received,
+                    blocked=time.perf_counter() - processed,
+                )
 
         except BaseException:
             self.abort_all(sys.exc_info())
@@ -353,8 +582,8 @@ class LastPipelineThread(PipelineThread):
     should yield nothing.
     """
 
-    def __init__(self, coro, in_queue, all_threads):
-        super().__init__(all_threads)
+    def __init__(self, coro, in_queue, all_threads, stats=None):
+        super().__init__(all_threads, stats)
         self.coro = coro
         self.in_queue = in_queue
 
@@ -364,21 +593,24 @@ class LastPipelineThread(PipelineThread):
 
         try:
             while True:
-                with self.abort_lock:
-                    if self.abort_flag:
-                        return
+                if self.aborted():
+                    return
 
                 # Get the message from the previous stage.
+                start = time.perf_counter()
                 msg = self.in_queue.get()
                 if msg is POISON:
                     break
+                received = time.perf_counter()
 
-                with self.abort_lock:
-                    if self.abort_flag:
-                        return
+                if self.aborted():
+                    return
 
                 # Send to consumer.
                 self.coro.send(msg)
+                self.record(
+                    idle=received - start, busy=time.perf_counter() - received
+                )
 
         except BaseException:
             self.abort_all(sys.exc_info())
@@ -405,6 +637,11 @@ class Pipeline:
                 # Default to one thread per stage.
                 self.stages.append((stage,))
 
+        # The statistics of each stage and the duration of the last
+        # parallel run.
+        self.stats = []
+        self.elapsed = 0.0
+
     def run_sequential(self):
         """Run the pipeline sequentially in the current thread. The
         stages are run one after the other. Only the first coroutine
@@ -420,25 +657,45 @@ class Pipeline:
         queue_count = len(self.stages) - 1
         queues = [CountedQueue(queue_size) for i in range(queue_count)]
         threads = []
+        self.stats = [
+            StageStats(_stage_name(stage), len(stage), in_queue)
+            for stage, in_queue in zip(self.stages, [None] + queues)
+        ]
 
         # Set up first stage.
         for coro in self.stages[0]:
-            threads.append(FirstPipelineThread(coro, queues[0], threads))
+            threads.append(
+                FirstPipelineThread(coro, queues[0], threads, self.stats[0])
+            )
 
         # Middle stages.
         for i in range(1, queue_count):
+            sequencer = None
+            if isinstance(self.stages[i], OrderedStage):
+                sequencer = _Sequencer(queues[i - 1], queues[i])
             for coro in self.stages[i]:
                 threads.append(
                     MiddlePipelineThread(
-                        coro, queues[i - 1], queues[i], threads
+                        coro,
+                        queues[i - 1],
+                        queues[i],
+                        threads,
+                        self.stats[i],
+                        sequencer,
                     )
                 )
 
         # Last stage.
         for coro in self.stages[-1]:
-            threads.append(LastPipelineThread(coro, queues[-1], threads))
-
-        # Start threads.
+            threads.append(
+                LastPipelineThread(coro, queues[-1], threads, self.stats[-1])
+            )
+
+        # Start the process pools and threads.
+        pools = [s.pool for s in self.stages if isinstance(s, ProcessStage)]
+        for pool in pools:
+            pool.start()
+        start = time.perf_counter()
         for thread in threads:
             thread.start()
 
@@ -461,6 +718,9 @@ class Pipeline:
             # in normal operation, or aborted, in case of an exception.
             for thread in threads[:-1]:
                 thread.join()
+            self.elapsed = time.perf_counter() - start
+            for pool in pools:
+                pool.stop()
 
         for thread in threads:
             exc_info = thread.exc_info
@@ -492,3 +752,10 @@ class Pipeline:
                 msgs = next_msgs
             for msg in msgs:
                 yield msg
+
+
+def _stage_name(coros):
+    """A name for the stage run by the given coroutines: the name of the
+    function that made them.
+    """
+    return getattr(coros[0], "__name__", type(coros[0]).__name__)
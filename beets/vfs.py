@@ -16,6 +16,9 @@
 libraries.
 """
 
+from __future__ import annotations
+
+import pickle
 from typing import Any, NamedTuple
 
 from beets import util
@@ -40,6 +43,86 @@ def _insert(node, path, itemid):
         _insert(node.dirs[dirname], rest, itemid)
 
 
+def _remove(node, path, itemid):
+    """Remove an item from a virtual filesystem node, along with the
+    directories that it leaves empty.
+    """
+    if len(path) == 1:
+        if node.files.get(path[0]) == itemid:
+            del node.files[path[0]]
+    elif path[0] in node.dirs:
+        child = node.dirs[path[0]]
+        _remove(child, path[1:], itemid)
+        if not child.files and not child.dirs:
+            del node.dirs[path[0]]
+
+
+class LibTree:
+    """A filesystem-like directory tree for the files of a library that
+    can be updated item by item, instead of being built again whenever
+    the library changes.
+
+    `root` is the root node of the tree, as returned by `libtree`.
+    """
+
+    _version = 1
+    """The version of the format of the saved trees."""
+
+    def __init__(self):
+        self.root = Node({}, {})
+        # The path components of each item in the tree, by item id.
+        self.paths: dict[int, tuple[str, ...]] = {}
+
+    @classmethod
+    def build(cls, lib) -> LibTree:
+        """Build the tree of all the items in `lib`."""
+        tree = cls()
+        for item in lib.items():
+            tree.insert(item)
+        return tree
+
+    def insert(self, item):
+        """Put an item in the tree at its destination, moving it if it is
+        already in the tree.
+        """
+        dest = item.destination(relative_to_libdir=True)
+        parts = tuple(util.components(util.as_string(dest)))
+        if self.paths.get(item.id) == parts:
+            return
+        self.remove(item.id)
+        _insert(self.root, parts, item.id)
+        self.paths[item.id] = parts
+
+    def remove(self, itemid: int):
+        """Remove an item from the tree if it is there."""
+        parts = self.paths.pop(itemid, None)
+        if parts:
+            _remove(self.root, parts, itemid)
+
+    def save(self, path, key):
+        """Write the tree to the file at `path`, so that `load` returns
+        it for the same `key`.
+        """
+        with open(util.syspath(path), "wb") as f:
+            pickle.dump((self._version, key, self.root, self.paths), f)
+
+    @classmethod
+    def load(cls, path) -> tuple[LibTree, Any] | None:
+        """Read a tree written by `save`, along with its key. Return None
+        if there is no readable tree at `path`.
+        """
+        try:
+            with open(util.syspath(path), "rb") as f:
+                version, key, root, paths = pickle.load(f)
+        except Exception:
+            return None
+        if version != cls._version:
+            return None
+        tree = cls()
+        tree.root, tree.paths = root, paths
+        return tree, key
+
+
 def libtree(lib):
     """Generates a filesystem-like directory tree for the files
     contained in `lib`. Filesystem nodes are (files, dirs) named
@@ -47,9 +130,4 @@ def libtree(lib):
     maps filenames to Item ids. The second maps directory names to
     child node tuples.
     """
-    root = Node({}, {})
-    for item in lib.items():
-        dest = item.destination(relative_to_libdir=True)
-        parts = util.components(util.as_string(dest))
-        _insert(root, parts, item.id)
-    return root
+    return LibTree.build(lib).root
@@ -17,8 +17,10 @@
 import os
 import re
 import sys
+from collections import defaultdict
 from collections.abc import Mapping
 from dataclasses import dataclass
+from itertools import islice
 from mimetypes import guess_type
 from typing import ClassVar
 
@@ -40,6 +42,7 @@ from beets import config
 from beets.dbcore.query import (
     AndQuery,
     FixedFieldSort,
+    InQuery,
     MatchQuery,
     MultipleSort,
     NotQuery,
@@ -63,6 +66,10 @@ SERVER_INFO = {
     "features": ["albums", "artists", "images"],
 }
 
+# The number of IDs looked up in one query, which must stay below SQLite's
+# limit on the number of variables in a statement.
+ID_CHUNK_SIZE = 500
+
 # Maps AURA Track attribute to beets Item attribute
 TRACK_ATTR_MAP = {
     # Required
@@ -124,6 +131,16 @@ ARTIST_ATTR_MAP = {
 }
 
 
+def get_in(get, field, values, sort=None):
+    """Get the objects whose `field` is one of `values` with `get`, such
+    as `Library.items`, querying for `ID_CHUNK_SIZE` values at a time.
+    The objects are sorted by `sort` within each chunk.
+    """
+    for start in range(0, len(values), ID_CHUNK_SIZE):
+        chunk = values[start : start + ID_CHUNK_SIZE]
+        yield from get(InQuery(field, chunk), sort)
+
+
 @dataclass
 class AURADocument:
     """Base class for building AURA documents."""
@@ -213,17 +230,52 @@ class AURADocument:
                 ascending = True
             # Get the beets version of the attribute name
             beets_attr = self.attribute_map.get(aura_attr, aura_attr)
-            # Use slow sort so it works with all fields (inc. computed)
-            sorts.append(SlowFieldSort(beets_attr, ascending=ascending))
+            # Sort fixed fields in SQL, others (inc. computed) in Python
+            if beets_attr in self.model_cls._fields:
+                sort_cls = FixedFieldSort
+            else:
+                sort_cls = SlowFieldSort
+            sorts.append(sort_cls(beets_attr, ascending=ascending))
         return MultipleSort(sorts)
 
-    def paginate(self, collection):
+    def default_sort(self):
+        """Get the sort of the collection when the request has none."""
+        if self.model_cls is Album:
+            return self.lib.get_default_album_sort()
+        return self.lib.get_default_item_sort()
+
+    def get_page(self, query, sort, offset, limit):
+        """Get at most `limit` objects of the collection after skipping
+        the first `offset` ones.
+
+        When SQLite can evaluate the query and the sort, it picks the IDs
+        of the page, so that only the objects of the page are built.
+        """
+        sort = sort or self.default_sort()
+        rows = self.lib.select(
+            self.model_cls, query, ["id"], sort, limit, offset
+        )
+        if rows is None:
+            collection = self.get_collection(query=query, sort=sort)
+            return list(islice(collection, offset, offset + limit))
+
+        ids = [row["id"] for row in rows]
+        objs = {obj.id: obj for obj in get_in(self.get_collection, "id", ids)}
+        return [objs[id] for id in ids if id in objs]
+
+    @classmethod
+    def get_resource_objects(cls, lib: Library, objs):
+        """Construct the JSON:API resource objects of several objects.
+        Subclasses look up their relationships for all of them at once.
+        """
+        return [cls.get_resource_object(lib, obj) for obj in objs]
+
+    def paginate(self, query, sort):
         """Get a page of the collection and the URL to the next page.
 
         Args:
-            collection: The raw data from which resource objects can be
-                built. Could be an sqlite3.Cursor object (tracks and
-                albums) or a list of strings (artists).
+            query: A beets Query object.
+            sort: A beets Sort object, or None.
         """
         # Pages start from zero
         page = self.args.get("page", 0, int)
@@ -232,12 +284,12 @@ class AURADocument:
         limit = self.args.get("limit", default_limit, int)
         # start = offset of first item to return
         start = page * limit
-        # end = offset of last item + 1
-        end = start + limit
-        if end > len(collection):
-            end = len(collection)
+        # Get one more item to know whether there is a next page.
+        objs = self.get_page(query, sort, start, limit + 1)
+        if len(objs) <= limit:
             next_url = None
         else:
+            objs = objs[:limit]
             # Not the last page so work out links.next url
             if not self.args:
                 # No existing arguments, so current page is 0
@@ -250,11 +302,7 @@ class AURADocument:
                 next_url = request.url.replace(
                     f"page={page}", "page={}".format(page + 1)
                 )
-        # Get only the items in the page range
-        data = [
-            self.get_resource_object(self.lib, collection[i])
-            for i in range(start, end)
-        ]
+        data = self.get_resource_objects(self.lib, objs)
         return data, next_url
 
     def get_included(self, data, include_str):
@@ -274,43 +322,45 @@ class AURADocument:
         # under the "data" key to unique_identifiers, checking first that
         # it has not already been added. This ensures that no resources are
         # included more than once.
-        unique_identifiers = []
+        unique_identifiers = {}
         for res_obj in data:
             for rel_name, rel_obj in res_obj["relationships"].items():
                 if rel_name in to_include:
                     # NOTE: Assumes relationship is to-many
                     for identifier in rel_obj["data"]:
-                        if identifier not in unique_identifiers:
-                            unique_identifiers.append(identifier)
-        # TODO: I think this could be improved
-        included = []
-        for identifier in unique_identifiers:
-            res_type = identifier["type"]
+                        key = (identifier["type"], identifier["id"])
+                        unique_identifiers.setdefault(key, identifier)
+
+        # Build the resource objects of each type at once.
+        ids_by_type = defaultdict(list)
+        for res_type, res_id in unique_identifiers:
+            ids_by_type[res_type].append(res_id)
+        resources = {}
+        for res_type, res_ids in ids_by_type.items():
             if res_type == "track":
-                track_id = int(identifier["id"])
-                track = self.lib.get_item(track_id)
-                included.append(
-                    TrackDocument.get_resource_object(self.lib, track)
-                )
+                ids = [int(i) for i in res_ids]
+                objs = get_in(self.lib.items, "id", ids)
+                res_objs = TrackDocument.get_resource_objects(self.lib, objs)
             elif res_type == "album":
-                album_id = int(identifier["id"])
-                album = self.lib.get_album(album_id)
-                included.append(
-                    AlbumDocument.get_resource_object(self.lib, album)
-                )
+                ids = [int(i) for i in res_ids]
+                objs = get_in(self.lib.albums, "id", ids)
+                res_objs = AlbumDocument.get_resource_objects(self.lib, objs)
             elif res_type == "artist":
-                artist_id = identifier["id"]
-                included.append(
-                    ArtistDocument.get_resource_object(self.lib, artist_id)
+                res_objs = ArtistDocument.get_resource_objects(
+                    self.lib, res_ids
                 )
             elif res_type == "image":
-                image_id = identifier["id"]
-                included.append(
-                    ImageDocument.get_resource_object(self.lib, image_id)
-                )
+                res_objs = ImageDocument.get_resource_objects(self.lib, res_ids)
             else:
                 raise ValueError(f"Invalid resource type: {res_type}")
-        return included
+            for res_obj in res_objs:
+                # Resources that were not found are left out.
+                if res_obj:
+                    resources[res_type, res_obj["id"]] = res_obj
+
+        return [
+            resources[key] for key in unique_identifiers if key in resources
+        ]
 
     def all_resources(self):
         """Build document for /tracks, /albums or /artists."""
@@ -328,10 +378,8 @@ class AURADocument:
             )
         else:
             sort = None
-        # Get information from the library
-        collection = self.get_collection(query=query, sort=sort)
-        # Convert info to AURA form and paginate it
-        data, next_url = self.paginate(collection)
+        # Get a page of the information from the library in AURA form
+        data, next_url = self.paginate(query, sort)
         document = {"data": data}
         # If there are more pages then provide a way to access them
         if next_url:
@@ -457,12 +505,32 @@ class AlbumDocument(AURADocument):
         """
         return self.lib.albums(query, sort)
 
+    @classmethod
+    def get_resource_objects(cls, lib: Library, albums):
+        """Construct the JSON:API resource objects of several albums,
+        getting the tracks of all of them at once.
+        """
+        albums = list(albums)
+        album_ids = [album.id for album in albums]
+        sort = MultipleSort(
+            [FixedFieldSort("album_id"), FixedFieldSort("track")]
+        )
+        tracks = defaultdict(list)
+        for track in get_in(lib.items, "album_id", album_ids, sort):
+            tracks[track.album_id].append(track)
+        return [
+            cls.get_resource_object(lib, album, tracks[album.id])
+            for album in albums
+        ]
+
     @staticmethod
-    def get_resource_object(lib: Library, album):
+    def get_resource_object(lib: Library, album, tracks=None):
         """Construct a JSON:API resource object from a beets Album.
 
         Args:
             album: A beets Album object.
+            tracks: The tracks of the album sorted by track number, or
+                None to get them from the library.
         """
         attributes = {}
         # Use aura => beets attribute name map
@@ -473,11 +541,12 @@ class AlbumDocument(AURADocument):
             if a:
                 attributes[aura_attr] = a
 
-        # Get beets Item objects for all tracks in the album sorted by
-        # track number. Sorting is not required but it's nice.
-        query = MatchQuery("album_id", album.id)
-        sort = FixedFieldSort("track", ascending=True)
-        tracks = lib.items(query, sort)
+        if tracks is None:
+            # Get beets Item objects for all tracks in the album sorted by
+            # track number. Sorting is not required but it's nice.
+            query = MatchQuery("album_id", album.id)
+            sort = FixedFieldSort("track", ascending=True)
+            tracks = lib.items(query, sort)
         # JSON:API one-to-many relationship to tracks on the album
         relationships = {
             "tracks": {
@@ -543,23 +612,71 @@ class ArtistDocument(AURADocument):
         """
         # Gets only tracks with matching artist information
         tracks = self.lib.items(query, sort)
-        collection = []
-        for track in tracks:
-            # Do not add duplicates
-            if track.artist not in collection:
-                collection.append(track.artist)
-        return collection
+        # Do not add duplicates
+        return list(dict.fromkeys(track.artist for track in tracks))
+
+    def get_page(self, query, sort, offset, limit):
+        """Get at most `limit` artist names after skipping the first
+        `offset` ones.
+
+        Without a sort, the distinct names of the page are selected in
+        SQL, reading them from the (artist, title) index of the items;
+        SQLite still sorts them unless the sort is case-sensitive.
+        Otherwise only the artist field of the tracks is read, when SQLite
+        can evaluate the query.
+        """
+        if sort is None:
+            sort = FixedFieldSort(
+                "artist",
+                case_insensitive=config["sort_case_insensitive"].get(bool),
+            )
+            rows = self.lib.select(
+                Item, query, ["DISTINCT artist"], sort, limit, offset
+            )
+            if rows is not None:
+                return [row[0] for row in rows]
+
+        rows = self.lib.select(Item, query, ["artist"], sort)
+        if rows is None:
+            collection = self.get_collection(query=query, sort=sort)
+        else:
+            collection = list(dict.fromkeys(row[0] for row in rows))
+        return collection[offset : offset + limit]
+
+    @classmethod
+    def get_resource_objects(cls, lib: Library, artist_ids):
+        """Construct the JSON:API resource objects of several artists,
+        getting the tracks and albums of all of them at once.
+        """
+        artist_ids = list(artist_ids)
+        tracks = defaultdict(list)
+        for track in get_in(lib.items, "artist", artist_ids):
+            tracks[track.artist].append(track)
+        albums = defaultdict(list)
+        for album in get_in(lib.albums, "albumartist", artist_ids):
+            albums[album.albumartist].append(album)
+        return [
+            cls.get_resource_object(
+                lib, artist_id, tracks[artist_id], albums[artist_id]
+            )
+            for artist_id in artist_ids
+        ]
 
     @staticmethod
-    def get_resource_object(lib: Library, artist_id):
+    def get_resource_object(lib: Library, artist_id, tracks=None, albums=None):
         """Construct a JSON:API resource object for the given artist.
 
         Args:
             artist_id: A string which is the artist's name.
+            tracks: The tracks of the artist, or None to get them from
+                the library.
+            albums: The albums of the artist, or None to get them from
+                the library.
         """
-        # Get tracks where artist field exactly matches artist_id
-        query = MatchQuery("artist", artist_id)
-        tracks = lib.items(query)
+        if tracks is None:
+            # Get tracks where artist field exactly matches artist_id
+            query = MatchQuery("artist", artist_id)
+            tracks = lib.items(query)
         if not tracks:
             return None
 
@@ -580,8 +697,9 @@ class ArtistDocument(AURADocument):
                 "data": [{"type": "track", "id": str(t.id)} for t in tracks]
             }
         }
-        album_query = MatchQuery("albumartist", artist_id)
-        albums = lib.albums(query=album_query)
+        if albums is None:
+            album_query = MatchQuery("albumartist", artist_id)
+            albums = lib.albums(query=album_query)
         if len(albums) != 0:
             relationships["albums"] = {
                 "data": [{"type": "album", "id": str(a.id)} for a in albums]
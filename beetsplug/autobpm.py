@@ -20,12 +20,35 @@ from typing import TYPE_CHECKING
 
 import librosa
 
-from beets.plugins import BeetsPlugin
+from beets.plugins import BeetsPlugin, process_pool_stage
 from beets.ui import Subcommand, should_write
 
 if TYPE_CHECKING:
+    from pathlib import Path
+
     from beets.importer import ImportTask
     from beets.library import Item, Library
+    from beets.util.pipeline import ProcessPool
+
+
+def measure_bpm(path: Path, kwargs: dict) -> tuple[int | None, str | None]:
+    """Compute the tempo of the audio file at `path`. Return it with None,
+    or None with an error message if it cannot be computed.
+
+    This is done in the processes of the import stage's pool, so the
+    errors are returned as messages instead of being logged.
+    """
+    try:
+        y, sr = librosa.load(path, res_type="kaiser_fast")
+    except Exception as exc:
+        return None, f"Failed to load {path}: {exc}"
+
+    try:
+        tempo, _ = librosa.beat.beat_track(y=y, sr=sr, **kwargs)
+    except Exception as exc:
+        return None, f"Failed to measure BPM for {path}: {exc}"
+
+    return round(tempo[0] if isinstance(tempo, Iterable) else tempo), None
 
 
 class AutoBPMPlugin(BeetsPlugin):
@@ -52,10 +75,19 @@ class AutoBPMPlugin(BeetsPlugin):
     def command(self, lib: Library, _, args: list[str]) -> None:
         self.calculate_bpm(list(lib.items(args)), write=should_write())
 
-    def imported(self, _, task: ImportTask) -> None:
-        self.calculate_bpm(task.imported_items())
-
-    def calculate_bpm(self, items: list[Item], write: bool = False) -> None:
+    @process_pool_stage
+    def imported(
+        self, _, task: ImportTask, pool: ProcessPool | None = None
+    ) -> None:
+        self.calculate_bpm(task.imported_items(), pool=pool)
+
+    def calculate_bpm(
+        self,
+        items: list[Item],
+        write: bool = False,
+        pool: ProcessPool | None = None,
+    ) -> None:
+        kwargs = self.config["beat_track_kwargs"].flatten()
         for item in items:
             path = item.filepath
             if bpm := item.bpm:
@@ -63,20 +95,14 @@ class AutoBPMPlugin(BeetsPlugin):
                 if not self.config["overwrite"]:
                     continue
 
-            try:
-                y, sr = librosa.load(item.filepath, res_type="kaiser_fast")
-            except Exception as exc:
-                self._log.error("Failed to load {}: {}", path, exc)
-                continue
-
-            kwargs = self.config["beat_track_kwargs"].flatten()
-            try:
-                tempo, _ = librosa.beat.beat_track(y=y, sr=sr, **kwargs)
-            except Exception as exc:
-                self._log.error("Failed to measure BPM for {}: {}", path, exc)
+            if pool:
+                bpm, error = pool.call(measure_bpm, path, kwargs)
+            else:
+                bpm, error = measure_bpm(path, kwargs)
+            if error:
+                self._log.error("{}", error)
                 continue
 
-            bpm = round(tempo[0] if isinstance(tempo, Iterable) else tempo)
             item["bpm"] = bpm
             self._log.info("Computed BPM for {}: {}", path, bpm)
 
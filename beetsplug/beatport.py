@@ -358,6 +358,9 @@ class BeatportPlugin(BeetsPlugin):
             data_source=self.data_source, info=track_info, config=self.config
         )
 
+    def track_source_weight(self):
+        return self.data_source, self.config['source_weight'].as_number()
+
     def candidates(self, items, artist, release, va_likely, extra_tags=None):
         """Returns a list of AlbumInfo objects for beatport search results
         matching release and artist (if not various).
@@ -19,6 +19,8 @@ import timeit
 
 from beets import importer, library, plugins, ui, vfs
 from beets.autotag import match
+from beets.autotag.cache import metadata_cache
+from beets.autotag.hooks import string_dist_cache_info
 from beets.plugins import BeetsPlugin
 from beets.util.functemplate import Template
 
@@ -92,6 +94,53 @@ def match_benchmark(lib, prof, query=None, album_id=None):
         interval = timeit.timeit(_run_match, number=1)
         print("match duration:", interval)
 
+    for name, info in string_dist_cache_info().items():
+        lookups = info.hits + info.misses
+        print(
+            f"string distance cache of {name}:",
+            f"{info.hits} hits, {info.misses} misses",
+            f"({info.hits / lookups:.0%} hit rate)" if lookups else "",
+        )
+
+    if cache := metadata_cache():
+        print(
+            "metadata cache hits:",
+            cache.hits,
+            "stale hits:",
+            cache.stale_hits,
+            "misses:",
+            cache.misses,
+        )
+
+
+def template_benchmark(lib, prof, fmt, query=None):
+    # Compare the compiled and the interpreted evaluation of a template
+    # over the matched items.
+    tmpl = Template(fmt)
+    items = list(lib.items(query))
+
+    def _compiled():
+        for item in items:
+            item.evaluate_template(tmpl, for_path=True)
+
+    def _interpreted():
+        for item in items:
+            tmpl.interpret(
+                item.formatted(for_path=True), item._template_funcs()
+            )
+
+    if prof:
+        cProfile.runctx(
+            "_compiled()", {}, {"_compiled": _compiled}, "template.prof"
+        )
+    else:
+        interp_time = timeit.timeit(_interpreted, number=1)
+        print("interpreted:", interp_time)
+        comp_time = timeit.timeit(_compiled, number=1)
+        print("compiled:", comp_time)
+        if comp_time:
+            print("speedup:", interp_time / comp_time)
+
 
 class BenchmarkPlugin(BeetsPlugin):
     """A plugin for performing some simple performance benchmarks."""
@@ -128,4 +177,25 @@ class BenchmarkPlugin(BeetsPlugin):
             lib, opts.profile, ui.decargs(args), opts.id
         )
 
-        return [aunique_bench_cmd, match_bench_cmd]
+        template_bench_cmd = ui.Subcommand(
+            "bench_template", help="benchmark for template evaluation"
+        )
+        template_bench_cmd.parser.add_option(
+            "-p",
+            "--profile",
+            action="store_true",
+            default=False,
+            help="performance profiling",
+        )
+        template_bench_cmd.parser.add_option(
+            "-f",
+            "--format",
+            default="%if{$comp,Compilations,$albumartist}/$album%aunique{}/"
+            "$track %upper{$title}",
+            help="template to evaluate",
+        )
+        template_bench_cmd.func = lambda lib, opts, args: template_benchmark(
+            lib, opts.profile, opts.format, ui.decargs(args)
+        )
+
+        return [aunique_bench_cmd, match_bench_cmd, template_bench_cmd]
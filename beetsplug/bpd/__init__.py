@@ -17,23 +17,30 @@ Beets library. Attempts to implement a compatible protocol to allow
 use of the wide range of MPD clients.
 """
 
+import hashlib
 import inspect
 import math
+import os
 import random
 import re
 import socket
 import sys
+import threading
 import time
 import traceback
+from collections import OrderedDict
 from string import Template
 from typing import TYPE_CHECKING
 
+import confuse
+
 import beets
 import beets.ui
 from beets import dbcore, vfs
-from beets.library import Item
+from beets.dbcore.query import InQuery
+from beets.library import Album, Item
 from beets.plugins import BeetsPlugin
-from beets.util import as_string, bluelet
+from beets.util import as_string, bluelet, syspath
 
 if TYPE_CHECKING:
     from beets.dbcore.query import Query
@@ -67,6 +74,11 @@ ERROR_EXIST = 56
 VOLUME_MIN = 0
 VOLUME_MAX = 100
 
+# The number of items fetched from the library with a single query.
+ITEM_CHUNK_SIZE = 500
+# The number of recently used items kept in memory.
+ITEM_CACHE_SIZE = 2000
+
 SAFE_COMMANDS = (
     # Commands that are available when unauthenticated.
     "close",
@@ -283,9 +295,10 @@ class BaseServer:
         for conn in self.connections:
             conn.notify(event)
 
-    def _item_info(self, item):
+    def _item_info(self, item, pos=None):
         """An abstract method that should response lines containing a
-        single song's metadata.
+        single song's metadata. `pos` is the position of the song in the
+        playlist, if it is known.
         """
         raise NotImplementedError
 
@@ -605,16 +618,16 @@ class BaseServer:
         single track, given by its index.
         """
         if index is None:
-            for track in self.playlist:
-                yield self._item_info(track)
+            for pos, track in enumerate(self.playlist):
+                yield self._item_info(track, pos)
         else:
             indices = self._parse_range(index, accept_single_number=True)
             try:
-                tracks = [self.playlist[i] for i in indices]
+                tracks = [(i, self.playlist[i]) for i in indices]
             except IndexError:
                 raise ArgumentIndexError()
-            for track in tracks:
-                yield self._item_info(track)
+            for pos, track in tracks:
+                yield self._item_info(track, pos)
 
     def cmd_playlistid(self, conn, track_id=None):
         if track_id is not None:
@@ -937,6 +950,14 @@ class ControlConnection(Connection):
         """Callback from the player signalling a song finished playing."""
         yield bluelet.call(self.server.dispatch_events())
 
+    def ctrl_update_finished(self):
+        """Callback from the server signalling the directory tree was
+        rebuilt.
+        """
+        self.server._send_event("update")
+        self.server._send_event("database")
+        yield bluelet.call(self.server.dispatch_events())
+
     def ctrl_profile(self):
         """Memory profiling for debugging."""
         from guppy import hpy
@@ -1098,7 +1119,9 @@ class Server(BaseServer):
     to store its library.
     """
 
-    def __init__(self, library, host, port, password, ctrl_port, log):
+    def __init__(
+        self, library, host, port, password, ctrl_port, log, tree_cache=None
+    ):
         try:
             from beetsplug.bpd import gstplayer
         except ImportError as e:
@@ -1111,7 +1134,14 @@ class Server(BaseServer):
         super().__init__(host, port, password, ctrl_port, log)
         self.lib = library
         self.player = gstplayer.GstPlayer(self.play_finished)
-        self.cmd_update(None)
+        self.tree_cache = tree_cache
+        self._tree_lock = threading.Lock()
+        self._update_job = 0
+        self._updating = None
+        self._changed_ids = set()
+        self._item_cache = OrderedDict()
+        self._item_cache_state = None
+        self._load_tree()
         log.info("Server ready and listening on {}:{}".format(host, port))
         log.debug(
             "Listening for control signals on {}:{}".format(host, ctrl_port)
@@ -1128,25 +1158,39 @@ class Server(BaseServer):
 
     # Metadata helper functions.
 
-    def _item_info(self, item):
+    def _item_path(self, item):
+        """Get the path of an item in the directory tree."""
+        # The directory tree already knows the destinations of most items.
+        parts = self._libtree.paths.get(item["id"])
+        if parts:
+            return "/".join(parts)
+        if not isinstance(item, Item):
+            item = self.lib.get_item(item["id"])
+        return as_string(item.destination(relative_to_libdir=True))
+
+    def _item_info(self, item, pos=None):
+        """Get the response lines describing an item, which can also be
+        given as a dict of the values of its `id`, `length` and
+        `tagtype_map` fields.
+        """
         info_lines = [
-            "file: " + as_string(item.destination(relative_to_libdir=True)),
-            "Time: " + str(int(item.length)),
-            "duration: " + f"{item.length:.3f}",
-            "Id: " + str(item.id),
+            "file: " + self._item_path(item),
+            "Time: " + str(int(item["length"])),
+            "duration: " + f"{item['length']:.3f}",
+            "Id: " + str(item["id"]),
         ]
 
-        try:
-            pos = self._id_to_index(item.id)
+        if pos is None:
+            try:
+                pos = self._id_to_index(item["id"])
+            except ArgumentNotFoundError:
+                # Don't include position if not in playlist.
+                pass
+        if pos is not None:
             info_lines.append("Pos: " + str(pos))
-        except ArgumentNotFoundError:
-            # Don't include position if not in playlist.
-            pass
 
         for tagtype, field in self.tagtype_map.items():
-            info_lines.append(
-                "{}: {}".format(tagtype, str(getattr(item, field)))
-            )
+            info_lines.append("{}: {}".format(tagtype, str(item[field])))
 
         return info_lines
 
@@ -1168,19 +1212,178 @@ class Server(BaseServer):
     def _item_id(self, item):
         return item.id
 
+    def _get_items(self, item_ids):
+        """Generator yielding the items with the given ids in the same
+        order, skipping those that are not in the library.
+
+        The items are fetched with one query per chunk of ids, unless
+        they were used recently and the library has not changed since,
+        in this process or, as far as the modification times of the
+        database files tell, in another one.
+        """
+        cache = self._item_cache
+        for start in range(0, len(item_ids), ITEM_CHUNK_SIZE):
+            state = (self.lib.revision, self._db_mtimes())
+            if self._item_cache_state != state:
+                cache.clear()
+                self._item_cache_state = state
+
+            chunk = item_ids[start : start + ITEM_CHUNK_SIZE]
+            missing = [item_id for item_id in chunk if item_id not in cache]
+            if missing:
+                for item in self.lib.items(InQuery("id", missing)):
+                    cache[item.id] = item
+
+            for item_id in chunk:
+                item = cache.get(item_id)
+                if item is not None:
+                    cache.move_to_end(item_id)
+                    yield item
+
+            while len(cache) > ITEM_CACHE_SIZE:
+                cache.popitem(last=False)
+
     # Database updating.
 
-    def cmd_update(self, conn, path="/"):
-        """Updates the catalog to reflect the current database state."""
-        # Path is ignored. Also, the real MPD does this asynchronously;
-        # this is done inline.
-        self._log.debug("Building directory tree...")
-        self.tree = vfs.libtree(self.lib)
-        self._log.debug("Finished building directory tree.")
+    def _db_mtimes(self):
+        """Get the modification times of the library database and of its
+        write-ahead log, which change when any process writes to it.
+        """
+        mtimes = []
+        for suffix in (b"", b"-wal"):
+            try:
+                stat = os.stat(syspath(os.fsencode(self.lib.path) + suffix))
+            except OSError:
+                mtimes.append(None)
+            else:
+                mtimes.append(stat.st_mtime_ns)
+        return tuple(mtimes)
+
+    def _tree_key(self):
+        """Get the state of the library database and of the configuration
+        that the directory tree is built from, to find out whether a saved
+        tree is still up to date.
+        """
+        key = [os.fsdecode(self.lib.path), *self._db_mtimes()]
+        # Only a digest of the configuration is saved with the tree, since
+        # it may contain passwords.
+        key.append(hashlib.sha256(beets.config.dump().encode()).hexdigest())
+        return tuple(key)
+
+    def _set_tree(self, libtree):
+        self._libtree = libtree
+        self.tree = libtree.root
+
+    def _save_tree(self, libtree, key):
+        if not self.tree_cache:
+            return
+        try:
+            libtree.save(self.tree_cache, key)
+        except OSError as exc:
+            self._log.warning("could not save directory tree: {}", exc)
+
+    def _load_tree(self):
+        """Get the directory tree saved by a previous run if there is
+        one. A tree that is out of date is served while it is rebuilt in
+        the background. Without a saved tree, the tree is built before
+        the server starts listening.
+        """
+        key = self._tree_key()
+        saved = vfs.LibTree.load(self.tree_cache) if self.tree_cache else None
+        if saved is None:
+            self._log.debug("Building directory tree...")
+            self._set_tree(vfs.LibTree.build(self.lib))
+            self._log.debug("Finished building directory tree.")
+            self._save_tree(self._libtree, key)
+        else:
+            libtree, saved_key = saved
+            self._set_tree(libtree)
+            if saved_key != key:
+                self._log.debug("Directory tree is out of date.")
+                self._start_update()
         self.updated_time = time.time()
-        self._send_event("update")
+
+    def _refresh_items(self, libtree, item_ids):
+        """Move the items with the given ids to their destinations in the
+        tree, or remove them from it if they are not in the library
+        anymore.
+        """
+        for item_id in item_ids:
+            item = self.lib.get_item(item_id)
+            if item is None:
+                libtree.remove(item_id)
+            else:
+                libtree.insert(item)
+
+    def _start_update(self):
+        """Start rebuilding the directory tree in a background thread,
+        unless it is already being rebuilt, and return the id of the job.
+        """
+        with self._tree_lock:
+            if self._updating is not None:
+                return self._updating
+            self._update_job += 1
+            self._updating = self._update_job
+            self._changed_ids.clear()
+        threading.Thread(
+            target=self._update_tree, name="bpd-update", daemon=True
+        ).start()
+        return self._update_job
+
+    def _update_tree(self):
+        """Rebuild the directory tree and swap it with the one being
+        served. Run in a background thread so that clients are not kept
+        waiting; the clients are notified by the event loop once it gets
+        the ``update_finished`` control message.
+        """
+        key = self._tree_key()
+        self._log.debug("Building directory tree...")
+        try:
+            libtree = vfs.LibTree.build(self.lib)
+        except Exception as exc:
+            self._log.error("could not build directory tree: {}", exc)
+            libtree = None
+        else:
+            self._log.debug("Finished building directory tree.")
+            self._save_tree(libtree, key)
+
+        with self._tree_lock:
+            if libtree is not None:
+                # Catch up with the items changed during the rebuild.
+                self._refresh_items(libtree, self._changed_ids)
+                self._set_tree(libtree)
+                self.updated_time = time.time()
+                # Other processes may have changed the items.
+                self._item_cache_state = None
+            self._changed_ids.clear()
+            self._updating = None
+
+        try:
+            self._ctrl_send("update_finished")
+        except OSError:
+            # The server is not listening yet.
+            pass
+
+    def items_changed(self, item_ids):
+        """Update the directory tree after the items with the given ids
+        were changed, moved or removed.
+        """
+        item_ids = set(item_ids)
+        with self._tree_lock:
+            self._refresh_items(self._libtree, item_ids)
+            if self._updating is not None:
+                self._changed_ids |= item_ids
         self._send_event("database")
 
+    def cmd_update(self, conn, path="/"):
+        """Updates the catalog to reflect the current database state.
+        Like in MPD, this is done in the background.
+        """
+        # Path is ignored.
+        job = self._start_update()
+        self._send_event("update")
+        yield "updating_db: " + str(job)
+
     # Path (directory tree) browsing.
 
     def _resolve_path(self, path):
@@ -1219,8 +1422,8 @@ class Server(BaseServer):
             # Trying to list a track.
             raise BPDError(ERROR_ARG, "this is not a directory")
         else:
-            for name, itemid in iter(sorted(node.files.items())):
-                item = self.lib.get_item(itemid)
+            item_ids = [itemid for _, itemid in sorted(node.files.items())]
+            for item in self._get_items(item_ids):
                 yield self._item_info(item)
             for name, _ in iter(sorted(node.dirs.items())):
                 dirpath = self._path_join(path, name)
@@ -1236,16 +1439,21 @@ class Server(BaseServer):
         if isinstance(node, int):
             # List a single file.
             if info:
-                item = self.lib.get_item(node)
-                yield self._item_info(item)
+                for item in self._get_items([node]):
+                    yield self._item_info(item)
             else:
                 yield "file: " + basepath
         else:
             # List a directory. Recurse into both directories and files.
-            for name, itemid in sorted(node.files.items()):
-                newpath = self._path_join(basepath, name)
-                # "yield from"
-                yield from self._listall(newpath, itemid, info)
+            files = sorted(node.files.items())
+            if info:
+                # Fetch the items of the directory together.
+                item_ids = [itemid for _, itemid in files]
+                for item in self._get_items(item_ids):
+                    yield self._item_info(item)
+            else:
+                for name, _ in files:
+                    yield "file: " + self._path_join(basepath, name)
             for name, subdir in sorted(node.dirs.items()):
                 newpath = self._path_join(basepath, name)
                 yield "directory: " + newpath
@@ -1261,19 +1469,20 @@ class Server(BaseServer):
 
     # Playlist manipulation.
 
-    def _all_items(self, node):
-        """Generator yielding all items under a VFS node."""
+    def _item_ids(self, node):
+        """Generator yielding the ids of all items under a VFS node."""
         if isinstance(node, int):
-            # Could be more efficient if we built up all the IDs and
-            # then issued a single SELECT.
-            yield self.lib.get_item(node)
+            yield node
         else:
             # Recurse into a directory.
             for name, itemid in sorted(node.files.items()):
-                # "yield from"
-                yield from self._all_items(itemid)
+                yield itemid
             for name, subdir in sorted(node.dirs.items()):
-                yield from self._all_items(subdir)
+                yield from self._item_ids(subdir)
+
+    def _all_items(self, node):
+        """Generator yielding all items under a VFS node."""
+        return self._get_items(list(self._item_ids(node)))
 
     def _add(self, path, send_id=False):
         """Adds a track or directory to the playlist, specified by the
@@ -1300,6 +1509,8 @@ class Server(BaseServer):
 
     def cmd_status(self, conn):
         yield from super().cmd_status(conn)
+        if self._updating is not None:
+            yield "updating_db: " + str(self._updating)
         if self.current_index > -1:
             item = self.playlist[self.current_index]
 
@@ -1426,18 +1637,47 @@ class Server(BaseServer):
         else:  # No key-value pairs.
             return dbcore.query.TrueQuery()
 
+    def _select(self, query, columns, sort=None):
+        """Evaluate the SQL expressions `columns` over the items matching
+        `query` with a single statement, without building `Item` objects.
+        Return None if the query involves computed fields, which can only
+        be matched in Python.
+        """
+        rows = self.lib.select(Item, query, columns, sort)
+        if rows is None:
+            self._log.debug("query cannot be run in SQL: {}", query)
+        return rows
+
+    def _found_items(self, query):
+        """Generator yielding the items matching `query` in the default
+        order, as dicts of the fields shown by `_item_info` when the
+        query can be run in SQL.
+        """
+        sort = self.lib.get_default_item_sort()
+        fields = ["id", "length", *self.tagtype_map.values()]
+        rows = self._select(query, fields, sort)
+        if rows is None:
+            yield from self.lib.items(query, sort)
+            return
+        types = [Item._type(field) for field in fields]
+        for row in rows:
+            yield {
+                field: type_.from_sql(value)
+                for field, type_, value in zip(fields, types, row)
+            }
+
     def cmd_search(self, conn, *kv):
         """Perform a substring match for items."""
         query = self._metadata_query(
             dbcore.query.SubstringQuery, kv, allow_any_query=True
         )
-        for item in self.lib.items(query):
+        for item in self._found_items(query):
             yield self._item_info(item)
 
     def cmd_find(self, conn, *kv):
         """Perform an exact match for items."""
         query = self._metadata_query(dbcore.query.MatchQuery, kv)
-        for item in self.lib.items(query):
+        for item in self._found_items(query):
             yield self._item_info(item)
 
     def cmd_list(self, conn, show_tag, *kv):
@@ -1458,37 +1698,32 @@ class Server(BaseServer):
             raise BPDError(ERROR_ARG, "Incorrect number of filter arguments")
         query = self._metadata_query(dbcore.query.MatchQuery, kv)
 
-        clause, subvals = query.clause()
-        statement = (
-            "SELECT DISTINCT "
-            + show_key
-            + " FROM items WHERE "
-            + clause
-            + " ORDER BY "
-            + show_key
-        )
-        self._log.debug(statement)
-        with self.lib.transaction() as tx:
-            rows = tx.query(statement, subvals)
+        sort = dbcore.query.FixedFieldSort(show_key, case_insensitive=False)
+        rows = self._select(query, [f"DISTINCT {show_key}"], sort)
+        if rows is None:
+            values = sorted({item[show_key] for item in self.lib.items(query)})
+        else:
+            values = [row[0] for row in rows]
 
-        for row in rows:
-            if not row[0]:
+        for value in values:
+            if not value:
                 # Skip any empty values of the field.
                 continue
-            yield show_tag_canon + ": " + str(row[0])
+            yield show_tag_canon + ": " + str(value)
 
-    def cmd_count(self, conn, tag, value):
+    def cmd_count(self, conn, *kv):
         """Returns the number and total time of songs matching the
-        tag/value query.
+        tag/value pairs.
         """
-        _, key = self._tagtype_lookup(tag)
-        songs = 0
-        playtime = 0.0
-        for item in self.lib.items(
-            Item.field_query(key, value, dbcore.query.MatchQuery)
-        ):
-            songs += 1
-            playtime += item.length
+        if not kv or len(kv) % 2 != 0:
+            raise BPDError(ERROR_ARG, "Incorrect number of filter arguments")
+        query = self._metadata_query(dbcore.query.MatchQuery, kv)
+        rows = self._select(query, ["COUNT(*)", "TOTAL(length)"])
+        if rows is None:
+            items = self.lib.items(query)
+            songs, playtime = len(items), sum(item.length for item in items)
+        else:
+            ((songs, playtime),) = rows
         yield "songs: " + str(songs)
         yield "playtime: " + str(int(playtime))
 
@@ -1610,16 +1845,39 @@ class BPDPlugin(BeetsPlugin):
                 "control_port": 6601,
                 "password": "",
                 "volume": VOLUME_MAX,
+                "tree_cache": "bpd_tree.pickle",
             }
         )
         self.config["password"].redact = True
+        self.server = None
+
+        self.register_listener("database_change", self.database_change)
+        self.register_listener("item_moved", self.item_changed)
+        self.register_listener("item_removed", self.item_changed)
+
+    def database_change(self, lib, model):
+        if self.server is None:
+            return
+        if isinstance(model, Album):
+            self.server.items_changed(item.id for item in model.items())
+        elif isinstance(model, Item):
+            self.server.items_changed([model.id])
+
+    def item_changed(self, item, **kwargs):
+        if self.server is not None:
+            self.server.items_changed([item.id])
 
     def start_bpd(self, lib, host, port, password, volume, ctrl_port):
         """Starts a BPD server."""
+        tree_cache = self.config["tree_cache"].get(
+            confuse.Optional(confuse.Filename(in_app_dir=True))
+        )
         try:
-            server = Server(lib, host, port, password, ctrl_port, self._log)
-            server.cmd_setvol(None, volume)
-            server.run()
+            self.server = Server(
+                lib, host, port, password, ctrl_port, self._log, tree_cache
+            )
+            self.server.cmd_setvol(None, volume)
+            self.server.run()
         except NoGstreamerError:
             self._log.error("Gstreamer Python bindings not found.")
             self._log.error(
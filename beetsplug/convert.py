@@ -26,7 +26,7 @@ import mediafile
 from confuse import ConfigTypeError, Optional
 
 from beets import art, config, plugins, ui, util
-from beets.library import Item, parse_query_string
+from beets.library import Item, compile_path_formats, parse_query_string
 from beets.plugins import BeetsPlugin
 from beets.util import par_map
 from beets.util.artresizer import ArtResizer
@@ -712,7 +712,9 @@ class ConvertPlugin(BeetsPlugin):
 
         threads = opts.threads or self.config["threads"].get(int)
 
-        path_formats = ui.get_path_formats(self.config["paths"] or None)
+        path_formats = compile_path_formats(
+            ui.get_path_formats(self.config["paths"] or None)
+        )
 
         fmt = opts.format or self.config["format"].as_str().lower()
 
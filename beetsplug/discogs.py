@@ -65,6 +65,8 @@ class ReleaseFormat(TypedDict):
 
 
 class DiscogsPlugin(BeetsPlugin):
+    cacheable_candidates = True
+
     def __init__(self):
         super(DiscogsPlugin, self).__init__()
         self.config.add({
@@ -162,6 +164,9 @@ class DiscogsPlugin(BeetsPlugin):
             data_source="Discogs", info=track_info, config=self.config
         )
 
+    def track_source_weight(self):
+        return 'Discogs', self.config['source_weight'].as_number()
+
     def candidates(self, items, artist, album, va_likely, extra_tags=None):
         """Returns a list of AlbumInfo objects for discogs search results
         matching an album and artist (if not various).
@@ -528,24 +528,30 @@ class LastGenrePlugin(plugins.BeetsPlugin):
                         album,
                         src,
                     )
+                    # If we're using track-level sources, also look up each
+                    # track on the album. Do this before opening the write
+                    # batch so the database isn't locked during the lookups.
+                    items = []
                     if "track" in self.sources:
-                        album.store(inherit=False)
-                    else:
-                        album.store()
-
-                    for item in album.items():
-                        # If we're using track-level sources, also look up each
-                        # track on the album.
-                        if "track" in self.sources:
+                        items = list(album.items())
+                        for item in items:
                             item.genre, src = self._get_genre(item)
-                            item.store()
                             self._log.info(
                                 'genre for track "{0.title}" ({1}): {0.genre}',
                                 item,
                                 src,
                             )
 
-                        if write:
+                    with lib.write_batch():
+                        if "track" in self.sources:
+                            album.store(inherit=False)
+                            for item in items:
+                                item.store()
+                        else:
+                            album.store()
+
+                    if write:
+                        for item in items or album.items():
                             item.try_write()
             else:
                 # Just query singletons, i.e. items that are not part of
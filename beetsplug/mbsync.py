@@ -87,7 +87,7 @@ class MBSyncPlugin(BeetsPlugin):
                 continue
 
             # Apply.
-            with lib.transaction():
+            with lib.write_batch():
                 autotag.apply_item_metadata(item, track_info)
                 apply_item_changes(lib, item, move, pretend, write)
 
@@ -144,7 +144,7 @@ class MBSyncPlugin(BeetsPlugin):
 
             # Apply.
             self._log.debug("applying changes to {}", album)
-            with lib.transaction():
+            with lib.write_batch():
                 autotag.apply_metadata(album_info, mapping)
                 changed = False
                 # Find any changed item to apply changes to album.
@@ -17,6 +17,7 @@
 import base64
 import json
 import os
+from itertools import islice
 
 import flask
 from flask import g, jsonify
@@ -30,63 +31,199 @@ from beets.plugins import BeetsPlugin
 # Utilities.
 
 
-def _rep(obj, expand=False):
-    """Get a flat -- i.e., JSON-ish -- representation of a beets Item or
-    Album object. For Albums, `expand` dictates whether tracks are
-    included.
+# The model classes of the resources.
+MODELS = {"items": beets.library.Item, "albums": beets.library.Album}
+
+# The SQL expression of the approximate size of an item's file.
+SIZE_SQL = "CAST(length * bitrate / 8 AS INTEGER)"
+
+
+def library_etag(lib):
+    """Get an entity tag for the state of the library, made of its
+    revision, which changes with the writes of this process, and of the
+    modification times of its database files, which change with the
+    writes of other processes.
+    """
+    parts = [str(lib.revision)]
+    for suffix in (b"", b"-wal"):
+        try:
+            mtime = os.stat(util.syspath(os.fsencode(lib.path) + suffix))
+        except OSError:
+            parts.append("0")
+        else:
+            parts.append(str(mtime.st_mtime_ns))
+    parts.append(str(int(bool(app.config.get("INCLUDE_PATHS", False)))))
+    return "-".join(parts)
+
+
+def conditional(view):
+    """Mark a view whose GET responses only depend on the library, so
+    that clients can revalidate them with ``If-None-Match``.
     """
-    out = dict(obj)
+    view.conditional = True
+    return view
 
-    if isinstance(obj, beets.library.Item):
+
+def _fix_values(model_cls, out):
+    """Make the values of the representation of an object JSON-friendly:
+    the path fields are displayed or dropped and bytes are encoded.
+    """
+    path_key = "path" if model_cls is beets.library.Item else "artpath"
+    if path_key in out:
         if app.config.get("INCLUDE_PATHS", False):
-            out["path"] = util.displayable_path(out["path"])
+            out[path_key] = util.displayable_path(out[path_key])
         else:
-            del out["path"]
+            del out[path_key]
 
+    if model_cls is beets.library.Item:
         # Filter all bytes attributes and convert them to strings.
         for key, value in out.items():
             if isinstance(out[key], bytes):
                 out[key] = base64.b64encode(value).decode("ascii")
+    return out
 
-        # Get the size (in bytes) of the backing file. This is useful
-        # for the Tomahawk resolver API.
-        try:
-            out["size"] = os.path.getsize(util.syspath(obj.path))
-        except OSError:
-            out["size"] = 0
+
+def _rep(obj, expand=False, fields=None):
+    """Get a flat -- i.e., JSON-ish -- representation of a beets Item or
+    Album object. For Albums, `expand` dictates whether tracks are
+    included. If `fields` is given, only these fields are included.
+    """
+    if fields is None:
+        out = dict(obj)
+    else:
+        out = {key: obj[key] for key in fields if key in obj}
+
+    if isinstance(obj, beets.library.Item):
+        _fix_values(beets.library.Item, out)
+
+        # The approximate size (in bytes) of the backing file, computed
+        # like in the database rather than by checking the file. This is
+        # useful for the Tomahawk resolver API.
+        if fields is None or "size" in fields:
+            out["size"] = int(obj.length * obj.bitrate / 8)
 
         return out
 
     elif isinstance(obj, beets.library.Album):
-        if app.config.get("INCLUDE_PATHS", False):
-            out["artpath"] = util.displayable_path(out["artpath"])
-        else:
-            del out["artpath"]
+        _fix_values(beets.library.Album, out)
         if expand:
             out["items"] = [_rep(item) for item in obj.items()]
         return out
 
 
-def json_generator(items, root, expand=False):
+def json_generator(items, root, expand=False, fields=None, limit=None):
     """Generator that dumps list of beets Items or Albums as JSON
 
     :param root:  root key for JSON
-    :param items: list of :class:`Item` or :class:`Album` to dump
+    :param items: list of :class:`Item` or :class:`Album` to dump, or of
+                  their representations
     :param expand: If true every :class:`Album` contains its items in the json
                    representation
+    :param fields: If given, the fields to include in the representations
+    :param limit: If given, the number of objects to dump. If there are more,
+                  the ID of the last one is dumped as ``next``.
     :returns:     generator that yields strings
     """
     yield '{"%s":[' % root
-    first = True
-    for item in items:
-        if first:
-            first = False
-        else:
+    last_id = None
+    for count, item in enumerate(items):
+        if count == limit:
+            yield '],"next":%d}' % last_id
+            return
+        if count:
             yield ","
-        yield json.dumps(_rep(item, expand=expand))
+        if not isinstance(item, dict):
+            item = _rep(item, expand=expand, fields=fields)
+        last_id = item["id"]
+        yield json.dumps(item)
     yield "]}"
 
 
+def json_response(name, query_func, queries, root):
+    """Respond with the JSON representations of the objects matching
+    `queries`, a list of query strings, as returned by `query_func`.
+
+    The ``after`` and ``limit`` arguments of the request select a page of
+    the objects by ID, ignoring the sorts in `queries`, and the ``fields``
+    argument the fields to include, which SQLite reads directly when they
+    are all fixed fields.
+    """
+    model_cls = MODELS[name]
+    args = flask.request.args
+    after = args.get("after", type=int)
+    limit = args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return flask.abort(400)
+    fields = args.get("fields")
+    expand = is_expand()
+
+    queries = list(queries)
+    if after is not None or limit is not None:
+        # Pages are sorted by ID, rather than as requested, so that the
+        # next one starts after the last ID of the previous one.
+        queries = [q for q in queries if not _is_sort(q)]
+        queries.append("id+")
+    if after is not None:
+        queries.append(f"id:{after + 1}..")
+    if fields is not None:
+        fields = ["id"] + [f for f in fields.split(",") if f and f != "id"]
+    fetch_limit = limit + 1 if limit is not None else None
+
+    objs = None
+    if fields and not expand:
+        objs = _select(model_cls, queries, fields, fetch_limit)
+    if objs is None:
+        objs = query_func(queries)
+        if fetch_limit is not None:
+            objs = islice(objs, fetch_limit)
+
+    return app.response_class(
+        json_generator(objs, root, expand, fields, limit),
+        mimetype="application/json",
+    )
+
+
+def _is_sort(part):
+    """Whether a query string part is a sort, like ``artist+``."""
+    return part.endswith(("+", "-")) and ":" not in part and len(part) > 1
+
+
+def _select(model_cls, queries, fields, limit):
+    """Get the representations of the objects matching `queries` with
+    only `fields` from the database, or None if they are not all fixed
+    fields or the query cannot be evaluated by SQLite.
+    """
+    columns = []
+    for key in fields:
+        if key == "size" and model_cls is beets.library.Item:
+            columns.append(f"COALESCE({SIZE_SQL}, 0) AS size")
+        elif key in model_cls._fields:
+            columns.append(key)
+        else:
+            return None
+
+    if model_cls is beets.library.Item:
+        sort = g.lib.get_default_item_sort()
+    else:
+        sort = g.lib.get_default_album_sort()
+    rows = g.lib.select(model_cls, queries, columns, sort, limit)
+    if rows is None:
+        return None
+
+    return [
+        _fix_values(
+            model_cls,
+            {
+                key: row[key]
+                if key == "size"
+                else model_cls._type(key).from_sql(row[key])
+                for key in fields
+            },
+        )
+        for row in rows
+    ]
+
+
 def is_expand():
     """Returns whether the current request is for an expanded response."""
 
@@ -155,7 +292,7 @@ def resource(name, patchable=False):
 
         responder.__name__ = f"get_{name}"
 
-        return responder
+        return conditional(responder)
 
     return make_responder
 
@@ -165,8 +302,10 @@ def resource_query(name, patchable=False):
 
     def make_responder(query_func):
         def responder(queries):
-            entities = query_func(queries)
+            if get_method() == "GET":
+                return json_response(name, query_func, queries, "results")
 
+            entities = query_func(queries)
             if get_method() == "DELETE":
                 if app.config.get("READONLY", True):
                     return flask.abort(405)
@@ -189,20 +328,12 @@ def resource_query(name, patchable=False):
                     mimetype="application/json",
                 )
 
-            elif get_method() == "GET":
-                return app.response_class(
-                    json_generator(
-                        entities, root="results", expand=is_expand()
-                    ),
-                    mimetype="application/json",
-                )
-
             else:
                 return flask.abort(405)
 
         responder.__name__ = f"query_{name}"
 
-        return responder
+        return conditional(responder)
 
     return make_responder
 
@@ -214,13 +345,10 @@ def resource_list(name):
 
     def make_responder(list_all):
         def responder():
-            return app.response_class(
-                json_generator(list_all(), root=name, expand=is_expand()),
-                mimetype="application/json",
-            )
+            return json_response(name, list_all, [], name)
 
         responder.__name__ = f"all_{name}"
-        return responder
+        return conditional(responder)
 
     return make_responder
 
@@ -286,6 +414,23 @@ app.url_map.converters["everything"] = EverythingConverter
 def before_request():
     g.lib = app.config["lib"]
 
+    view = app.view_functions.get(flask.request.endpoint)
+    if flask.request.method in ("GET", "HEAD") and getattr(
+        view, "conditional", False
+    ):
+        g.etag = library_etag(g.lib)
+        if flask.request.if_none_match.contains(g.etag):
+            response = app.response_class(status=304)
+            response.set_etag(g.etag)
+            return response
+
+
+@app.after_request
+def after_request(response):
+    if "etag" in g and response.status_code == 200:
+        response.set_etag(g.etag)
+    return response
+
 
 # Items.
 
@@ -299,8 +444,8 @@ def get_item(id):
 @app.route("/item/")
 @app.route("/item/query/")
 @resource_list("items")
-def all_items():
-    return g.lib.items()
+def all_items(queries):
+    return g.lib.items(queries)
 
 
 @app.route("/item/<int:item_id>/file")
@@ -341,6 +486,7 @@ def item_query(queries):
 
 
 @app.route("/item/path/<everything:path>")
+@conditional
 def item_at_path(path):
     query = beets.library.PathQuery("path", path.encode("utf-8"))
     item = g.lib.items(query).get()
@@ -351,6 +497,7 @@ def item_at_path(path):
 
 
 @app.route("/item/values/<string:key>")
+@conditional
 def item_unique_field_values(key):
     sort_key = flask.request.args.get("sort_key", key)
     try:
@@ -374,8 +521,8 @@ def get_album(id):
 @app.route("/album/")
 @app.route("/album/query/")
 @resource_list("albums")
-def all_albums():
-    return g.lib.albums()
+def all_albums(queries):
+    return g.lib.albums(queries)
 
 
 @app.route("/album/query/<query:queries>", methods=["GET", "DELETE"])
@@ -394,6 +541,7 @@ def album_art(album_id):
 
 
 @app.route("/album/values/<string:key>")
+@conditional
 def album_unique_field_values(key):
     sort_key = flask.request.args.get("sort_key", key)
     try:
@@ -409,6 +557,7 @@ def album_unique_field_values(key):
 
 
 @app.route("/artist/")
+@conditional
 def all_artists():
     with g.lib.transaction() as tx:
         rows = tx.query("SELECT DISTINCT albumartist FROM albums")
@@ -420,6 +569,7 @@ def all_artists():
 
 
 @app.route("/stats")
+@conditional
 def stats():
     with g.lib.transaction() as tx:
         item_rows = tx.query("SELECT COUNT(*) FROM items")
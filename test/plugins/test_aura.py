@@ -7,6 +7,7 @@ import pytest
 from flask.testing import Client
 
 from beets.test.helper import TestHelper
+from beetsplug import aura
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -151,3 +152,57 @@ class TestAuraResponse:
         data = get_response_data("/aura/albums", {"filter[album]": album.album})
 
         assert data == {"data": [album_document], "included": [track_document]}
+
+
+class TestAuraPagination:
+    def get(self, client: Client, endpoint: str, **params):
+        response = client.get(endpoint, query_string=params)
+        assert response.status_code == HTTPStatus.OK
+        return response.json
+
+    def test_tracks_pages(self, client, item):
+        first = self.get(client, "/aura/tracks", limit=1)
+        second = self.get(client, "/aura/tracks", limit=1, page=1)
+
+        assert [t["attributes"]["title"] for t in first["data"]] == ["Title"]
+        assert first["links"]["next"].endswith("limit=1&page=1")
+        assert [t["attributes"]["title"] for t in second["data"]] == [
+            "Other Title"
+        ]
+        assert "links" not in second
+
+    def test_tracks_sorted_descending(self, client, item):
+        data = self.get(client, "/aura/tracks", sort="-title")
+
+        assert [t["attributes"]["title"] for t in data["data"]] == [
+            "Title",
+            "Other Title",
+        ]
+
+    def test_artists_pages(self, client, item):
+        first = self.get(client, "/aura/artists", limit=1)
+        second = self.get(client, "/aura/artists", limit=1, page=1)
+
+        assert [a["id"] for a in first["data"]] == ["Artist"]
+        assert [a["id"] for a in second["data"]] == ["Other Artist"]
+        assert "links" not in second
+
+    def test_artists_sorted_descending(self, client, item):
+        data = self.get(client, "/aura/artists", sort="-artist")
+
+        assert [a["id"] for a in data["data"]] == ["Other Artist", "Artist"]
+
+    def test_ids_are_looked_up_in_chunks(self, client, album, monkeypatch):
+        monkeypatch.setattr(aura, "ID_CHUNK_SIZE", 1)
+
+        tracks = self.get(client, "/aura/tracks", include="albums,artists")
+        artists = self.get(client, "/aura/artists", include="tracks")
+        albums = self.get(client, "/aura/albums", include="tracks")
+
+        assert len(tracks["data"]) == 2
+        assert {r["type"] for r in tracks["included"]} == {"album", "artist"}
+        assert len(tracks["included"]) == 4
+        assert [a["id"] for a in artists["data"]] == ["Artist", "Other Artist"]
+        assert len(artists["included"]) == 2
+        assert len(albums["data"]) == 2
+        assert len(albums["included"]) == 2
@@ -86,9 +86,10 @@ class LimitPluginTest(PluginTestCase):
         result = self.lib.items(correct_order)
         assert len(result) == self.num_limit
 
-    def test_prefix_when_incorrectly_ordred(self):
-        """Returns no results with the query prefix and filter when the prefix
-        portion (incorrectly) appears first."""
-        incorrect_order = self.num_limit_prefix + " " + self.track_tail_range
-        result = self.lib.items(incorrect_order)
-        assert len(result) == 0
+    def test_prefix_when_ordered_before_fast_filter(self):
+        """Returns the expected number with the query prefix and filter when
+        the prefix portion appears first but the filter is evaluated by the
+        database."""
+        order = self.num_limit_prefix + " " + self.track_tail_range
+        result = self.lib.items(order)
+        assert len(result) == self.num_limit
@@ -895,6 +895,15 @@ class BPDQueueTest(BPDTestHelper):
         assert "1" == responses[1].data["Id"]
         assert ["1", "2"] == responses[2].data["Id"]
 
+    def test_cmd_add_directory(self):
+        with self.run_bpd() as client:
+            responses = client.send_commands(
+                ("add", "Artist Name"), ("playlistinfo",)
+            )
+        self._assert_ok(*responses)
+        assert ["1", "2"] == responses[1].data["Id"]
+        assert ["0", "1"] == responses[1].data["Pos"]
+
     def test_cmd_playlistinfo_tagtypes(self):
         with self.run_bpd() as client:
             self._bpd_add(client, self.item1)
@@ -999,6 +1008,16 @@ class BPDDatabaseTest(BPDTestHelper):
         self._assert_ok(response)
         assert self.item1.title == response.data["Title"]
 
+    def test_cmd_find(self):
+        with self.run_bpd() as client:
+            response = client.send_command(
+                "find", "album", "Album Title", "track", "2"
+            )
+        self._assert_ok(response)
+        assert self.item2.title == response.data["Title"]
+        assert str(self.item2.id) == response.data["Id"]
+        assert "Artist Name/Album Title/" in response.data["file"]
+
     def test_cmd_list(self):
         with self.run_bpd() as client:
             responses = client.send_commands(
@@ -1034,6 +1053,23 @@ class BPDDatabaseTest(BPDTestHelper):
             self._assert_ok(response3)
         assert self.item1.title in response3.data["Title"]
 
+    def test_cmd_update(self):
+        with self.run_bpd() as client:
+            response = client.send_command("update")
+            self._assert_ok(response)
+            assert "1" == response.data["updating_db"]
+            response = client.send_command("lsinfo")
+        self._assert_ok(response)
+        assert "Artist Name" == response.data["directory"]
+        assert os.path.exists(os.path.join(self.temp_dir, b"bpd_tree.pickle"))
+
+    def test_cmd_listallinfo(self):
+        with self.run_bpd() as client:
+            response = client.send_command("listallinfo")
+        self._assert_ok(response)
+        assert ["1", "2"] == response.data["Id"]
+        assert [self.item1.title, self.item2.title] == response.data["Title"]
+
     def test_cmd_count(self):
         with self.run_bpd() as client:
             response = client.send_command("count", "track", "1")
@@ -1041,6 +1077,15 @@ class BPDDatabaseTest(BPDTestHelper):
         assert "1" == response.data["songs"]
         assert "0" == response.data["playtime"]
 
+    def test_cmd_count_filters(self):
+        with self.run_bpd() as client:
+            responses = client.send_commands(
+                ("count", "album", "Album Title", "artist", "Artist Name"),
+                ("count", "album", "Album Title", "artist"),
+            )
+        self._assert_failed(responses, bpd.ERROR_ARG, pos=1)
+        assert "2" == responses[0].data["songs"]
+
 
 class BPDMountsTest(BPDTestHelper):
     test_implements_mounts = implements(
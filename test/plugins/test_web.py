@@ -301,6 +301,94 @@ class WebPluginTest(ItemInDBTestCase):
         assert res_json["items"] == 3
         assert res_json["albums"] == 2
 
+    def test_get_all_items_paginated(self):
+        response = self.client.get("/item/?limit=2")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert [item["id"] for item in res_json["items"]] == [1, 2]
+        assert res_json["next"] == 2
+
+        response = self.client.get("/item/?limit=2&after=2")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert [item["id"] for item in res_json["items"]] == [3]
+        assert "next" not in res_json
+
+    def test_query_items_paginated(self):
+        response = self.client.get("/item/query/title::t?after=1")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert [item["id"] for item in res_json["results"]] == [2, 3]
+
+    def test_sorted_query_pages_are_sorted_by_id(self):
+        for fields in ("", "&fields=artist"):
+            ids = []
+            url = f"/item/query/artist+?limit=1{fields}"
+            while url:
+                response = self.client.get(url)
+                res_json = json.loads(response.data.decode("utf-8"))
+                ids.extend(item["id"] for item in res_json["results"])
+                url = None
+                if "next" in res_json:
+                    url = (
+                        f"/item/query/artist+?limit=1{fields}"
+                        f"&after={res_json['next']}"
+                    )
+
+            assert ids == [1, 2, 3]
+
+    def test_invalid_limit(self):
+        response = self.client.get("/item/?limit=0")
+        assert response.status_code == 400
+
+    def test_get_item_fields(self):
+        response = self.client.get("/item/query/another?fields=title,size")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert res_json["results"] == [
+            {"id": 2, "title": "another title", "size": 0}
+        ]
+
+    def test_get_item_flexible_fields(self):
+        response = self.client.get("/item/?fields=testattr,title&limit=3")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert response.status_code == 200
+        assert res_json["items"][2] == {
+            "id": 3,
+            "testattr": "ABC",
+            "title": "and a third",
+        }
+        assert res_json["items"][0] == {"id": 1, "title": "title"}
+
+    def test_item_size_from_database(self):
+        item = self.lib.get_item(1)
+        item.length = 10.0
+        item.bitrate = 128000
+        item.store()
+        response = self.client.get("/item/1")
+        res_json = json.loads(response.data.decode("utf-8"))
+
+        assert res_json["size"] == 160000
+
+    def test_get_items_not_modified(self):
+        response = self.client.get("/item/")
+        etag = response.headers["ETag"]
+
+        response = self.client.get("/item/", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert not response.data
+
+        item = self.lib.get_item(1)
+        item.title = "new title"
+        item.store()
+        response = self.client.get("/item/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
     def test_delete_item_id(self):
         web.app.config["READONLY"] = False
 
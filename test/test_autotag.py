@@ -14,13 +14,25 @@
 
 """Tests for autotagging functionality."""
 
+import os
 import re
+import threading
+import time
 import unittest
+from functools import partial
+from unittest.mock import patch
 
 import pytest
 
-from beets import autotag, config
-from beets.autotag import AlbumInfo, TrackInfo, correct_list_fields, match
+from beets import autotag, config, plugins
+from beets.autotag import (
+    AlbumInfo,
+    TrackInfo,
+    correct_list_fields,
+    hooks,
+    match,
+)
+from beets.autotag.cache import MetadataCache
 from beets.autotag.hooks import Distance, string_dist
 from beets.library import Item
 from beets.test.helper import BeetsTestCase, ConfigMixin
@@ -355,6 +367,70 @@ class TrackDistanceTest(BeetsTestCase):
         assert dist == 0.0
 
 
+class TrackDistanceMatrixTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.items = [
+            _make_item("one", 1),
+            _make_item("The Two (Remix)", 2, artist="other artist"),
+            _make_item("three", 5, artist="Various Artists"),
+            _make_item("one", 0),
+        ]
+        self.items[0].mb_trackid = "a"
+        self.items[1].length = 200
+        self.items[2].disc = 2
+        self.tracks = _make_trackinfo() + [
+            TrackInfo(title="two, the", artist="", track_id="a", medium=2),
+        ]
+        self.tracks[1].length = None
+        self.tracks[2].medium_index = 5
+
+    def assert_matches_track_distance(self, incl_artist):
+        costs = match.track_distance_matrix(
+            self.items, self.tracks, incl_artist
+        )
+        assert costs.shape == (len(self.items), len(self.tracks))
+        for i, item in enumerate(self.items):
+            for j, track in enumerate(self.tracks):
+                dist = match.track_distance(item, track, incl_artist)
+                assert costs[i, j] == dist.distance
+
+    def test_matches_track_distance(self):
+        self.assert_matches_track_distance(incl_artist=False)
+
+    def test_matches_track_distance_with_artist(self):
+        self.assert_matches_track_distance(incl_artist=True)
+
+    def test_includes_plugin_distance(self):
+        class SourcePlugin(plugins.BeetsPlugin):
+            def track_distance(self, item, info):
+                dist = Distance()
+                if info.track_id == "a":
+                    dist.add("source", 1.0)
+                return dist
+
+        with patch("beets.plugins.find_plugins") as find_plugins:
+            find_plugins.return_value = [SourcePlugin()]
+            self.assert_matches_track_distance(incl_artist=False)
+
+    def test_source_weight_is_added_per_track(self):
+        class SourcePlugin(plugins.MetadataSourcePlugin):
+            data_source = "Source"
+            id_regex = search_url = album_url = track_url = None
+            _search_api = album_for_id = track_for_id = None
+
+        self.tracks[0].data_source = "Source"
+        self.tracks[2].data_source = "Source"
+        with patch("beets.plugins.find_plugins") as find_plugins:
+            find_plugins.return_value = [SourcePlugin()]
+            with patch(
+                "beets.plugins.get_distance", wraps=plugins.get_distance
+            ) as get_distance:
+                match.track_distance_matrix(self.items, self.tracks)
+            assert not get_distance.called
+            self.assert_matches_track_distance(incl_artist=False)
+
+
 class AlbumDistanceTest(BeetsTestCase):
     def _mapping(self, items, info):
         out = {}
@@ -920,6 +996,148 @@ class ApplyCompilationTest(BeetsTestCase, ApplyTestUtil):
         assert self.items[1].comp
 
 
+class ConcurrentLookupTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        config["match"]["lookup_workers"] = 4
+        self.release = threading.Event()
+
+    def slow_source(self):
+        # Only done once the faster source has been looked up.
+        assert self.release.wait(5)
+        return ["slow 1", "slow 2"]
+
+    def fast_source(self):
+        self.release.set()
+        return ["fast"]
+
+    def test_candidates_keep_source_order(self):
+        candidates = hooks._gather_candidates(
+            [("slow", self.slow_source), ("fast", self.fast_source)]
+        )
+        assert list(candidates) == ["slow 1", "slow 2", "fast"]
+
+    def test_slow_source_times_out(self):
+        config["match"]["lookup_timeout"] = 0.1
+        candidates = hooks._gather_candidates(
+            [("slow", self.slow_source), ("other", lambda: ["other"])]
+        )
+        assert list(candidates) == ["other"]
+        self.release.set()
+
+    def test_timeout_starts_with_each_source(self):
+        config["match"]["lookup_workers"] = 2
+        config["match"]["lookup_timeout"] = 0.3
+
+        def source(name):
+            time.sleep(0.2)
+            return [name]
+
+        candidates = hooks._gather_candidates(
+            [(name, partial(source, name)) for name in "abcd"]
+        )
+        assert list(candidates) == ["a", "b", "c", "d"]
+
+    def test_serial_lookup(self):
+        config["match"]["lookup_workers"] = 1
+        candidates = hooks._gather_candidates(
+            [("fast", self.fast_source), ("slow", self.slow_source)]
+        )
+        assert list(candidates) == ["fast", "slow 1", "slow 2"]
+
+    def test_musicbrainz_error_keeps_earlier_candidates(self):
+        def failing_source():
+            yield "first"
+            raise autotag.mb.MusicBrainzAPIError(
+                Exception(), "release search", {}
+            )
+
+        candidates = hooks._gather_candidates(
+            [("failing", failing_source), ("fast", self.fast_source)]
+        )
+        assert list(candidates) == ["first", "fast"]
+
+    def test_lookup_map_keeps_order(self):
+        def lookup(n):
+            if n == 0:
+                assert self.release.wait(5)
+            else:
+                self.release.set()
+            return n * 2
+
+        assert list(hooks.lookup_map(lookup, range(3))) == [0, 2, 4]
+
+
+class MetadataCacheTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.temp_dir, b"cache.db")
+        self.fetched = []
+
+    def cache(self, **kwargs):
+        cache = MetadataCache(self.path, **{"ttl": 60, **kwargs})
+        self.addCleanup(cache.close)
+        return cache
+
+    def fetch(self, value):
+        def fetch():
+            self.fetched.append(value)
+            return value
+
+        return fetch
+
+    def test_value_is_fetched_once(self):
+        cache = self.cache()
+        assert cache.lookup("src", "album", "1", self.fetch("a")) == "a"
+        assert cache.lookup("src", "album", "1", self.fetch("b")) == "a"
+        assert self.fetched == ["a"]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_cache_persists(self):
+        self.cache().lookup("src", "album", {"x": 1}, self.fetch("a"))
+        cache = self.cache()
+        assert cache.lookup("src", "album", {"x": 1}, self.fetch("b")) == "a"
+
+    def test_none_is_not_cached(self):
+        cache = self.cache()
+        cache.lookup("src", "album", "1", self.fetch(None))
+        assert cache.lookup("src", "album", "1", self.fetch("a")) == "a"
+
+    def test_expired_value_is_fetched_again(self):
+        cache = self.cache(ttl=0)
+        cache.lookup("src", "album", "1", self.fetch("a"))
+        assert cache.lookup("src", "album", "1", self.fetch("b")) == "b"
+
+    def test_stale_value_is_revalidated(self):
+        cache = self.cache(ttl=0, max_stale=60)
+        cache.lookup("src", "album", "1", self.fetch("a"))
+        assert cache.lookup("src", "album", "1", self.fetch("b")) == "a"
+        for thread in threading.enumerate():
+            if thread.name == "revalidate":
+                thread.join()
+        assert cache.stale_hits == 1
+
+        cache.ttl = 60
+        assert cache.lookup("src", "album", "1", self.fetch("c")) == "b"
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self.cache(max_entries=2)
+        cache.lookup("src", "album", "1", self.fetch("a"))
+        cache.lookup("src", "album", "2", self.fetch("b"))
+        cache.lookup("src", "album", "1", self.fetch("a"))
+        cache.lookup("src", "album", "3", self.fetch("c"))
+
+        assert cache.lookup("src", "album", "1", self.fetch("x")) == "a"
+        assert cache.lookup("src", "album", "2", self.fetch("y")) == "y"
+
+    def test_offline(self):
+        self.cache(ttl=0).lookup("src", "album", "1", self.fetch("a"))
+        cache = self.cache(ttl=0, offline=True)
+        assert cache.lookup("src", "album", "1", self.fetch("b")) == "a"
+        assert cache.lookup("src", "album", "2", self.fetch("c"), []) == []
+        assert self.fetched == ["a"]
+
+
 class StringDistanceTest(unittest.TestCase):
     def test_equal_strings(self):
         dist = string_dist("Some String", "Some String")
@@ -995,6 +1213,27 @@ class StringDistanceTest(unittest.TestCase):
         dist = string_dist("\xe9\xe1\xf1", "ean")
         assert dist == 0.0
 
+    def test_repeated_comparison_is_cached(self):
+        dist = string_dist("Cached Song (Live)", "cached song")
+        hits = hooks.string_dist_cache_info()["distances"].hits
+
+        assert string_dist("Cached Song (Live)", "cached song") == dist
+        assert hooks.string_dist_cache_info()["distances"].hits == hits + 1
+
+    def test_equivalent_strings_share_cached_distance(self):
+        dist = string_dist("Song Title, The", "The Song Title & More")
+        hits = hooks.string_dist_cache_info()["distances"].hits
+
+        assert string_dist("the song title", "the song title and more") == dist
+        assert hooks.string_dist_cache_info()["distances"].hits == hits + 1
+
+    def test_changed_patterns_are_used(self):
+        assert string_dist("Song +", "Song plus") != 0.0
+        with patch.object(hooks, "SD_REPLACE", [*hooks.SD_REPLACE]):
+            hooks.SD_REPLACE.append((r"\+", "plus"))
+            assert string_dist("Song +", "Song plus") == 0.0
+        assert string_dist("Song +", "Song plus") != 0.0
+
 
 @pytest.mark.parametrize(
     "single_field,list_field",
@@ -15,10 +15,13 @@
 """Tests for the DBCore database abstraction."""
 
 import os
+import pickle
 import shutil
 import sqlite3
+import threading
 import unittest
 from tempfile import mkstemp
+from unittest.mock import patch
 
 import pytest
 
@@ -140,6 +143,15 @@ class DatabaseFixture5(dbcore.Database):
     pass
 
 
+class IndexedModelFixture(ModelFixture1):
+    _indexes = [("field_one",), ("field_one", "field_two")]
+
+
+class IndexedDatabaseFixture(dbcore.Database):
+    _models = (IndexedModelFixture,)
+    pass
+
+
 class DatabaseFixtureTwoModels(dbcore.Database):
     _models = (ModelFixture2, AnotherModelFixture)
     pass
@@ -252,6 +264,204 @@ class TransactionTest(unittest.TestCase):
         assert self.db.revision == old_rev
 
 
+class ConcurrentReadsTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.libfile = mkstemp("db")
+        os.close(handle)
+        self.db = DatabaseFixture1(self.libfile, concurrent_reads=True)
+        ModelFixture1(field_one=1).add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.libfile + suffix):
+                os.remove(self.libfile + suffix)
+
+    def _in_thread(self, func):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        return result[0]
+
+    def test_uses_write_ahead_log(self):
+        with self.db.transaction() as tx:
+            mode = tx.query("PRAGMA journal_mode")[0][0]
+        assert mode == "wal"
+
+    def test_read_does_not_take_lock(self):
+        with self.db.transaction() as tx:
+            tx.query("SELECT * FROM test")
+            assert not self.db._db_lock.locked()
+
+    def test_read_during_write_sees_committed_state(self):
+        with self.db.transaction() as tx:
+            tx.mutate("UPDATE test SET field_one = 2")
+            assert self.db._db_lock.locked()
+            values = self._in_thread(
+                lambda: [m.field_one for m in self.db._fetch(ModelFixture1)]
+            )
+        assert values == [1]
+        assert [m.field_one for m in self.db._fetch(ModelFixture1)] == [2]
+
+    def test_read_does_not_increase_revision(self):
+        old_rev = self.db.revision
+        with self.db.transaction() as tx:
+            tx.query("SELECT * FROM test")
+        assert self.db.revision == old_rev
+
+    def test_write_increases_revision_and_releases_lock(self):
+        old_rev = self.db.revision
+        with self.db.transaction():
+            with self.db.transaction() as nested:
+                nested.mutate("UPDATE test SET field_one = 3")
+        assert self.db.revision == old_rev + 1
+        assert not self.db._db_lock.locked()
+
+    def test_write_during_iteration(self):
+        ModelFixture1(field_one=2).add(self.db)
+        for model in self.db._fetch(ModelFixture1):
+            model.field_one += 10
+            model.store()
+        values = [m.field_one for m in self.db._fetch(ModelFixture1)]
+        assert values == [11, 12]
+
+
+class WriteBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        self.models = [ModelFixture1(field_one=i) for i in range(3)]
+        for model in self.models:
+            model.add(self.db)
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def _stored(self):
+        return [
+            (m.field_one, m.get("flex")) for m in self.db._fetch(ModelFixture1)
+        ]
+
+    def test_changes_stored_when_batch_ends(self):
+        with self.db.write_batch() as batch:
+            for model in self.models:
+                model.field_one += 10
+                model.flex = f"f{model.id}"
+                model.store()
+            assert len(batch) == 6
+        assert len(batch) == 0
+        assert self._stored() == [(10, "f1"), (11, "f2"), (12, "f3")]
+
+    def test_reads_see_queued_changes(self):
+        with self.db.write_batch():
+            self.models[0].field_one = 5
+            self.models[0].store()
+            assert self.db._get(ModelFixture1, self.models[0].id).field_one == 5
+
+    def test_later_changes_win(self):
+        model = self.models[0]
+        with self.db.write_batch():
+            model.flex = "a"
+            model.store()
+            del model.flex
+            model.store()
+            model.field_one = 7
+            model.field_two = "x"
+            model.store()
+            model.field_one = 8
+            model.store(fields=["field_one"])
+        stored = self.db._get(ModelFixture1, model.id)
+        assert (stored.field_one, stored.field_two) == (8, "x")
+        assert "flex" not in stored
+
+    def test_nested_batches_share_outer_batch(self):
+        with self.db.write_batch() as outer:
+            with self.db.write_batch() as inner:
+                assert inner is outer
+
+    def test_flushes_when_full(self):
+        with self.db.write_batch() as batch:
+            batch.flush_size = 2
+            for model in self.models:
+                model.field_one = 20
+                model.store()
+            assert len(batch) == 1
+
+    def test_added_models_inserted_together(self):
+        statements = []
+        self.db._connection().set_trace_callback(statements.append)
+        with self.db.write_batch():
+            added = [ModelFixture1(field_one=i, flex="f") for i in range(5)]
+            for model in added:
+                model.add(self.db)
+            assert not [s for s in statements if s.startswith("INSERT")]
+        assert [m.id for m in added] == [4, 5, 6, 7, 8]
+        assert self._stored()[3:] == [(i, "f") for i in range(5)]
+
+    def test_add_after_other_insert(self):
+        with self.db.write_batch():
+            first = ModelFixture1(field_one=1)
+            first.add(self.db)
+            with self.db.transaction() as tx:
+                tx.mutate("INSERT INTO test (field_one) VALUES (2)")
+            second = ModelFixture1(field_one=3)
+            second.add(self.db)
+        assert (first.id, second.id) == (4, 6)
+        assert [m.field_one for m in self.db._fetch(ModelFixture1)][3:] == [
+            1,
+            2,
+            3,
+        ]
+
+    def test_changes_written_in_one_transaction(self):
+        old_rev = self.db.revision
+        with self.db.write_batch():
+            for model in self.models:
+                model.field_one = 30
+                model.store()
+        assert self.db.revision == old_rev + 1
+
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.db = IndexedDatabaseFixture(":memory:")
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def test_declared_indexes_are_created(self):
+        indexes = self.db.indexes()
+        assert indexes["test_by_field_one"] == dbcore.Index(
+            "test", ("field_one",)
+        )
+        assert indexes["test_by_field_one_field_two"].columns == (
+            "field_one",
+            "field_two",
+        )
+
+    def test_flex_table_has_composite_index(self):
+        assert dbcore.Index("testflex", ("entity_id", "key")) in (
+            self.db.indexes().values()
+        )
+
+    def test_create_and_drop_index(self):
+        index = dbcore.Index("test", ("field_two",))
+        self.db.create_index(index)
+        assert index.name in self.db.indexes()
+
+        self.db.drop_index(index.name)
+        assert index.name not in self.db.indexes()
+
+    def test_query_uses_index(self):
+        with self.db.transaction() as tx:
+            plan = tx.query(
+                "EXPLAIN QUERY PLAN SELECT * FROM test WHERE field_one = ?",
+                (1,),
+            )
+        assert "test_by_field_one" in plan[0]["detail"]
+
+
 class ModelTest(unittest.TestCase):
     def setUp(self):
         self.db = DatabaseFixture1(":memory:")
@@ -776,3 +986,144 @@ class ResultsIteratorTest(unittest.TestCase):
             self.db._fetch(ModelFixture1, dbcore.query.FalseQuery()).get()
             is None
         )
+
+
+class ResultsStreamingTest(unittest.TestCase):
+    concurrent_reads = True
+
+    def setUp(self):
+        handle, self.libfile = mkstemp("db")
+        os.close(handle)
+        self.db = DatabaseFixture1(
+            self.libfile, concurrent_reads=self.concurrent_reads
+        )
+        for i in range(10):
+            ModelFixture1(field_one=i, flex=f"f{i}").add(self.db)
+
+    def tearDown(self):
+        self.db._close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.libfile + suffix):
+                os.remove(self.libfile + suffix)
+
+    def fetch(self, chunk_size=3, query=None):
+        objs = self.db._fetch(ModelFixture1, query)
+        objs.chunk_size = chunk_size
+        return objs
+
+    def commit_from_other_connection(self):
+        conn = sqlite3.connect(self.libfile, timeout=0.1)
+        try:
+            conn.execute("UPDATE test SET field_two = 'other'")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def test_other_connection_commits_during_iteration(self):
+        objs = self.fetch()
+        it = iter(objs)
+        next(it)
+        self.commit_from_other_connection()
+        assert len(list(it)) == 9
+
+    def test_iterate_in_chunks(self):
+        objs = self.fetch()
+        assert [o.field_one for o in objs] == list(range(10))
+        assert [o.field_one for o in objs] == list(range(10))
+
+    def test_first_object_leaves_cursor_open_with_write_ahead_log(self):
+        objs = self.fetch()
+        assert objs.get().field_one == 0
+        assert (objs._cursor is not None) == self.concurrent_reads
+
+    def test_length_after_partial_iteration(self):
+        objs = self.fetch()
+        it = iter(objs)
+        next(it)
+        next(it)
+        assert len(objs) == 10
+        assert len(list(it)) == 8
+
+    def test_store_during_iteration(self):
+        for obj in self.fetch():
+            obj.field_two = "x"
+            obj.store()
+        q = dbcore.query.MatchQuery("field_two", "x")
+        assert len(self.fetch(query=q)) == 10
+
+    def test_subscript_beyond_first_chunk(self):
+        objs = self.fetch()
+        assert objs[7].field_one == 7
+
+    def test_close_drains_cursor(self):
+        objs = self.fetch()
+        next(iter(objs))
+        self.db._close()
+        assert len(list(objs)) == 10
+
+    def trace_statements(self):
+        statements = []
+        self.db._connection().set_trace_callback(statements.append)
+        return statements
+
+    def test_flex_attrs_not_fetched_unless_accessed(self):
+        statements = self.trace_statements()
+        assert [o.field_one for o in self.fetch()] == list(range(10))
+        assert not [s for s in statements if "testflex" in s]
+
+    def test_flex_attrs_fetched_per_chunk(self):
+        statements = self.trace_statements()
+        assert [o.flex for o in self.fetch()] == [f"f{i}" for i in range(10)]
+        assert len([s for s in statements if "testflex" in s]) == 4
+
+    def test_pickle_unloaded_flex_attrs(self):
+        obj = pickle.loads(pickle.dumps(self.fetch().get()))
+        assert obj.flex == "f0"
+
+
+class ResultsRollbackJournalTest(ResultsStreamingTest):
+    """Without a write-ahead log, an open cursor would keep the other
+    connections from committing, so all rows are read at once.
+    """
+
+    concurrent_reads = False
+
+
+class SelectTest(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseFixture1(":memory:")
+        for i in range(5):
+            ModelFixture1(field_one=i, flex=f"f{i}").add(self.db)
+
+    def tearDown(self):
+        self.db._connection().close()
+
+    def test_aggregate_columns(self):
+        rows = self.db._select(
+            ModelFixture1, None, ["COUNT(*)", "SUM(field_one)"]
+        )
+        assert [tuple(r) for r in rows] == [(5, 10)]
+
+    def test_row_per_matching_object(self):
+        q = dbcore.query.NumericQuery("field_one", "3..")
+        rows = self.db._select(ModelFixture1, q, ["field_one"])
+        assert sorted(r[0] for r in rows) == [3, 4]
+
+    def test_slow_query_not_evaluated(self):
+        q = dbcore.query.MatchQuery("field_one", 1, fast=False)
+        assert self.db._select(ModelFixture1, q, ["COUNT(*)"]) is None
+
+    def test_selects_from_table_without_join(self):
+        sort = dbcore.query.FixedFieldSort("field_one", ascending=False)
+        with patch.object(
+            dbcore.db.Transaction,
+            "query",
+            autospec=True,
+            side_effect=dbcore.db.Transaction.query,
+        ) as query:
+            rows = self.db._select(
+                ModelFixture1, None, ["field_one"], sort, limit=2, offset=1
+            )
+        assert [r[0] for r in rows] == [3, 2]
+        sql = query.call_args[0][1]
+        assert sql.startswith("SELECT field_one FROM test WHERE")
@@ -16,10 +16,13 @@
 """Tests for the general importer functionality."""
 
 import os
+import pickle
 import re
 import shutil
+import sqlite3
 import stat
 import sys
+import time
 import unicodedata
 import unittest
 from io import StringIO
@@ -32,7 +35,7 @@ from zipfile import ZipFile
 import pytest
 from mediafile import MediaFile
 
-from beets import config, importer, logging, util
+from beets import config, importer, logging, plugins, util
 from beets.autotag import AlbumInfo, AlbumMatch, TrackInfo
 from beets.importer import albums_in_dir
 from beets.test import _common
@@ -1303,6 +1306,88 @@ class ImportDuplicateSingletonTest(ImportTestCase):
         return item
 
 
+class ImportStateTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.state = importer.ImportState()
+
+    def tearDown(self):
+        self.state.close()
+        super().tearDown()
+
+    def test_progress(self):
+        self.state.progress_add(b"/top", b"/top/b", b"/top/a")
+        assert self.state.progress_has(b"/top")
+        assert self.state.progress_has_element(b"/top", b"/top/a")
+        assert not self.state.progress_has_element(b"/top", b"/top/c")
+        assert not self.state.progress_has(b"/other")
+        assert self.state.tagprogress == {b"/top": [b"/top/a", b"/top/b"]}
+
+        self.state.progress_reset(b"/top")
+        assert not self.state.progress_has(b"/top")
+
+    def test_progress_without_paths(self):
+        self.state.progress_add(b"/top")
+        assert self.state.progress_has(b"/top")
+        assert self.state.tagprogress == {b"/top": []}
+
+    def test_history(self):
+        self.state.history_add([b"/a", b"/b"])
+        mark = self.state.history_mark()
+        self.state.history_add([b"/c"])
+
+        assert self.state.history_has([b"/a", b"/b"])
+        assert not self.state.history_has([b"/a"])
+        assert self.state.history_has([b"/c"])
+        assert not self.state.history_has([b"/c"], mark)
+        assert self.state.taghistory == {(b"/a", b"/b"), (b"/c",)}
+
+    def test_state_persists(self):
+        self.state.progress_add(b"/top", b"/top/a")
+        self.state.history_add([b"/a"])
+        self.state.close()
+
+        self.state = importer.ImportState()
+        assert self.state.progress_has_element(b"/top", b"/top/a")
+        assert self.state.history_has([b"/a"])
+
+    def test_pickled_state_file_is_imported(self):
+        self.state.close()
+        os.remove(self.state.db_path)
+        with open(self.state.path, "wb") as f:
+            pickle.dump(
+                {
+                    "tagprogress": {b"/top": [b"/top/a"]},
+                    "taghistory": {(b"/a", b"/b")},
+                },
+                f,
+            )
+
+        self.state = importer.ImportState()
+        assert self.state.progress_has_element(b"/top", b"/top/a")
+        assert self.state.history_has([b"/a", b"/b"])
+
+    def test_database_is_named_after_state_file(self):
+        assert self.state.db_path == self.state.path + b".sqlite"
+
+    def test_other_database_is_not_changed(self):
+        self.state.close()
+        os.remove(self.state.db_path)
+        with sqlite3.connect(self.state.db_path) as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+        conn.close()
+
+        with self.assertLogs("beets", "ERROR") as logs:
+            self.state = importer.ImportState()
+        assert any("holds other tables: items" in line for line in logs.output)
+        self.state.progress_add(b"/top", b"/top/a")
+        assert self.state.progress_has_element(b"/top", b"/top/a")
+        with sqlite3.connect(self.state.db_path) as conn:
+            tables = conn.execute("SELECT name FROM sqlite_master").fetchall()
+        conn.close()
+        assert tables == [("items",)]
+
+
 class TagLogTest(BeetsTestCase):
     def test_tag_log_line(self):
         sio = StringIO()
@@ -1397,6 +1482,143 @@ class IncrementalImportTest(AsIsImporterMixin, ImportTestCase):
         assert len(self.lib.albums()) == 1
 
 
+class ParallelReadImportTest(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        for album_id in range(1, 4):
+            self.prepare_album_for_import(2, album_id=album_id)
+        config["import"]["read_workers"] = 4
+        config["import"]["read_ahead"] = 1
+
+    def assert_albums_imported_in_order(self):
+        albums = sorted(self.lib.albums(), key=lambda a: a.id)
+        assert [a.album for a in albums] == [
+            "Tag Album 1",
+            "Tag Album 2",
+            "Tag Album 3",
+        ]
+        assert all(len(a.items()) == 2 for a in albums)
+
+    def test_threads_keep_album_order(self):
+        self.setup_importer(autotag=False).run()
+        self.assert_albums_imported_in_order()
+
+    def test_processes_keep_album_order(self):
+        config["import"]["read_processes"] = True
+        self.setup_importer(autotag=False).run()
+        self.assert_albums_imported_in_order()
+
+    def test_singletons_keep_order(self):
+        self.setup_importer(autotag=False, singletons=True).run()
+        items = sorted(self.lib.items(), key=lambda i: i.id)
+        assert [i.album for i in items] == [
+            "Tag Album 1",
+            "Tag Album 1",
+            "Tag Album 2",
+            "Tag Album 2",
+            "Tag Album 3",
+            "Tag Album 3",
+        ]
+
+    def test_unreadable_file_is_skipped(self):
+        (self.import_path / "album_2" / "track_1.mp3").write_bytes(b"")
+        with self.assertLogs("beets", "WARNING") as logs:
+            self.setup_importer(autotag=False).run()
+        assert any("unreadable file" in line for line in logs.output)
+        assert len(self.lib.items()) == 5
+
+    def test_skipped_albums_are_not_read(self):
+        self.setup_importer(autotag=False, incremental=True).run()
+        with patch(
+            "beets.importer._read_item", side_effect=AssertionError
+        ) as read_item:
+            self.setup_importer(autotag=False, incremental=True).run()
+        read_item.assert_not_called()
+        assert len(self.lib.albums()) == 3
+
+
+class StageWorkersImportTest(ImportTestCase):
+    db_on_disk = True
+
+    def setUp(self):
+        super().setUp()
+        for album_id in range(1, 5):
+            self.prepare_album_for_import(1, album_id=album_id)
+        config["threaded"] = True
+        config["import"]["stage_workers"]["lookup_candidates"] = 3
+        config["import"]["stage_workers"]["manipulate_files"] = 2
+
+    def test_albums_keep_order(self):
+        def lookup_candidates(task):
+            # Look up the first albums last.
+            time.sleep(0.05 / int(task.items[0].album[-1]))
+            task.candidates = []
+            task.rec = None
+
+        self.setup_importer(move=True).default_choice = importer.action.ASIS
+        with patch.object(
+            importer.ImportTask,
+            "lookup_candidates",
+            autospec=True,
+            side_effect=lookup_candidates,
+        ):
+            self.importer.run()
+
+        albums = sorted(self.lib.albums(), key=lambda a: a.id)
+        assert [a.album for a in albums] == [
+            "Tag Album 1",
+            "Tag Album 2",
+            "Tag Album 3",
+            "Tag Album 4",
+        ]
+        for item in self.lib.items():
+            self.assertExists(item.path)
+
+    def test_stage_stats_are_logged(self):
+        # Four albums and the sentinel task of the import directory.
+        with self.assertLogs("beets", "DEBUG") as logs:
+            self.setup_importer(autotag=False).run()
+        assert any(
+            "import stage manipulate_files (2 thread(s)): 5 messages" in line
+            for line in logs.output
+        )
+
+
+def _process_id(path):
+    return os.getpid()
+
+
+class ProcessPoolStageImportTest(ImportTestCase):
+    db_on_disk = True
+
+    def setUp(self):
+        super().setUp()
+        self.prepare_album_for_import(2)
+        config["threaded"] = True
+        config["import"]["process_workers"] = 2
+
+    def run_with_stage(self):
+        @plugins.process_pool_stage
+        def stage(session, task, pool):
+            for item in task.imported_items():
+                item["pid"] = pool.call(_process_id, item.path)
+                item.store()
+
+        with patch("beets.plugins.import_stages", return_value=[stage]):
+            self.setup_importer(autotag=False).run()
+
+    def test_stage_runs_in_pool(self):
+        self.run_with_stage()
+        pids = {int(item["pid"]) for item in self.lib.items()}
+        assert os.getpid() not in pids
+
+    def test_sequential_stage_runs_inline(self):
+        config["threaded"] = False
+        self.run_with_stage()
+        pids = {int(item["pid"]) for item in self.lib.items()}
+        assert pids == {os.getpid()}
+
+
 def _mkmp3(path):
     shutil.copyfile(
         syspath(os.path.join(_common.RSRC, b"min.mp3")),
@@ -199,6 +199,59 @@ class DestinationTest(BeetsTestCase):
         self.i.album = "one"
         assert self.i.destination() == np("base/one/two three")
 
+    def test_path_format_queries_parsed_once(self):
+        self.lib.path_formats = [
+            ("default", "$title"),
+            ("comp:true", "comp/$title"),
+        ]
+        other = item(self.lib)
+        with patch(
+            "beets.library.parse_query_string",
+            wraps=beets.library.parse_query_string,
+        ) as parse:
+            self.i.destination()
+            other.destination()
+        assert parse.call_count == 1
+
+    def test_path_formats_recompiled_when_changed(self):
+        self.lib.directory = b"base"
+        self.lib.path_formats = [("default", "$title")]
+        self.i.title = "one"
+        self.i.destination()
+        self.lib.path_formats.insert(0, ("title:one", "matched"))
+        assert self.i.destination() == np("base/matched")
+
+    def test_path_formats_recompiled_when_plugin_queries_change(self):
+        class NoQuery(beets.dbcore.query.FieldQuery):
+            @classmethod
+            def value_match(cls, pattern, value):
+                return False
+
+        class AnyQuery(NoQuery):
+            @classmethod
+            def value_match(cls, pattern, value):
+                return True
+
+        self.lib.directory = b"base"
+        self.lib.path_formats = [("default", "$title"), ("mine:x", "matched")]
+        self.i.title = "one"
+        queries = beets.library.Item._queries
+        with patch.dict(queries, {"mine": NoQuery}):
+            assert self.i.destination() == np("base/one")
+            queries["mine"] = AnyQuery
+            plugins.named_queries(beets.library.Item)
+            assert self.i.destination() == np("base/matched")
+
+    def test_destination_with_compiled_path_formats(self):
+        self.lib.directory = b"base"
+        path_formats = beets.library.compile_path_formats(
+            [("default", "$title"), ("title:one", "$title one")]
+        )
+        self.i.title = "one"
+        assert self.i.destination(path_formats=path_formats) == np(
+            "base/one one"
+        )
+
     def test_destination_preserves_extension(self):
         self.lib.directory = b"base"
         self.lib.path_formats = [("default", "$title")]
@@ -521,6 +574,20 @@ class ItemFormattedMappingTest(ItemInDBTestCase):
         album.store()
         assert "foo" == self.i.formatted().get("flex")
 
+    def test_fixed_fields_for_path_do_not_load_album_flex_fields(self):
+        album = self.lib.add_album([self.i])
+        album["flex"] = "foo"
+        album.store()
+        formatted = self.lib.get_item(self.i.id).formatted(for_path=True)
+
+        statements = []
+        self.lib._connection().set_trace_callback(statements.append)
+        assert formatted["title"] == "the title"
+        assert formatted["album"] == "the album"
+        assert not [s for s in statements if "album_attributes" in s]
+        assert formatted["flex"] == "foo"
+        assert [s for s in statements if "album_attributes" in s]
+
     def test_album_field_overrides_item_field_for_path(self):
         # Make the album inconsistent with the item.
         album = self.lib.add_album([self.i])
@@ -760,6 +827,22 @@ class DisambiguationTest(BeetsTestCase, PathFormattingMixin):
         self._setf("foo%aunique{albumartist album flex,year}/$title")
         self._assert_dest(b"/base/foo/the title", self.i1)
 
+    def test_unique_index_is_built_once(self):
+        self._assert_dest(b"/base/foo [2001]/the title", self.i1)
+        with patch.object(self.lib, "albums", side_effect=AssertionError):
+            self._assert_dest(b"/base/foo [2002]/the title", self.i2)
+
+    def test_unique_follows_stored_and_removed_albums(self):
+        self._assert_dest(b"/base/foo [2001]/the title", self.i1)
+
+        album2 = self.lib.get_album(self.i2)
+        album2.year = 2001
+        album2.store()
+        self._assert_dest(b"/base/foo [1]/the title", self.i1)
+
+        album2.remove()
+        self._assert_dest(b"/base/foo/the title", self.i1)
+
 
 class SingletonDisambiguationTest(BeetsTestCase, PathFormattingMixin):
     def setUp(self):
@@ -787,6 +870,18 @@ class SingletonDisambiguationTest(BeetsTestCase, PathFormattingMixin):
         self._setf("foo/$title%sunique{}")
         self._assert_dest(b"/base/foo/the title [live version]", self.i1)
 
+    def test_sunique_follows_added_and_removed_singletons(self):
+        self._setf("foo/$title%sunique{artist title year,}")
+        self._assert_dest(b"/base/foo/the title", self.i1)
+
+        i3 = item()
+        i3.year = 2001
+        self.lib.add(i3)
+        self._assert_dest(b"/base/foo/the title [1]", self.i1)
+
+        i3.remove()
+        self._assert_dest(b"/base/foo/the title", self.i1)
+
     def test_sunique_expands_to_nothing_for_distinct_singletons(self):
         self.i2.title = "different track"
         self.i2.store()
@@ -14,6 +14,8 @@
 
 """Test the "pipeline.py" restricted parallel programming library."""
 
+import threading
+import time
 import unittest
 
 import pytest
@@ -85,6 +87,44 @@ def _multi_work():
         i = pipeline.multiple([i, -i])
 
 
+# A worker that finishes later messages first.
+def _slow_work(num=5):
+    i = None
+    while True:
+        i = yield i
+        time.sleep((num - i) * 0.01)
+        if i == 3:
+            i = pipeline.BUBBLE
+        else:
+            i = pipeline.multiple([i, -i])
+
+
+# A function for a process stage, which must be picklable.
+def _process_work(factor, i):
+    if i == 3:
+        return pipeline.BUBBLE
+    return pipeline.multiple([i * factor, -i * factor])
+
+
+# A lock that a thread holds while a process stage starts its processes,
+# which must not inherit it.
+_held_lock = threading.Lock()
+
+
+def _produce_holding_lock(num=5):
+    with _held_lock:
+        for i in range(num):
+            yield i
+            time.sleep(0.05)
+
+
+def _check_lock(i):
+    if not _held_lock.acquire(timeout=5):
+        raise RuntimeError("lock held in the worker process")
+    _held_lock.release()
+    return i
+
+
 class SimplePipelineTest(unittest.TestCase):
     def setUp(self):
         self.result = []
@@ -131,6 +171,99 @@ class ParallelStageTest(unittest.TestCase):
         assert list(pl.pull()) == [0, 2, 4, 6, 8]
 
 
+class OrderedStageTest(unittest.TestCase):
+    def setUp(self):
+        self.result = []
+        self.pl = pipeline.Pipeline(
+            (
+                _produce(),
+                pipeline.ordered([_slow_work(), _slow_work(), _slow_work()]),
+                _consume(self.result),
+            )
+        )
+
+    def test_run_sequential(self):
+        self.pl.run_sequential()
+        assert self.result == [0, 0, 1, -1, 2, -2, 4, -4]
+
+    def test_run_parallel(self):
+        self.pl.run_parallel()
+        assert self.result == [0, 0, 1, -1, 2, -2, 4, -4]
+
+
+class ProcessStageTest(unittest.TestCase):
+    def setUp(self):
+        self.result = []
+        self.pl = pipeline.Pipeline(
+            (
+                _produce(),
+                pipeline.process_stage(_process_work, 2, workers=2),
+                _consume(self.result),
+            )
+        )
+
+    def test_run_sequential(self):
+        self.pl.run_sequential()
+        assert self.result == [0, 0, 2, -2, 4, -4, 8, -8]
+
+    def test_run_parallel(self):
+        self.pl.run_parallel()
+        assert self.result == [0, 0, 2, -2, 4, -4, 8, -8]
+        assert self.pl.stats[1].workers == 2
+
+    def test_pool_is_stopped(self):
+        pool = self.pl.stages[1].pool
+        self.pl.run_parallel()
+        assert pool.call(_process_work, 1, 2).messages == [2, -2]
+
+    def test_exception_in_process(self):
+        pl = pipeline.Pipeline(
+            (iter([1, None]), pipeline.process_stage(_process_work, 2))
+        )
+        with pytest.raises(TypeError):
+            pl.run_parallel()
+
+    def test_processes_do_not_inherit_thread_locks(self):
+        result = []
+        pl = pipeline.Pipeline(
+            (
+                _produce_holding_lock(),
+                pipeline.process_stage(_check_lock, workers=2),
+                _work(),
+                _consume(result),
+            )
+        )
+        pl.run_parallel()
+        assert result == [0, 2, 4, 6, 8]
+
+
+class StageStatsTest(unittest.TestCase):
+    def test_stats_of_parallel_run(self):
+        result = []
+        pl = pipeline.Pipeline(
+            (_produce(), (_multi_work(), _multi_work()), _consume(result))
+        )
+        pl.run_parallel()
+
+        assert [(s.name, s.workers, s.messages) for s in pl.stats] == [
+            ("_produce", 1, 5),
+            ("_multi_work", 2, 5),
+            ("_consume", 1, 10),
+        ]
+        assert pl.elapsed > 0
+        assert all(s.busy >= 0 and s.idle >= 0 for s in pl.stats)
+        assert pl.stats[2].max_queue_depth <= pipeline.DEFAULT_QUEUE_SIZE
+
+    def test_stage_name(self):
+        @pipeline.stage
+        def add(n, i):
+            return i + n
+
+        pl = pipeline.Pipeline([iter([1, 2, 3]), add(2)])
+        pl.run_parallel()
+        assert [s.name for s in pl.stats] == ["list_iterator", "add"]
+
+
 class ExceptionTest(unittest.TestCase):
     def setUp(self):
         self.result = []
@@ -22,6 +22,7 @@ import pytest
 from mediafile import MediaFile
 
 from beets import config, plugins, ui
+from beets.autotag.hooks import AlbumInfo
 from beets.dbcore import types
 from beets.importer import (
     ArchiveImportTask,
@@ -158,6 +159,44 @@ class ItemTypeConflictTest(PluginLoaderTestCase):
         assert plugins.types(Item) is not None
 
 
+class LookupByIdTest(PluginLoaderTestCase):
+    def setUp(self):
+        super().setUp()
+        config["metadata_cache"]["enabled"] = True
+        self.lookups = []
+
+    def register_source(self, cacheable):
+        lookups = self.lookups
+
+        class Source(plugins.BeetsPlugin):
+            cacheable_candidates = cacheable
+
+            def album_for_id(self, album_id):
+                lookups.append(album_id)
+                return AlbumInfo(tracks=[], album_id=album_id)
+
+        self.register_plugin(Source)
+
+    def test_cacheable_source_lookup_is_cached(self):
+        self.register_source(True)
+        plugins.album_for_id("1")
+        assert plugins.album_for_id("1").album_id == "1"
+        assert self.lookups == ["1"]
+
+    def test_plugin_lookup_is_not_cached(self):
+        self.register_source(False)
+        plugins.album_for_id("1")
+        plugins.album_for_id("1")
+        assert self.lookups == ["1", "1"]
+
+    def test_source_config_is_part_of_key(self):
+        self.register_source(True)
+        plugins.album_for_id("1")
+        plugins.find_plugins()[0].config["option"] = "other"
+        plugins.album_for_id("1")
+        assert self.lookups == ["1", "1"]
+
+
 class EventsTest(PluginImportTestCase):
     def setUp(self):
         super().setUp()
@@ -1104,3 +1104,122 @@ class RelatedQueriesTest(BeetsTestCase, AssertsMixin):
         q = "artpath::A Album1"
         results = self.lib.items(q)
         self.assert_items_matched(results, ["Album1 Item1", "Album1 Item2"])
+
+
+class ResidualQueryTest(DummyDataTestCase):
+    """Test splitting queries into SQL clauses and Python residuals."""
+
+    def setUp(self):
+        super().setUp()
+        self.fast = dbcore.query.SubstringQuery("title", "ba")
+        self.slow = dbcore.query.SubstringQuery("genre", "rock", fast=False)
+
+    def test_fast_query_has_no_residual(self):
+        clause, _, residual = self.fast.clause_with_residual()
+        assert clause
+        assert residual is None
+
+    def test_and_query_pushes_down_fast_part(self):
+        q = dbcore.query.AndQuery([self.slow, self.fast])
+        clause, subvals, residual = q.clause_with_residual()
+        assert clause == "(title like ? escape '\\')"
+        assert subvals == ["%ba%"]
+        assert residual == self.slow
+
+    def test_or_query_with_slow_part_is_slow(self):
+        q = dbcore.query.OrQuery([self.slow, self.fast])
+        assert q.clause_with_residual() == (None, (), q)
+
+    def test_or_query_narrows_down_partially_fast_parts(self):
+        partial = dbcore.query.AndQuery([self.fast, self.slow])
+        q = dbcore.query.OrQuery([partial, self.fast])
+        clause, _, residual = q.clause_with_residual()
+        assert clause
+        assert residual == q
+
+    def test_not_query_with_partially_fast_part_is_slow(self):
+        q = dbcore.query.NotQuery(dbcore.query.AndQuery([self.fast, self.slow]))
+        assert q.clause_with_residual() == (None, (), q)
+
+    def test_match_partially_fast_and_query(self):
+        results = self.lib.items("title:ba genre:rock year:2001..")
+        self.assert_items_matched(results, ["foo bar", "baz qux"])
+
+    def test_match_partially_fast_or_query(self):
+        for item in self.lib.items():
+            item.mood = "happy" if item.year == 2001 else "sad"
+            item.store()
+        results = self.lib.items("title:foo mood:happy , year:2003")
+        self.assert_items_matched(results, ["foo bar", "beets 4 eva"])
+
+    def test_match_partially_fast_not_query(self):
+        q = dbcore.query.NotQuery(dbcore.query.AndQuery([self.fast, self.slow]))
+        results = self.lib.items(q)
+        self.assert_items_matched(results, ["beets 4 eva"])
+
+
+class FlexQueryPushdownTest(BeetsTestCase, AssertsMixin):
+    """Test evaluating flexible attribute queries in SQL."""
+
+    def setUp(self):
+        super().setUp()
+        self.item = self.add_item(title="own", mood="happy", myint=5)
+        self.album_item = self.add_item(title="inherited", myint=12)
+        album = self.lib.add_album([self.album_item])
+        album.mood = "sad"
+        album.store()
+        self.bare = self.add_item(title="bare")
+
+    def test_flex_query_has_sql_clause(self):
+        query = beets.library.Item.field_query(
+            "mood", "happy", dbcore.query.SubstringQuery
+        )
+        clause, _, residual = query.clause_with_residual()
+        assert "item_attributes" in clause
+        assert residual is None
+
+    def test_computed_field_query_stays_slow(self):
+        query = beets.library.Item.field_query(
+            "singleton", "true", dbcore.query.SubstringQuery
+        )
+        assert query.clause() == (None, ())
+
+    def test_match_own_flex_attribute(self):
+        results = self.lib.items("mood:happy")
+        self.assert_items_matched(results, ["own"])
+
+    def test_match_album_flex_attribute(self):
+        results = self.lib.items("mood:sad")
+        self.assert_items_matched(results, ["inherited"])
+
+    def test_regexp_flex_attribute(self):
+        results = self.lib.items("mood::^(happy|sad)$")
+        self.assert_items_matched(results, ["own", "inherited"])
+
+    def test_empty_pattern_matches_missing_attribute(self):
+        results = self.lib.items("mood:")
+        self.assert_items_matched(results, ["own", "inherited", "bare"])
+
+    def test_untyped_numeric_flex_matches_as_string(self):
+        results = self.lib.items("myint:2")
+        self.assert_items_matched(results, ["inherited"])
+
+    def test_untyped_flex_range_skips_non_numeric_values(self):
+        self.add_item(title="text", myint="many")
+        query = beets.library.Item.field_query(
+            "myint", "..10", dbcore.query.NumericQuery
+        )
+        results = self.lib.items(query)
+        self.assert_items_matched(results, ["own"])
+
+    @patch("beets.library.Item._types", {"myint": types.Integer()})
+    def test_typed_flex_range_compares_numerically(self):
+        results = self.lib.items("myint:..10")
+        self.assert_items_matched(results, ["own"])
+
+    def test_none_pattern_matches_missing_attribute(self):
+        query = beets.library.Item.field_query(
+            "mood", None, dbcore.query.MatchQuery
+        )
+        results = self.lib.items(query)
+        self.assert_items_matched(results, ["bare"])
@@ -274,3 +274,89 @@ class EvalTest(unittest.TestCase):
 
     def test_function_call_with_empty_arg(self):
         assert self._eval("%len{}") == "0"
+
+
+class CompiledEvalTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def record(s):
+            self.calls.append(s)
+            return s
+
+        @functemplate.lazy
+        def cond(condition, trueval, falseval=""):
+            if functemplate.force(condition):
+                return functemplate.force(trueval)
+            return functemplate.force(falseval)
+
+        @functemplate.pure
+        def upper(s):
+            return s.upper()
+
+        self.functions = {"record": record, "upper": upper, "cond": cond}
+
+    def _eval(self, template, values=None):
+        tmpl = functemplate.Template(template)
+        values = values or {"foo": "bar"}
+        res = tmpl.substitute(values, self.functions)
+        assert res == tmpl.interpret(values, self.functions)
+        return res
+
+    def test_lazy_function_skips_unused_argument(self):
+        assert self._eval("%cond{x,$foo,%record{a}}") == "bar"
+        assert self._eval("%cond{,%record{a},%record{b}}") == "b"
+        assert self.calls == ["b", "b"]
+
+    def test_force_plain_value(self):
+        assert self.functions["cond"]("", "a", "b") == "b"
+
+    def test_pure_call_with_literal_arguments_folded(self):
+        calls = []
+
+        @functemplate.pure
+        def count(s):
+            calls.append(s)
+            return s
+
+        tmpl = functemplate.Template("%count{a} %count{$foo}")
+        for _ in range(3):
+            res = tmpl.substitute({"foo": "b"}, {"count": count})
+            assert res == "a b"
+        assert calls == ["a", "b", "b", "b"]
+
+    def test_impure_call_not_folded(self):
+        tmpl = functemplate.Template("%record{a}")
+        tmpl.substitute({}, self.functions)
+        tmpl.substitute({}, self.functions)
+        assert self.calls == ["a", "a"]
+
+    def test_fields_looked_up_once(self):
+        lookups = []
+
+        class Values(dict):
+            def get(self, key, default=None):
+                lookups.append(key)
+                return super().get(key, default)
+
+        values = Values(foo="bar", baz="qux")
+        assert self._eval("$foo $foo %upper{$foo}", values) == "bar bar BAR"
+        assert lookups == ["foo"]
+
+    def test_fields_in_unused_arguments_not_looked_up(self):
+        lookups = []
+
+        class Values(dict):
+            def get(self, key, default=None):
+                lookups.append(key)
+                return super().get(key, default)
+
+        values = Values(foo="bar", baz="qux")
+        assert self._eval("%cond{,$baz,$foo}", values) == "bar"
+        assert lookups == ["foo"]
+
+    def test_undefined_value_in_argument(self):
+        assert self._eval("%upper{$qux}") == "$QUX"
+
+    def test_non_string_value(self):
+        assert self._eval("$foo%upper{$foo}", {"foo": 1}) == "11"
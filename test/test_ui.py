@@ -440,6 +440,41 @@ class WriteTest(BeetsTestCase):
         assert f"{old_title} -> new title" in output
 
 
+class IndexTest(BeetsTestCase):
+    def test_list_indexes(self):
+        output = self.run_with_output("index")
+        assert "items_by_album_id: items (album_id)" in output
+        assert "albums_by_mb_albumid: albums (mb_albumid)" in output
+
+    def test_create_index(self):
+        self.run_command("index", "--create", "year", "month")
+        assert "items_by_year_month" in self.lib.indexes()
+
+    def test_create_album_index(self):
+        self.run_command("index", "-a", "--create", "year")
+        assert self.lib.indexes()["albums_by_year"].table == "albums"
+
+    def test_create_index_on_flex_field_fails(self):
+        with pytest.raises(ui.UserError):
+            self.run_command("index", "--create", "myflex")
+
+    def test_drop_index(self):
+        self.run_command("index", "--drop", "items_by_mtime")
+        assert "items_by_mtime" not in self.lib.indexes()
+
+    def test_drop_unknown_index_fails(self):
+        with pytest.raises(ui.UserError):
+            self.run_command("index", "--drop", "nonexistent")
+
+    def test_configured_index_is_created(self):
+        self.config["indexes"]["items"] = ["genre", "albumartist album", "x"]
+        lib = library.Library(":memory:")
+        indexes = lib.indexes()
+        assert "items_by_genre" in indexes
+        assert "items_by_albumartist_album" in indexes
+        assert "items_by_x" not in indexes
+
+
 class MoveTest(BeetsTestCase):
     def setUp(self):
         super().setUp()
@@ -576,6 +611,7 @@ class UpdateTest(BeetsTestCase):
         reset_mtime=True,
         fields=None,
         exclude_fields=None,
+        incremental=None,
     ):
         self.io.addinput("y")
         if reset_mtime:
@@ -589,6 +625,7 @@ class UpdateTest(BeetsTestCase):
             False,
             fields=fields,
             exclude_fields=exclude_fields,
+            incremental=incremental,
         )
 
     def test_delete_removes_item(self):
@@ -621,6 +658,45 @@ class UpdateTest(BeetsTestCase):
         item = self.lib.items().get()
         assert item.title == "differentTitle"
 
+    def test_incremental_skips_unchanged_directory(self):
+        self._update()
+        mf = MediaFile(syspath(self.i.path))
+        mf.title = "differentTitle"
+        mf.save()
+
+        self._update(incremental=True)
+        assert self.lib.get_item(self.i.id).title != "differentTitle"
+
+        self._update()
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
+    def test_incremental_checks_changed_directory(self):
+        self._update()
+        util.remove(self.i.path)
+
+        self._update(reset_mtime=False, incremental=True)
+        assert [i.id for i in self.lib.items()] == [self.i2.id]
+
+    def test_incremental_checks_directory_with_read_error(self):
+        mf = MediaFile(syspath(self.i.path))
+        mf.title = "differentTitle"
+        mf.save()
+        error = library.ReadError(self.i.path, "unreadable")
+        with patch.object(library.Item, "read", side_effect=error):
+            self._update()
+
+        self._update(reset_mtime=False, incremental=True)
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
+    def test_incremental_needs_full_scan(self):
+        self._update(query=["title:full"])
+        mf = MediaFile(syspath(self.i.path))
+        mf.title = "differentTitle"
+        mf.save()
+
+        self._update(incremental=True)
+        assert self.lib.get_item(self.i.id).title == "differentTitle"
+
     def test_modified_metadata_moved(self):
         mf = MediaFile(syspath(self.i.path))
         mf.title = "differentTitle"
@@ -1445,6 +1521,39 @@ class CompletionTest(TestPluginTestCase):
         )
 
 
+class StatsTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        album = self.add_album(artist="a", albumartist="a", length=60.5)
+        self.add_item(album_id=album.id, artist="b", bitrate=128000)
+        self.add_item(artist="b", albumartist="", length=10.25)
+
+    def test_sql_stats_match_python_stats(self):
+        # A query on a computed field cannot be evaluated by SQLite.
+        assert self.lib.select(library.Item, "filesize::.", ["1"]) is None
+
+        output = self.run_with_output("stats")
+        assert "Tracks: 3\n" in output
+        assert "Artists: 2\n" in output
+        assert "Albums: 1\n" in output
+        assert "Album artists: 2" in output
+        assert self.run_with_output("stats", "filesize::.") == output
+
+    def test_stats_query(self):
+        output = self.run_with_output("stats", "artist:b")
+        assert "Tracks: 2\n" in output
+        assert "Albums: 1\n" in output
+
+    def test_exact_size(self):
+        item = self.add_item_fixture(artist="c")
+        size = os.path.getsize(syspath(item.path))
+
+        output = self.run_with_output("stats", "-e", "artist:c")
+        assert f"Total size: {ui.human_bytes(size)} ({size} bytes)" in output
+        output = self.run_with_output("stats", "-e", "filesize::^[1-9]")
+        assert f"({size} bytes)" in output
+
+
 class CommonOptionsParserCliTest(BeetsTestCase):
     """Test CommonOptionsParser and formatting LibModel formatting on 'list'
     command.
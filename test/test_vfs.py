@@ -14,6 +14,8 @@
 
 """Tests for the virtual filesystem builder.."""
 
+import os
+
 from beets import vfs
 from beets.test import _common
 from beets.test.helper import BeetsTestCase
@@ -39,3 +41,46 @@ class VFSTest(BeetsTestCase):
         assert (
             self.tree.dirs["albums"].dirs["the album"].files["the title"] == 2
         )
+
+
+class LibTreeTest(BeetsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lib.path_formats = [("default", "$artist/$title")]
+        self.item = _common.item()
+        self.lib.add(self.item)
+        self.tree = vfs.LibTree.build(self.lib)
+
+    def test_insert_moves_changed_item(self):
+        self.item.artist = "another artist"
+        self.tree.insert(self.item)
+
+        assert self.tree.root.dirs["another artist"].files["the title"] == 1
+        assert "the artist" not in self.tree.root.dirs
+
+    def test_remove_prunes_empty_directories(self):
+        self.tree.remove(self.item.id)
+
+        assert self.tree.root == vfs.Node({}, {})
+        assert self.tree.paths == {}
+
+    def test_remove_keeps_other_item_at_same_path(self):
+        other = _common.item()
+        self.lib.add(other)
+        self.tree.insert(other)
+        self.tree.remove(self.item.id)
+
+        assert self.tree.root.dirs["the artist"].files["the title"] == other.id
+
+    def test_save_and_load(self):
+        path = os.path.join(self.temp_dir, b"tree")
+        self.tree.save(path, "key")
+
+        tree, key = vfs.LibTree.load(path)
+
+        assert key == "key"
+        assert tree.root == self.tree.root
+        assert tree.paths == self.tree.paths
+
+    def test_load_missing_tree(self):
+        assert vfs.LibTree.load(os.path.join(self.temp_dir, b"missing")) is None